@@ -0,0 +1,187 @@
+# はのこと活動記録 - 静的JSON API（data/api/v1/、build.py から使用）
+# - 年表・曲・アルバム・シングル・歌動画・切り抜き・ライブ（ツアー/公演/セトリ）を index.html とは別にJSONで出力
+# - v1/index.json: 各データの索引へのパスと件数
+# - <データ>/index.json: 件数・1ページの件数・ページ（<データ>/page-N.json）のパス/件数/内容ハッシュ
+# - 年表は 分類・年 ごとに1ファイル（timeline/<分類>/<年>.json）。timeline/index.json に分類と年の一覧
+# - パスは v1/ からの相対。画像・詳細ページのパスはサイトのルートからの相対
+# - 内容が同じファイルは書き換えず、今回出力しなかったファイルは削除（生成日時は含めない）
+# - 形式を変えるときは API_VERSION を上げる（別のディレクトリに出力）
+
+import os
+import json
+import hashlib
+from contextlib import closing
+from itertools import groupby
+from typing import Dict, List
+
+import generate
+from common import write_if_changed, make_cd_slug
+from generate_songs import CREDIT_TOKENIZER
+from records import CdItem, ClipVideo, CoverVideo, SongDetail, Tour, TrendingVideo
+from titles import TitleIndex
+
+API_DIR = os.path.join("data", "api")
+API_VERSION = 1
+# 1ページの件数
+PAGE_SIZE = 100
+HASH_LENGTH = 12
+
+def site_path(path: str) -> str:
+    """詳細ページから見た相対パス（../image/...）→ サイトのルートからの相対パス"""
+    return path[3:] if path.startswith("../") else path
+
+class ApiWriter:
+    """v1/ 以下にJSONを書き出し、書き出したファイルを覚えておく（prune() で残りを削除）"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: set = set()
+        self.written = 0
+
+    def write(self, rel_path: str, payload: Dict) -> str:
+        """JSONを書き出して内容ハッシュを返す（内容が同じなら書き換えない）"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        if write_if_changed(os.path.join(self.root, rel_path), body):
+            self.written += 1
+        self.files.add(rel_path)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+    def write_collection(self, name: str, items: List[Dict]) -> Dict:
+        """PAGE_SIZE 件ずつのページと索引を書き出す"""
+        pages = []
+        for number, start in enumerate(range(0, len(items), PAGE_SIZE), 1):
+            chunk = items[start:start + PAGE_SIZE]
+            path = f"{name}/page-{number}.json"
+            digest = self.write(path, {"version": API_VERSION, "collection": name, "page": number, "items": chunk})
+            pages.append({"path": path, "count": len(chunk), "hash": digest})
+        path = f"{name}/index.json"
+        self.write(path, {"version": API_VERSION, "collection": name, "count": len(items), "page_size": PAGE_SIZE, "pages": pages})
+        return {"path": path, "count": len(items)}
+
+    def prune(self) -> int:
+        """今回書き出さなかった .json を削除（空になったディレクトリも削除）"""
+        removed = 0
+        for dirpath, _dirnames, filenames in os.walk(self.root, topdown=False):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith(".json") and os.path.relpath(path, self.root).replace(os.sep, "/") not in self.files:
+                    os.remove(path)
+                    removed += 1
+            if dirpath != self.root and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        return removed
+
+def write_timeline(writer: ApiWriter, timeline: Dict) -> Dict:
+    """年表を 分類・年 ごとに書き出す"""
+    classifications = []
+    total = 0
+    with closing(generate.get_conn()) as conn:
+        for classification in timeline["classifications"]:
+            years = []
+            records = generate.iter_timeline_records(conn, classification)
+            for year, year_records in groupby(records, key=lambda r: r.year):
+                items = [r._asdict() for r in year_records]
+                path = f"timeline/{make_cd_slug(classification)}/{year}.json"
+                digest = writer.write(path, {"version": API_VERSION, "classification": classification, "year": year, "items": items})
+                years.append({"year": year, "count": len(items), "path": path, "hash": digest})
+            count = sum(y["count"] for y in years)
+            total += count
+            classifications.append({"name": classification, "count": count, "years": years})
+    path = "timeline/index.json"
+    writer.write(path, {"version": API_VERSION, "collection": "timeline", "count": total, "classifications": classifications})
+    return {"path": path, "count": total}
+
+def song_item(song: SongDetail) -> Dict:
+    return {
+        "name": song.name,
+        "slug": song.slug,
+        "page": f"songs/{song.slug}.html",
+        "image": site_path(song.image),
+        "release_date": song.release_date,
+        "kind": song.kind,
+        "albums": list(song.albums),
+        "vocal": [v.strip() for v in song.vocal.split(",") if v.strip()],
+        "youtube": song.youtube,
+        "lyrics": song.lyrics,
+        "composer": song.composer,
+        "arranger": song.arranger,
+        "credits": [{"role": role, "name": name} for role, name in CREDIT_TOKENIZER.tokenize(song.credit_raw)],
+    }
+
+def cd_item(item: CdItem, songs_index: TitleIndex) -> Dict:
+    return {
+        "name": item.name,
+        "slug": item.slug,
+        "page": f"CDs/{item.slug}.html",
+        "image": site_path(item.image),
+        "release_date": item.date,
+        "comment": item.oneword,
+        "description": item.desc,
+        "tracks": [{"title": t, "song": songs_index.resolve(t)} for t in item.tracks],
+        "videos": list(item.videos),
+    }
+
+def cover_item(video: CoverVideo, increase: int) -> Dict:
+    return {
+        "video_id": video.video_id,
+        "title": video.title,
+        "date": video.date,
+        "views": video.views,
+        "increase": increase,
+        "tag": video.tag,
+        "channel": video.channel,
+        "unit": video.unit_flag,
+        "hanon": video.hanon_flag,
+        "kotoha": video.kotoha_flag,
+    }
+
+def clip_item(category: str, clip: ClipVideo) -> Dict:
+    return {"video_id": clip.video_id, "title": clip.title, "date": clip.iso_date, "category": category}
+
+def tour_item(tour: Tour, songs_index: TitleIndex) -> Dict:
+    return {
+        "id": tour.id,
+        "name": tour.name,
+        "page_link": tour.page_link,
+        "goods": tour.goods,
+        "concerts": [
+            {
+                "id": c.id,
+                "name": c.name,
+                "date": c.date,
+                "venue": c.venue,
+                "performer": c.performer,
+                "setlist": [
+                    {"order": s.order, "title": s.title, "singer": s.singer, "encore": bool(s.encore), "song": songs_index.resolve(s.title)}
+                    for s in c.setlist
+                ],
+            }
+            for c in tour.concerts
+        ],
+    }
+
+def write_api(timeline: Dict | None, sheet_datasets: Dict, concerts: List[Tour], songs: List[SongDetail],
+              cd_items, songs_index: TitleIndex, root: str | None = None) -> Dict[str, int]:
+    """全データを書き出し、古いファイルを削除"""
+    writer = ApiWriter(root or os.path.join(API_DIR, f"v{API_VERSION}"))
+    albums, singles = cd_items
+    trending: List[TrendingVideo] = sheet_datasets["trending"] or []
+    increases = {v.video_id: v.increase for v in trending}
+    clips = sorted(
+        ((category, clip) for category, items in sheet_datasets["videos"].items() for clip in items),
+        key=lambda x: x[1].iso_date, reverse=True,
+    )
+    collections: Dict[str, Dict] = {}
+    if timeline is not None:
+        collections["timeline"] = write_timeline(writer, timeline)
+    collections["songs"] = writer.write_collection("songs", [song_item(s) for s in songs])
+    collections["albums"] = writer.write_collection("albums", [cd_item(a, songs_index) for a in albums])
+    collections["singles"] = writer.write_collection("singles", [cd_item(s, songs_index) for s in singles])
+    collections["covers"] = writer.write_collection("covers", [cover_item(v, increases.get(v.video_id, 0)) for v in sheet_datasets["covers_all"]])
+    collections["clips"] = writer.write_collection("clips", [clip_item(category, clip) for category, clip in clips])
+    collections["tours"] = writer.write_collection("tours", [tour_item(t, songs_index) for t in concerts])
+    writer.write("index.json", {"version": API_VERSION, "page_size": PAGE_SIZE, "collections": collections})
+    removed = writer.prune()
+    stats = {"files": len(writer.files), "written": writer.written, "removed": removed}
+    print(f"API: {stats['files']} ファイル（更新 {stats['written']} / 変更なし {stats['files'] - stats['written']} / 削除 {removed}）")
+    return stats
@@ -0,0 +1,111 @@
+# はのこと活動記録 - 静的アセットのフィンガープリントと事前圧縮（build.py から使用）
+# - style.css / script.js / songs.css / songs.js を内容ハッシュ付きの名前（style.<hash>.css）でコピー
+# - 生成ページは asset_url() でハッシュ付きの名前を参照（未設定時は元の名前のまま）
+# - HTML/CSS/JS の出力ごとに最大圧縮の .gz を書き出す（元ファイルより新しければ書き直さない）
+# - ハッシュ無しの元のアセット（ページからは参照しない）は圧縮しない
+
+import os
+import re
+import gzip
+import glob
+import hashlib
+from typing import Dict, List
+import instrument
+
+# フィンガープリント対象（リポジトリ直下からの相対パス、区切りは /）。ページは同じディレクトリのアセットを参照する
+ASSET_FILES = [
+    "style.css",
+    "script.js",
+    "CDs/songs.css",
+    "CDs/songs.js",
+    "songs/songs.css",
+    "songs/songs.js",
+]
+HASH_LENGTH = 10
+GZIP_LEVEL = 9
+COMPRESS_EXTENSIONS = (".html", ".css", ".js")
+
+# 元のパス → ハッシュ付きファイル名（configure_assets で設定）
+_asset_urls: Dict[str, str] = {}
+
+def _hashed_name(path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}.{digest}{ext}"
+
+def _hashed_pattern(path: str) -> re.Pattern:
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return re.compile(rf"^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(ext)}$")
+
+@instrument.timed("write")
+def fingerprint_assets(paths: List[str] = ASSET_FILES) -> Dict[str, str]:
+    """アセットをハッシュ付きの名前でコピーし、古いハッシュ付きコピーを削除。元のパス → ファイル名 を返す"""
+    mapping: Dict[str, str] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        name = _hashed_name(path, hashlib.sha256(data).hexdigest()[:HASH_LENGTH])
+        directory = os.path.dirname(path)
+        hashed_path = os.path.join(directory, name)
+        if not os.path.exists(hashed_path):
+            tmp_path = f"{hashed_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, hashed_path)
+        pattern = _hashed_pattern(path)
+        for old in os.listdir(directory or "."):
+            if old != name and pattern.match(old):
+                os.remove(os.path.join(directory, old))
+                if os.path.exists(os.path.join(directory, f"{old}.gz")):
+                    os.remove(os.path.join(directory, f"{old}.gz"))
+        mapping[path] = name
+    return mapping
+
+def configure_assets(mapping: Dict[str, str]):
+    """生成ページが参照するアセット名を登録"""
+    _asset_urls.clear()
+    _asset_urls.update(mapping)
+
+def asset_mapping() -> Dict[str, str]:
+    """登録済みのアセット名（別プロセスへ引き継ぐ用）"""
+    return dict(_asset_urls)
+
+def asset_url(path: str) -> str:
+    """ページから参照するアセット名（同じディレクトリ内の相対参照）"""
+    return _asset_urls.get(path, os.path.basename(path))
+
+def compress_file(path: str) -> bool:
+    """<path>.gz を最大圧縮で書き出す（.gz が元ファイルより新しければ何もしない）。書き出したら True"""
+    gz_path = f"{path}.gz"
+    if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+        return False
+    with open(path, "rb") as f:
+        data = f.read()
+    tmp_path = f"{gz_path}.tmp"
+    # mtime=0 で同じ内容なら同じバイト列にする
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            gz.write(data)
+    os.replace(tmp_path, gz_path)
+    return True
+
+@instrument.timed("write")
+def compress_outputs(paths: List[str]) -> Dict[str, int]:
+    """ファイル/ディレクトリ直下の HTML/CSS/JS を圧縮し、元ファイルが消えた .gz・元のアセットの .gz は削除"""
+    originals = {os.path.normpath(p) for p in ASSET_FILES}
+    files: List[str] = []
+    orphans: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(p for p in sorted(glob.glob(os.path.join(path, "*")))
+                         if p.endswith(COMPRESS_EXTENSIONS) and os.path.normpath(p) not in originals)
+            orphans.extend(p for p in glob.glob(os.path.join(path, "*.gz"))
+                           if not os.path.exists(p[:-3]) or os.path.normpath(p[:-3]) in originals)
+        elif os.path.exists(path):
+            files.append(path)
+    written = sum(1 for p in files if compress_file(p))
+    instrument.add(rows=len(files))
+    for p in orphans:
+        os.remove(p)
+    return {"written": written, "unchanged": len(files) - written, "removed": len(orphans)}
@@ -0,0 +1,506 @@
+# はのこと活動記録 - ビルドのベンチマーク
+# - 合成データ（history.db / X_concert.db / 各シートのCSV）を倍率ごとに作業ディレクトリへ作成
+# - シートのCSVはローカルのHTTPスタブから配信（sheets.EXPORT_BASE を差し替え、build_csv_url のURL形式はそのまま）
+# - シート取得・各 fetch_* の解析・年表の集計/表生成・各セクション生成・詳細ページ描画・ファイル書き込みを段階ごとに計測
+# - 結果はJSONで保存（--compare で以前の結果との差分を表示）
+#
+# - index.html はセクションの描画キャッシュ（fragments.FragmentCache）無し・保存・再利用の3通りを計測
+# - --credits N でクレジット分解（credits.CreditTokenizer）を以前の正規表現の実装と比較
+#
+# 使い方: python bench.py [--scales 1 10 100] [--repeat 3] [--output data/bench/latest.json] [--compare 以前の結果.json] [--credits 100000]
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import shutil
+import re
+import random
+import sqlite3
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+import sheets
+import generate
+import generate_CDs
+import generate_songs
+import api
+from migrate_concert_db import ensure_concert_indexes
+from fragments import FRAGMENT_DIR, FragmentCache
+from assets import ASSET_FILES, fingerprint_assets, configure_assets, compress_outputs
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_OUTPUT = os.path.join("data", "bench", "latest.json")
+
+# 倍率1のときの件数（実データと同程度）
+BASE_COUNTS = {
+    "history": 1000,
+    "tours": 30,
+    "concerts": 70,
+    "setlists": 600,
+    "covers_all": 300,
+    "trending": 300,
+    "clips": 500,
+    "albums": 6,
+    "singles": 12,
+    "songs": 80,
+    "thanks": 60,
+}
+
+CLASSIFICATIONS = ["Hanon", "Kotoha", "はのこと・ハコリリ"]
+GENRES = ["主な出来事", "ライブ", "動画", "その他"]
+SINGERS = ["Hanon", "Kotoha", "はのこと/ハコリリ", "Hanon/Kotoha"]
+CLIP_CATEGORIES = ["歌枠", "雑談", "ゲーム", "コラボ", "その他"]
+WORDS = ["恋", "夢", "ファンファーレ", "サマー", "セッション", "ひかり", "キョリ感", "コガネゾラ", "Lily", "Plage", "花", "空", "歌ってみた", "配信"]
+
+def _text(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(WORDS) for _ in range(n))
+
+def _video_id(i: int) -> str:
+    return f"v{i:010d}"
+
+def _day(rng: random.Random, start: int = 2018, end: int = 2025) -> date:
+    first = date(start, 1, 1)
+    return first + timedelta(days=rng.randrange((date(end, 12, 31) - first).days))
+
+# ---- 合成データ ----
+
+def make_history_db(path: str, n: int, rng: random.Random):
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE history (
+            id INTEGER, year INTEGER, month INTEGER, day INTEGER,
+            classification TEXT, genre TEXT, content TEXT, link TEXT, created_at TEXT)""")
+        rows = []
+        for i in range(n):
+            d = _day(rng)
+            link = f"https://www.youtube.com/watch?v={_video_id(i)}" if rng.random() < 0.7 else None
+            content = _text(rng, rng.randint(2, 6))
+            if rng.random() < 0.1:
+                content += "<br>" + _text(rng, 2)
+            rows.append((i + 1, d.year, d.month, d.day, rng.choice(CLASSIFICATIONS), rng.choice(GENRES), content, link, "2025-01-01 00:00:00"))
+        conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+def make_concert_db(path: str, tours: int, concerts: int, setlists: int, rng: random.Random):
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            CREATE TABLE tours (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, page_link TEXT, goods TEXT, sort_order INTEGER);
+            CREATE TABLE concerts (id INTEGER PRIMARY KEY AUTOINCREMENT, tour_id INTEGER NOT NULL, date TEXT NOT NULL,
+                venue TEXT NOT NULL, name TEXT, performer TEXT);
+            CREATE TABLE setlists (id INTEGER PRIMARY KEY AUTOINCREMENT, concert_id INTEGER NOT NULL, order_no INTEGER NOT NULL,
+                song_title TEXT NOT NULL, singer TEXT, encore INTEGER);
+        """)
+        conn.executemany("INSERT INTO tours (id, name, page_link, goods, sort_order) VALUES (?, ?, ?, ?, ?)", [
+            (t + 1, f"ツアー{t + 1} {_text(rng, 2)}", f"https://example.com/tour/{t + 1}", "", t + 1 if rng.random() < 0.9 else None)
+            for t in range(tours)
+        ])
+        conn.executemany("INSERT INTO concerts (id, tour_id, date, venue, name, performer) VALUES (?, ?, ?, ?, ?, ?)", [
+            (c + 1, rng.randint(1, tours), _day(rng).isoformat(), f"会場{rng.randint(1, 40)}", rng.choice(["昼公演", "夜公演", ""]), rng.choice(CLASSIFICATIONS))
+            for c in range(concerts)
+        ])
+        conn.executemany("INSERT INTO setlists (concert_id, order_no, song_title, singer, encore) VALUES (?, ?, ?, ?, ?)", [
+            (rng.randint(1, concerts), s + 1, _text(rng, 2), rng.choice(SINGERS), 1 if rng.random() < 0.1 else None)
+            for s in range(setlists)
+        ])
+        ensure_concert_indexes(conn)
+
+def _csv_body(header: List[str], rows: List[List]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+def make_sheet_csvs(counts: Dict[str, int], rng: random.Random) -> Dict[str, bytes]:
+    """編集URL → CSV本文"""
+    albums = [f"アルバム{i + 1:05d}" for i in range(counts["albums"])]
+    singles = [f"シングル{i + 1:05d}" for i in range(counts["singles"])]
+    songs = [f"{_text(rng, 2)}{i + 1}" for i in range(counts["songs"])]
+    cds = albums + singles
+
+    def cd_rows(names: List[str]) -> List[List]:
+        return [[
+            name, _day(rng).strftime("%Y-%m-%d"), _text(rng, 3),
+            ",".join(rng.sample(songs, min(len(songs), rng.randint(1, 12)))),
+            ",".join(_video_id(rng.randrange(counts["covers_all"])) for _ in range(rng.randint(0, 2))),
+            _text(rng, 20),
+        ] for name in names]
+
+    cd_header = ["名前", "リリース日", "一言", "収録曲", "視聴動画", "説明"]
+    songs_rows = [[
+        i + 1, name, ",".join(rng.sample(cds, min(len(cds), rng.randint(1, 3)))), rng.choice(SINGERS),
+        rng.choice(["オリジナル", "カバー"]), rng.choice(cds), _day(rng).strftime("%Y/%m/%d"),
+        f"https://www.youtube.com/watch?v={_video_id(i)}", "作詞者", "作曲者", "編曲者", rng.choice(SINGERS),
+        f"Guitar:奏者{i % 7} / Bass:奏者{i % 5} / Mix:エンジニア{i % 3}",
+    ] for i, name in enumerate(songs)]
+    covers_rows = [[
+        _video_id(i), f"{_text(rng, 3)}【Covered by {rng.choice(['Hanon', 'Kotoha'])}】", _day(rng).strftime("%Y/%m/%d"),
+        rng.choice(["Hanon", "Kotoha"]), rng.randint(1000, 5_000_000), rng.choice(["Hanon", "Kotoha", "はのこと", "Hanon,Kotoha"]),
+    ] for i in range(counts["covers_all"])]
+    trending_rows = []
+    for i in range(counts["trending"]):
+        before = rng.randint(1000, 5_000_000)
+        increase = rng.randint(0, 50_000)
+        trending_rows.append([_video_id(i), _text(rng, 3), before, before + increase, increase, _day(rng).strftime("%Y/%m/%d"), rng.choice(["Hanon", "Kotoha"])])
+    clip_rows = [[
+        f"c{i:010d}", _text(rng, 4), _day(rng).strftime("%Y/%m/%d"), rng.choice(CLIP_CATEGORIES),
+    ] for i in range(counts["clips"])]
+
+    return {
+        generate.ALBUMS_SHEET_EDIT_URL: _csv_body(cd_header, cd_rows(albums)),
+        generate.SINGLES_SHEET_EDIT_URL: _csv_body(cd_header, cd_rows(singles)),
+        generate.SONGS_SHEET_EDIT_URL: _csv_body(
+            ["ID", "楽曲名", "収録", "歌唱", "種別", "表紙", "リリース日", "YouTubeリンク", "作詞", "作曲", "編曲", "ボーカル", "クレジット"], songs_rows),
+        generate.COVERS_ALL_SHEET_EDIT_URL: _csv_body(["動画ID", "タイトル", "投稿日（日本時間）", "投稿チャンネル", "再生数", "タグ"], covers_rows),
+        generate.TRENDING_SHEET_EDIT_URL: _csv_body(["動画ID", "タイトル", "1週間前再生数", "現在再生数", "増加数", "投稿日", "チャンネル"], trending_rows),
+        generate.VIDEOS_SHEET_EDIT_URL: _csv_body(["video_id", "タイトル", "投稿日時", "種類"], clip_rows),
+    }
+
+def make_thanks_csv(path: str, n: int, rng: random.Random):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for i in range(n):
+            writer.writerow([f"協力者{i + 1}", rng.choice(["サイト改善アンケート", "情報提供", ""])])
+
+def make_workdir(workdir: str, scale: int, seed: int) -> Dict[str, bytes]:
+    """作業ディレクトリに合成データを作成し、シートのCSV（編集URL → 本文）を返す"""
+    rng = random.Random(seed)
+    counts = {k: max(1, v * scale) for k, v in BASE_COUNTS.items()}
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    make_history_db(os.path.join(workdir, generate.DB_FILE), counts["history"], rng)
+    make_concert_db(os.path.join(workdir, generate.CONCERT_DB), counts["tours"], counts["concerts"], counts["setlists"], rng)
+    make_thanks_csv(os.path.join(workdir, generate.THANKS_CSV), counts["thanks"], rng)
+    return make_sheet_csvs(counts, rng)
+
+# ---- シートのスタブサーバー ----
+
+class SheetStub:
+    """/spreadsheets/d/<sheet_id>/export?format=csv&gid=<gid> に合成CSVを返すHTTPサーバー"""
+
+    def __init__(self, csv_by_edit_url: Dict[str, bytes]):
+        self.bodies: Dict[Tuple[str, str], bytes] = {}
+        for edit_url, body in csv_by_edit_url.items():
+            parts = urlsplit(sheets.build_csv_url(edit_url))
+            self.bodies[(parts.path, parse_qs(parts.query).get("gid", ["0"])[0])] = body
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                body = stub.bodies.get((parts.path, parse_qs(parts.query).get("gid", ["0"])[0]))
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ---- 計測 ----
+
+class Timer:
+    """段階名 → 所要時間（秒）のリスト"""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+def _consume(chunks) -> int:
+    """ジェネレーターを最後まで回して出力文字数を返す"""
+    return sum(len(chunk) for chunk in chunks)
+
+def reset_state():
+    """前回の取得・出力を消して毎回同じ条件で計測"""
+    sheets._csv_bodies.clear()
+    sheets._csv_tables.clear()
+    sheets._ttls.clear()
+    generate.load_view_store.cache_clear()
+    for path in (generate.OUTPUT_FILE, f"{generate.OUTPUT_FILE}.gz", generate.VIEWS_DB):
+        if os.path.exists(path):
+            os.remove(path)
+    for path in (generate_CDs.OUTPUT_DIR, generate_songs.OUTPUT_DIR, sheets.CACHE_DIR, generate.GRID_DATA_DIR, FRAGMENT_DIR, api.API_DIR, os.path.join("data", "manifests")):
+        shutil.rmtree(path, ignore_errors=True)
+    # CDs/ songs/ のアセットは出力ディレクトリごと消えるので復元
+    for path in ASSET_FILES:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        shutil.copyfile(os.path.join(REPO_DIR, path), path)
+
+def run_once(timer: Timer, csv_bodies: Dict[str, bytes]):
+    """ビルドの各段階を順に1回ずつ計測"""
+    reset_state()
+    edit_urls = list(csv_bodies)
+    assets = timer.run("assets.fingerprint", fingerprint_assets)
+    configure_assets(assets)
+    timer.run("sheets.download", sheets.prefetch_csv, edit_urls)
+    timer.run("sheets.csv_parse", lambda: [sheets.fetch_csv_table(u) for u in edit_urls])
+
+    albums = timer.run("fetch_albums_from_sheet", generate.fetch_albums_from_sheet, generate.ALBUMS_SHEET_EDIT_URL)
+    singles = timer.run("fetch_singles_from_sheet", generate.fetch_singles_from_sheet, generate.SINGLES_SHEET_EDIT_URL)
+    songs = timer.run("fetch_release_songs_from_sheet", generate.fetch_release_songs_from_sheet, generate.SONGS_SHEET_EDIT_URL)
+    trending = timer.run("fetch_trending_from_sheet", generate.fetch_trending_from_sheet, generate.TRENDING_SHEET_EDIT_URL)
+    covers_all = timer.run("fetch_covers_all_from_sheet", generate.fetch_covers_all_from_sheet, generate.COVERS_ALL_SHEET_EDIT_URL)
+    store = timer.run("record_views", generate.record_views, covers_all)
+    timer.run("trending_from_views", generate.trending_from_views, covers_all, store)
+    timer.run("fetch_covers_from_sheet", generate.fetch_covers_from_sheet, generate.COVERS_SHEET_EDIT_URL)
+    videos = timer.run("fetch_videos_from_sheet", generate.fetch_videos_from_sheet, generate.VIDEOS_SHEET_EDIT_URL)
+    concerts = timer.run("fetch_concerts_from_db", generate.fetch_concerts_from_db, generate.CONCERT_DB)
+    thanks = timer.run("fetch_thanks_groups", generate.fetch_thanks_groups, generate.THANKS_CSV)
+    cd_albums = timer.run("read_items.albums", generate_CDs.read_items, generate_CDs.ALBUMS_SHEET_EDIT_URL)
+    cd_singles = timer.run("read_items.singles", generate_CDs.read_items, generate_CDs.SINGLES_SHEET_EDIT_URL)
+    songs_detailed = timer.run("read_songs_detailed", generate_songs.read_songs_detailed, generate_songs.SONGS_SHEET_EDIT_URL)
+    songs_index = timer.run("build_songs_index", generate_CDs.build_songs_index, songs_detailed)
+
+    # 年表: 集計（タブ・年ごとの月数）と、分類ごとの表＋検索インデックス
+    timeline = timer.run("fetch_timeline_summary", generate.fetch_timeline_summary)
+    conn = generate.get_conn()
+    try:
+        timer.run("generate_timeline_panels", lambda: _consume(generate.generate_timeline_panels(
+            conn, timeline["classifications"], timeline["month_counts"])))
+    finally:
+        conn.close()
+
+    timer.run("generate_music_section", lambda: _consume(generate.generate_music_section(albums, singles, songs)))
+    timer.run("generate_covers_section", lambda: _consume(generate.generate_covers_section(trending, covers_all)))
+    timer.run("generate_concert_section", lambda: _consume(generate.generate_concert_section(concerts, songs_index)))
+    timer.run("generate_videos_section", lambda: _consume(generate.generate_videos_section(videos)))
+    timer.run("generate_thanks_section", lambda: _consume(generate.generate_thanks_section(thanks)))
+    timer.run("generate_about_section", generate.generate_about_section)
+    timer.run("generate_contribute_section", generate.generate_contribute_section)
+
+    timer.run("render_cd_html", lambda: [generate_CDs.render_cd_html(a, "アルバム", songs_index) for a in cd_albums]
+                                        + [generate_CDs.render_cd_html(s, "シングル", songs_index) for s in cd_singles])
+    timer.run("render_song_html", lambda: [generate_songs.render_song_html(s) for s in songs_detailed])
+
+    datasets = {"albums": albums, "singles": singles, "songs": songs, "trending": trending,
+                "covers_all": covers_all, "videos": videos, "concerts": concerts, "thanks": thanks}
+    timer.run("write.index_html", generate.write_html_stream, generate.generate_index_chunks(timeline, datasets), generate.OUTPUT_FILE)
+    # セクションの描画キャッシュ: 1回目は全セクションを描画して保存、2回目は入力が同じなので全セクションを再利用
+    timer.run("write.index_html.cache_cold", generate.write_html_stream, generate.generate_index_chunks(timeline, datasets, FragmentCache()), generate.OUTPUT_FILE)
+    timer.run("write.index_html.cache_warm", generate.write_html_stream, generate.generate_index_chunks(timeline, datasets, FragmentCache()), generate.OUTPUT_FILE)
+    timer.run("write.cd_pages", generate_CDs.write_cd_pages, cd_albums, cd_singles, songs_index)
+    timer.run("write.song_pages", generate_songs.write_song_pages, songs_detailed)
+    timer.run("write.api", api.write_api, timeline, datasets, concerts, songs_detailed, (cd_albums, cd_singles), songs_index)
+    timer.run("write.gzip", compress_outputs, [generate.OUTPUT_FILE, generate_CDs.OUTPUT_DIR, generate_songs.OUTPUT_DIR])
+
+def _quiet(func: Callable, *args):
+    """生成処理の進捗表示を抑えて実行"""
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        return func(*args)
+    finally:
+        sys.stdout = stdout
+
+def bench_scale(scale: int, repeat: int, seed: int, keep: bool) -> Dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench-x{scale}-")
+    cwd = os.getcwd()
+    try:
+        start = time.perf_counter()
+        csv_bodies = make_workdir(workdir, scale, seed)
+        setup = time.perf_counter() - start
+        os.chdir(workdir)
+        timer = Timer()
+        with SheetStub(csv_bodies) as stub:
+            base = sheets.EXPORT_BASE
+            sheets.EXPORT_BASE = stub.base
+            try:
+                for _ in range(repeat):
+                    _quiet(run_once, timer, csv_bodies)
+            finally:
+                sheets.EXPORT_BASE = base
+        index_bytes = os.path.getsize(generate.OUTPUT_FILE)
+    finally:
+        os.chdir(cwd)
+        if keep:
+            print(f"作業ディレクトリ: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    stages = {
+        name: {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+        for name, runs in timer.stages.items()
+    }
+    total = sum(s["median"] for s in stages.values())
+    return {
+        "counts": {k: max(1, v * scale) for k, v in BASE_COUNTS.items()},
+        "setup_seconds": setup,
+        "index_html_bytes": index_bytes,
+        "total_median": total,
+        "stages": stages,
+    }
+
+# ---- クレジット分解 ----
+
+def _regex_parse_credits(raw: str, pattern: re.Pattern) -> List[Tuple[str, str]]:
+    """以前の parse_credits（役割名の正規表現の交互パターンで finditer）"""
+    if not raw:
+        return []
+    s = raw.strip()
+    parts = []
+    matches = list(pattern.finditer(s))
+    for idx, m in enumerate(matches):
+        label = generate_songs.CREDIT_KEY_MAP.get(m.group(1).lower(), m.group(1).lower())
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(s)
+        value = s[m.end():end].strip().replace(",", "、").strip()
+        if value:
+            parts.append((label, value))
+    return parts
+
+def _regex_credit_pattern(ascii_boundary: bool) -> re.Pattern:
+    """以前の実装のパターン（ascii_boundary=True なら \b を英数字だけで判定する、トライ木と同じ区切り方）"""
+    keys = sorted(generate_songs.CREDIT_KEY_MAP.keys(), key=lambda k: -len(k))
+    flags = "(?ai)" if ascii_boundary else "(?i)"
+    return re.compile(flags + r'\b(' + '|'.join(keys) + r')\b(?:(?u:\s*)[:：]?)')
+
+def _is_cjk(ch: str) -> bool:
+    return ch.isalnum() and not ch.isascii()
+
+def make_credit_strings(n: int, rng: random.Random) -> Tuple[List[str], List[bool]]:
+    """役割名と担当者を並べた合成クレジット（すべて異なる文字列）と、
+    役割名の直前・直後にかな・漢字が続く（コロン無しの「Bass小林修己」など）かどうか"""
+    roles = list(generate_songs.CREDIT_KEY_MAP)
+    out, cjk_adjacent = [], []
+    for i in range(n):
+        text, adjacent = "", False
+        for k in range(rng.randint(2, 8)):
+            role = rng.choice(roles).title() if rng.random() < 0.5 else rng.choice(roles)
+            # 区切り無し（KeyValue）も混ぜる
+            sep = rng.choice([':', '：', ' : ', ' ', ''])
+            value = rng.choice([f"奏者{rng.randint(1, 500)}, Player {i}", f"Player {i}・小林", "小林修己"])
+            join = rng.choice([" / ", " ", "　", ""]) if k else ""
+            if (not sep and _is_cjk(value[0])) or (not join and text and _is_cjk(text[-1])):
+                adjacent = True
+            text += f"{join}{role}{sep}{value}"
+        out.append(text)
+        cjk_adjacent.append(adjacent)
+    return out, cjk_adjacent
+
+def bench_credits(n: int, seed: int) -> Dict:
+    """同じクレジット n 件を 以前の実装（正規表現の交互パターン）とトライ木で分解して比較。
+    結果は \b を英数字だけで判定した以前の実装と一致すること、以前の実装との違いは
+    役割名にかな・漢字が隣接する文字列だけであることを確認"""
+    from credits import CreditTokenizer
+    rng = random.Random(seed)
+    raws, cjk_adjacent = make_credit_strings(n, rng)
+    timings: Dict[str, float] = {}
+
+    pattern = _regex_credit_pattern(ascii_boundary=False)
+    start = time.perf_counter()
+    previous = [_regex_parse_credits(raw, pattern) for raw in raws]
+    timings["regex"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokenizer = CreditTokenizer(generate_songs.CREDIT_KEY_MAP)
+    timings["trie_build"] = time.perf_counter() - start
+    start = time.perf_counter()
+    parsed = tokenizer.tokenize_many(raws)
+    timings["trie"] = time.perf_counter() - start
+
+    ascii_pattern = _regex_credit_pattern(ascii_boundary=True)
+    expected = [_regex_parse_credits(raw, ascii_pattern) for raw in raws]
+    mismatches = sum(1 for a, b in zip(expected, parsed) if a != b)
+    changed = [adjacent for a, b, adjacent in zip(previous, parsed, cjk_adjacent) if a != b]
+    unexpected = changed.count(False)
+    if mismatches or unexpected:
+        print(f"クレジット分解の結果が以前の実装と異なります（区切りを英数字だけで判定した場合との差 {mismatches} 件・"
+              f"かな・漢字の隣接以外での差 {unexpected} 件）")
+    return {"count": n, "seconds": timings, "mismatches": mismatches,
+            "changed_cjk_adjacent": len(changed) - unexpected, "changed_unexpected": unexpected,
+            "cjk_adjacent": sum(cjk_adjacent),
+            "speedup": timings["regex"] / timings["trie"]}
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+def print_results(results: Dict, previous: Dict | None = None):
+    for scale, result in results["scales"].items():
+        old = (previous or {}).get("scales", {}).get(scale, {}).get("stages", {})
+        print(f"\n== x{scale}  合計 {result['total_median'] * 1000:.1f} ms（中央値の和）")
+        for name, stage in result["stages"].items():
+            line = f"  {name:<32} {stage['median'] * 1000:10.2f} ms"
+            if name in old and old[name]["median"] > 0:
+                change = (stage["median"] / old[name]["median"] - 1) * 100
+                line += f"  ({change:+.1f}%)"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="合成データでビルドの各段階を計測")
+    parser.add_argument("--scales", type=int, nargs="+", help=f"データ量の倍率（省略時は {DEFAULT_SCALES}。--credits のみ指定した場合は計測しない）")
+    parser.add_argument("--repeat", type=int, default=3, help="倍率ごとの計測回数")
+    parser.add_argument("--seed", type=int, default=1, help="合成データの乱数シード")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="結果JSONの保存先")
+    parser.add_argument("--compare", help="差分を表示する以前の結果JSON")
+    parser.add_argument("--keep", action="store_true", help="作業ディレクトリを削除しない")
+    parser.add_argument("--credits", type=int, metavar="N", help="クレジット N 件の分解を以前の実装と比較")
+    args = parser.parse_args()
+    scales = args.scales or ([] if args.credits else DEFAULT_SCALES)
+
+    results = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "scales": {},
+    }
+    for scale in scales:
+        print(f"x{scale} を計測中...")
+        results["scales"][str(scale)] = bench_scale(scale, args.repeat, args.seed, args.keep)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    if args.credits:
+        print(f"\nクレジット {args.credits:,} 件を分解中...")
+        credits = results["credits"] = bench_credits(args.credits, args.seed)
+        for name, seconds in credits["seconds"].items():
+            print(f"  {name:<32} {seconds * 1000:10.2f} ms")
+        print(f"  トライ木は以前の実装の {credits['speedup']:.1f} 倍（かな・漢字が隣接する {credits['cjk_adjacent']:,} 件のうち"
+              f" {credits['changed_cjk_adjacent']:,} 件は分解結果が変わる）")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n結果を '{args.output}' に保存しました。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# はのこと活動記録 - サイト一括ビルド
+# - index.html / CDs/*.html / songs/*.html / data/api/v1/（JSON API）を1回のコマンドで生成
+# - 各データソース（シート・DB・CSV）は1回だけ読み込み、解析結果を各生成処理で共有
+# - 依存関係（DAG）に従い、準備できたノードからスレッドプールで並列実行
+# - CSS/JSはハッシュ付きの名前で参照し、出力したHTML/CSS/JSには .gz を添える
+#
+# 使い方: python build.py [index] [cds] [songs] [api]   （省略時はすべて）
+#         --virtual-grids: 歌動画/切り抜き一覧を data/grids/*.json ＋仮想スクロールで出力
+#         --lazy-timeline: 年表は最初のタブの直近の年だけを index.html に含め、他のタブ・古い年は data/timeline/ から読み込む
+#         --minify: 生成HTMLの空白・コメントを削除して出力
+#         --no-section-cache: index.html の全セクションを描き直す（入力が同じセクションの描画結果を data/fragments から使わない）
+#         --page-workers N: 曲/CDの詳細ページをN個のプロセスで描画・出力（出力は並列数によらず同じ）
+#         --profile: 段階ごとの時間・バイト数・行数・メモリピークを表示（--profile-json で保存）
+#         --cprofile <パス>: cProfile の統計を保存（ノードは1スレッドで順に実行）
+
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Tuple
+
+import generate
+import generate_CDs
+import generate_songs
+import common
+import minify
+import fragments
+import api
+import instrument
+from sheets import configure_ttls, prefetch_csv
+from assets import configure_assets, fingerprint_assets, compress_outputs
+from records import CdItem, SongDetail, Tour
+from titles import TitleIndex
+
+BUILD_WORKERS = 4
+# コマンドラインのターゲット名 → 出力ノード
+TARGETS = {"index": "index.html", "cds": "CDs", "songs": "songs", "api": "api"}
+
+def load_sheets():
+    """3つの生成処理が使うシートをまとめて並列取得（同一CSVは1回のみ）"""
+    ttls = {**generate.SHEET_TTLS, **generate_CDs.SHEET_TTLS, **generate_songs.SHEET_TTLS}
+    configure_ttls(ttls)
+    # 伸びた動画を手元の再生数の履歴から集計できる場合はそのシートを取得しない
+    skip = {generate.TRENDING_SHEET_EDIT_URL} if generate.use_local_trending() else set()
+    prefetch_csv([url for url in ttls if url not in skip])
+
+def load_assets():
+    """CSS/JSをハッシュ付きの名前でコピーし、生成ページの参照先に登録"""
+    mapping = fingerprint_assets()
+    configure_assets(mapping)
+    return mapping
+
+def load_history():
+    """年表の概要を集計（DBが無い/空なら None）。レコード本体は index.html の出力時にカーソルから読む"""
+    if not os.path.exists(generate.DB_FILE):
+        print(f"データベースファイル '{generate.DB_FILE}' が見つかりません。")
+        return None
+    timeline = generate.fetch_timeline_summary()
+    if timeline is None:
+        print("データベースにレコードがありません。")
+    return timeline
+
+def load_cd_items(_sheets) -> Tuple[List[CdItem], List[CdItem]]:
+    return (generate_CDs.read_items(generate_CDs.ALBUMS_SHEET_EDIT_URL),
+            generate_CDs.read_items(generate_CDs.SINGLES_SHEET_EDIT_URL))
+
+def write_index(_assets, timeline, sheet_datasets: Dict, concerts: List[Tour], thanks: Dict[str, List[str]], songs_index: TitleIndex):
+    if timeline is None:
+        return
+    datasets = {**sheet_datasets, "concerts": concerts, "thanks": thanks, "titles": songs_index}
+    cache = fragments.FragmentCache() if fragments.ENABLED else None
+    if not generate.write_index_page(timeline, datasets, cache):
+        print(f"'{generate.OUTPUT_FILE}' は変更なし（入力が前回と同じ）")
+        return
+    print(f"年表を '{generate.OUTPUT_FILE}' に生成しました。")
+    if cache is not None:
+        cache.report()
+
+def write_cds(_assets, cd_items: Tuple[List[CdItem], List[CdItem]], songs_index: TitleIndex):
+    albums, singles = cd_items
+    generate_CDs.write_cd_pages(albums, singles, songs_index)
+
+def write_songs(_assets, songs: List[SongDetail]):
+    if not songs:
+        print("楽曲データがありません。")
+        return
+    generate_songs.write_song_pages(songs)
+
+def compress_built(targets: List[str], assets: Dict[str, str]):
+    """生成したページとハッシュ付きアセットの .gz を書き出す"""
+    paths = list(targets)
+    paths += [os.path.join(os.path.dirname(src), name) for src, name in assets.items() if os.path.dirname(src) not in targets]
+    counts = compress_outputs(paths)
+    print(f"gzip: 更新 {counts['written']} / 変更なし {counts['unchanged']} / 削除 {counts['removed']}")
+
+def build_nodes() -> Dict[str, Tuple[List[str], Callable]]:
+    """ノード名 → (依存ノード, 処理)。処理は依存ノードの結果を順に引数として受け取る"""
+    return {
+        # 入力（I/O・解析は各1回）
+        "sheets": ([], load_sheets),
+        "assets": ([], load_assets),
+        "history": ([], load_history),
+        "concerts": ([], lambda: generate.fetch_concerts_from_db(generate.CONCERT_DB)),
+        "thanks": ([], lambda: generate.fetch_thanks_groups(generate.THANKS_CSV)),
+        "index_sheets": (["sheets"], lambda _sheets: generate.load_sheet_datasets()),
+        "cd_items": (["sheets"], load_cd_items),
+        "songs_detailed": (["sheets"], lambda _sheets: generate_songs.read_songs_detailed(generate_songs.SONGS_SHEET_EDIT_URL)),
+        # 曲ページと同じ解析結果から曲名の索引を作る（CDの収録曲・ライブのセトリで共有）
+        "songs_index": (["songs_detailed"], generate_CDs.build_songs_index),
+        # 出力
+        "index.html": (["assets", "history", "index_sheets", "concerts", "thanks", "songs_index"], write_index),
+        "CDs": (["assets", "cd_items", "songs_index"], write_cds),
+        "songs": (["assets", "songs_detailed"], write_songs),
+        "api": (["history", "index_sheets", "concerts", "songs_detailed", "cd_items", "songs_index"], api.write_api),
+    }
+
+def run_node(name: str, func: Callable, *args):
+    with instrument.stage("node", name):
+        return func(*args)
+
+def run_dag(nodes: Dict[str, Tuple[List[str], Callable]], targets: List[str], workers: int = BUILD_WORKERS) -> Dict:
+    """targets とその依存ノードだけを、依存が解決した順に並列実行して結果を返す（workers=0 なら呼び出し元のスレッドで順に実行）"""
+    needed = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(nodes[name][0])
+
+    results: Dict = {}
+    pending = [name for name in nodes if name in needed]
+    if workers <= 0:
+        while pending:
+            name = next(n for n in pending if all(d in results for d in nodes[n][0]))
+            deps, func = nodes[name]
+            results[name] = run_node(name, func, *(results[d] for d in deps))
+            pending.remove(name)
+        return results
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in [n for n in pending if all(d in results for d in nodes[n][0])]:
+                deps, func = nodes[name]
+                running[pool.submit(run_node, name, func, *(results[d] for d in deps))] = name
+                pending.remove(name)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="はのこと活動記録のページを一括生成")
+    parser.add_argument("targets", nargs="*", help=f"生成対象 {'/'.join(TARGETS)}（省略時はすべて）")
+    parser.add_argument("--workers", type=int, default=BUILD_WORKERS, help="並列実行数")
+    parser.add_argument("--virtual-grids", action="store_true", help="歌動画/切り抜き一覧をJSON＋仮想スクロールで出力")
+    parser.add_argument("--lazy-timeline", action="store_true", help="年表の他のタブ・古い年を開いたときに読み込む")
+    parser.add_argument("--minify", action="store_true", help="生成HTMLの空白・コメントを削除して出力")
+    parser.add_argument("--no-section-cache", action="store_true", help="index.html の全セクションを描き直す")
+    parser.add_argument("--page-workers", type=int, default=common.PAGE_WORKERS, help="詳細ページを描画するプロセス数（0/1 = 並列化しない）")
+    parser.add_argument("--profile", action="store_true", help="段階ごとの時間・バイト数・行数・メモリピークを表示")
+    parser.add_argument("--profile-json", help="計測結果の保存先（JSON、--profile を含む）")
+    parser.add_argument("--cprofile", help="cProfile の統計の保存先（ノードは1スレッドで順に実行）")
+    args = parser.parse_args()
+    if args.virtual_grids:
+        generate.VIRTUAL_GRIDS = True
+    if args.lazy_timeline:
+        generate.LAZY_TIMELINE = True
+    if args.minify:
+        minify.ENABLED = True
+    if args.no_section_cache:
+        fragments.ENABLED = False
+    common.PAGE_WORKERS = args.page_workers
+    unknown = [t for t in args.targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"不明なターゲット: {', '.join(unknown)}")
+    if args.profile or args.profile_json:
+        instrument.ENABLED = True
+    if instrument.ENABLED:
+        instrument.start()
+    targets = [TARGETS[t] for t in (args.targets or TARGETS)]
+    if args.cprofile:
+        results = instrument.profile_call(args.cprofile, run_dag, build_nodes(), targets, workers=0)
+    else:
+        results = run_dag(build_nodes(), targets, workers=args.workers)
+    # api だけの場合はアセットを読み込まない（ハッシュ付きアセットの圧縮も無し）
+    compress_built(targets, results.get("assets", {}))
+    instrument.report(args.profile_json or "")
+
+if __name__ == "__main__":
+    main()
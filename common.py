@@ -0,0 +1,211 @@
+# はのこと活動記録 - generate*.py 共通ユーティリティ
+# - シートのセル値の変換（数値・日付）
+# - 曲ページ/CDページのスラッグ生成（ファイル名とリンクで同じ規則を使う）
+# - 詳細ページの差分出力（スラッグ → 内容ハッシュ のマニフェストで変更ページのみ書き込み）
+# - 詳細ページの描画・出力をプロセスプールで並列化（任意。PAGE_WORKERS / build.py --page-workers）
+
+import os
+import re
+import json
+import hashlib
+import calendar
+import functools
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+import minify
+import instrument
+from assets import asset_mapping, configure_assets
+
+# 詳細ページのマニフェスト保存先（出力ディレクトリ名.json）
+MANIFEST_DIR = os.path.join("data", "manifests")
+# 詳細ページを描画・出力するプロセス数（0/1 = このプロセスで順に処理）と、1回に渡すページ数
+PAGE_WORKERS = int(os.environ.get("PAGE_WORKERS", "0") or 0)
+PAGE_BATCH = 64
+
+def to_int(val: str) -> int:
+    s = val or ""
+    # 数字だけのセル（大半）はそのまま変換
+    if s.isdigit() and s.isascii():
+        return int(s)
+    s = s.replace(",", "").replace("回", "").replace(" ", "")
+    try:
+        return int(s)
+    except:
+        return 0
+
+# 「2024/1/5」「2024-01-05」のような年月日そろった表記（区切りは同じ文字）
+_YMD_RE = re.compile(r"([0-9]{4})([/.-])([0-9]{1,2})\2([0-9]{1,2})")
+
+@functools.lru_cache(maxsize=4096)
+def to_iso_date(s: str) -> str:
+    """日付表記 → YYYY-MM-DD（同じ表記は1回だけ解析）"""
+    s = (s or "").strip()
+    m = _YMD_RE.fullmatch(s)
+    if m:
+        y, mo, da = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        # 実在する日付だけ（それ以外は従来どおり strptime → 正規表現の順に試す）
+        if y >= 1000 and 1 <= mo <= 12 and 1 <= da <= calendar.monthrange(y, mo)[1]:
+            return f"{y}-{mo:02d}-{da:02d}"
+    if not s:
+        return ""
+    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y.%m.%d", "%Y/%m", "%Y-%m"):
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+        except:
+            pass
+    m = re.search(r"(\d{4})[./-]?(\d{1,2})(?:[./-]?(\d{1,2}))?", s)
+    if m:
+        y, mo, da = m.group(1), m.group(2).zfill(2), (m.group(3) or "01").zfill(2)
+        return f"{y}-{mo}-{da}"
+    return ""
+
+def make_song_slug(name: str, sheet_id: int) -> str:
+    """曲ページ用の安全なファイル名を生成（ID付き）"""
+    base = (name or "").strip()
+    # Windows不可文字を除去
+    base = re.sub(r'[\\/:*?"<>|]', '', base)
+    base = re.sub(r'\s+', '_', base)
+    return f"{sheet_id}-{base}" if sheet_id and sheet_id > 0 else base
+
+def make_cd_slug(name: str) -> str:
+    """CDページ用の安全なファイル名を生成（名前のみでスラッグ化）"""
+    base = (name or "").strip()
+    base = re.sub(r'[\\/:*?"<>|]', '', base)  # Windows不可文字を除去
+    base = re.sub(r'\s+', '_', base)          # 空白→アンダースコア
+    return base or "untitled"
+
+@instrument.timed("write")
+def write_atomic(path: str, content: str):
+    """一時ファイルに書いてから置き換え（途中で止まっても壊れたファイルを残さない）"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    if instrument.ENABLED:
+        instrument.add(bytes=os.path.getsize(path))
+
+def write_if_changed(path: str, content: str) -> bool:
+    """内容が変わった場合だけ書き込む（書き込んだら True）"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_atomic(path, content)
+    return True
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _emit_page(output_dir: str, slug: str, html: str, old_digest: str | None) -> Tuple[str, bool]:
+    """1ページを出力（内容が変わった場合のみ書き込み）。(内容ハッシュ, 書き込んだか) を返す"""
+    if minify.ENABLED:
+        size = len(html.encode("utf-8"))
+        html = minify.minify_html(html)
+        minify.report(f"{output_dir}/{slug}.html", size, len(html.encode("utf-8")))
+    digest = _content_hash(html)
+    path = os.path.join(output_dir, f"{slug}.html")
+    if old_digest is None and os.path.exists(path):
+        # マニフェスト未登録の既存ページは中身で比較（初回に全ページを書き直さない）
+        with open(path, encoding="utf-8") as f:
+            old_digest = _content_hash(f.read())
+    if old_digest == digest and os.path.exists(path):
+        return digest, False
+    write_atomic(path, html)
+    return digest, True
+
+def _manifest_path(output_dir: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{os.path.basename(os.path.normpath(output_dir))}.json")
+
+def _load_manifest(output_dir: str) -> Dict[str, str]:
+    manifest_path = _manifest_path(output_dir)
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+def _finish_pages(output_dir: str, previous: Dict[str, str], current: Dict[str, str], written: int,
+                  prune: bool = True) -> Dict[str, int]:
+    """前回出力して今回無いページを削除し、マニフェストを保存
+    （prune=False なら削除せずマニフェストに残す。読めなかったシートのページを消さないため）"""
+    removed = 0
+    count = len(current)
+    stale = sorted(previous.keys() - current.keys())
+    if not prune:
+        current = {**{slug: previous[slug] for slug in stale}, **current}
+        stale = []
+    for slug in stale:
+        path = os.path.join(output_dir, f"{slug}.html")
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    write_atomic(_manifest_path(output_dir), json.dumps(dict(sorted(current.items())), ensure_ascii=False, indent=2))
+    instrument.add(rows=count)
+    return {"written": written, "unchanged": count - written, "removed": removed}
+
+@instrument.timed("write")
+def emit_pages(output_dir: str, pages: Iterable[Tuple[str, str]], prune: bool = True) -> Dict[str, int]:
+    """(スラッグ, HTML) を出力。内容が変わったページのみ書き込み、前回出力して今回無いページは削除（prune=True の場合）"""
+    os.makedirs(output_dir, exist_ok=True)
+    previous = _load_manifest(output_dir)
+    current: Dict[str, str] = {}
+    written = 0
+    for slug, html in pages:
+        digest, changed = _emit_page(output_dir, slug, html, previous.get(slug))
+        current[slug] = digest
+        written += changed
+    return _finish_pages(output_dir, previous, current, written, prune)
+
+# ワーカープロセス内の設定（_init_page_worker で設定）
+_worker_render: Callable | None = None
+_worker_previous: Dict[str, str] = {}
+
+def _init_page_worker(render: Callable, previous: Dict[str, str], minify_enabled: bool, asset_mapping: Dict[str, str]):
+    """ワーカープロセスに描画関数・前回のマニフェスト・親プロセスの設定（圧縮の有無・アセット名）を1回だけ渡す"""
+    global _worker_render, _worker_previous
+    _worker_render = render
+    _worker_previous = previous
+    minify.ENABLED = minify_enabled
+    configure_assets(asset_mapping)
+
+def _emit_batch(output_dir: str, batch: List) -> List[Tuple[str, str, bool]]:
+    """ワーカーで1バッチ分のページを描画・出力。(スラッグ, 内容ハッシュ, 書き込んだか) のリストを返す"""
+    out = []
+    for item in batch:
+        slug, html = _worker_render(item)
+        digest, changed = _emit_page(output_dir, slug, html, _worker_previous.get(slug))
+        out.append((slug, digest, changed))
+    return out
+
+@instrument.timed("write")
+def emit_rendered_pages(output_dir: str, render: Callable, items: List, workers: int | None = None,
+                        prune: bool = True) -> Dict[str, int]:
+    """render(item) → (スラッグ, HTML) で描画して出力。workers（未指定時は PAGE_WORKERS）が2以上ならプロセスプールで描画・書き込み
+    （PAGE_BATCH 件ずつ渡してプロセス間通信を減らす。結果は入力順にまとめるので並列数によらず同じ出力）"""
+    # CPU数を超えるプロセスは起動しない（1コアなら順に処理）
+    workers = min(PAGE_WORKERS if workers is None else workers, os.cpu_count() or 1)
+    if workers < 2 or len(items) <= PAGE_BATCH:
+        return emit_pages(output_dir, map(render, items), prune)
+
+    os.makedirs(output_dir, exist_ok=True)
+    previous = _load_manifest(output_dir)
+    batches = [items[i:i + PAGE_BATCH] for i in range(0, len(items), PAGE_BATCH)]
+    current: Dict[str, str] = {}
+    written = 0
+    # ビルドはスレッドからも呼ぶので fork ではなく spawn で起動
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_page_worker,
+                             initargs=(render, previous, minify.ENABLED, asset_mapping())) as pool:
+        for results in pool.map(_emit_batch, [output_dir] * len(batches), batches):
+            for slug, digest, changed in results:
+                current[slug] = digest
+                written += changed
+    return _finish_pages(output_dir, previous, current, written, prune)
@@ -0,0 +1,87 @@
+# はのこと活動記録 - クレジット文字列の分解（generate_songs.py から使用）
+# - 役割名（英語）の辞書を1回だけトライ木にまとめ、共通の接頭辞を共有した1つのパターンに変換
+#   （"drum" → "drums" / "drum technician" のように枝分かれ。同じ位置では最長一致）
+# - 役割名の前後は英数字でなければ区切りとみなす（「Bass小林修己」のようなコロン無しの表記も拾う）
+# - split() で「役割名」と「値」を交互に取り出す（一致ごとの Match オブジェクトも小文字化した写しも作らない）
+# - 複数のクレジットは1つの文字列につないで1回で分解できる（同じ文字列は1回だけ分解）
+
+import re
+from typing import Dict, Iterable, List, Tuple
+
+
+def _trie_pattern(keys: Iterable[str]) -> str:
+    """キーのトライ木を正規表現に変換（子は先頭文字がすべて異なるので、貪欲な照合がそのまま最長一致になる）"""
+    root: Dict = {}
+    for key in keys:
+        node = root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # ここで終わるキーがあれば、続きは省略可能（長い方から試す）
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(root)
+
+# 連結したクレジットの境目（役割名にも区切りの空白にも含まれない文字）
+_JOIN = "\x00"
+
+class CreditTokenizer:
+    """役割名 → 表示名 の辞書から作るクレジット分解器。
+    以前の正規表現（\b がかな・漢字も単語の文字とみなす）と違い、「Bass小林修己」「小林Bass」のように
+    役割名にかな・漢字が隣接していても役割名として分解する（それ以外の結果は同じ）"""
+
+    def __init__(self, roles: Dict[str, str]):
+        self._labels = {key.lower(): label for key, label in roles.items()}
+        # (?a): 大文字小文字の同一視と \b を英数字だけで判定（かな・漢字が続いても区切りになる）
+        # 役割名の後の空白と区切り（: / ：）は split で一緒に取り除く（空白は全角も含める）
+        self._pattern = re.compile(r"(?ai)\b(" + _trie_pattern(self._labels) + r")\b(?:(?u:\s*)[:：])?")
+        self._cache: Dict[str, List[Tuple[str, str]]] = {}
+
+    def _split(self, raws: List[str]) -> List[List[Tuple[str, str]]]:
+        """raws をつないで1回の split で分解（「役割名」と「値」が交互に並ぶ）"""
+        labels = self._labels
+        pieces = self._pattern.split(_JOIN.join(raw.strip() for raw in raws))
+        results: List[List[Tuple[str, str]]] = [[] for _ in raws]
+        k = pieces[0].count(_JOIN)
+        parts = results[k]
+        for role, value in zip(pieces[1::2], pieces[2::2]):
+            label = labels[role.lower()]
+            if _JOIN in value:
+                # 値は境目まで。境目の先は次のクレジット（役割名の無いものは飛ばす）
+                value, _, rest = value.partition(_JOIN)
+                value = value.strip()
+                if value:
+                    parts.append((label, value.replace(",", "、")))
+                k += rest.count(_JOIN) + 1
+                parts = results[k]
+                continue
+            value = value.strip()
+            if value:
+                parts.append((label, value.replace(",", "、")))
+        return results
+
+    def tokenize(self, raw: str) -> List[Tuple[str, str]]:
+        """クレジット文字列を (表示名, 値) のリストに分解（値が空の役割は省く。値中の「,」は「、」に置換）。
+        結果は分解器内で共有するので書き換えないこと"""
+        if not raw:
+            return []
+        cached = self._cache.get(raw)
+        if cached is None:
+            cached = self._cache[raw] = self._split([raw])[0]
+        return cached
+
+    def tokenize_many(self, raws: Iterable[str]) -> List[List[Tuple[str, str]]]:
+        """複数のクレジット文字列をまとめて分解（未分解のものはつないで1回の split で処理）"""
+        raws = list(raws)
+        cache = self._cache
+        todo = [raw for raw in dict.fromkeys(raws) if raw and raw not in cache]
+        if todo:
+            for raw, parts in zip(todo, self._split(todo)):
+                cache[raw] = parts
+        return [cache[raw] if raw else [] for raw in raws]
@@ -0,0 +1,72 @@
+# はのこと活動記録 - index.html のセクション単位の描画キャッシュ（generate.py / build.py から使用）
+# - セクションごとに「描画に使う入力」のハッシュをキーにして、描画結果を data/fragments/<セクション>.<キー>.html に保存
+# - 入力は呼び出し側で並べる（シートは取得したCSV本文、年表DB・ライブDB・Thanks はファイルの中身、描画コードはソースの中身。
+#   伸びた動画の集計結果・セトリの曲名の照合結果など、元の本文から決まらない値はその値そのもの）
+# - キーが前回と同じセクションは保存済みの断片を読むだけ。変わったセクションだけ描き直し、そのセクションの古い断片は削除
+# - 圧縮（--minify）は組み立てた後に行うので、断片は圧縮前の HTML
+
+import os
+import glob
+import hashlib
+from typing import Callable, Iterable, List
+from common import write_atomic
+
+ENABLED = os.environ.get("SECTION_CACHE", "1") != "0"
+FRAGMENT_DIR = os.path.join("data", "fragments")
+KEY_LENGTH = 20
+
+def file_digest(*paths: str) -> str:
+    """ファイルの中身のハッシュ（複数なら順につないだもの。無いファイルは空として扱う）"""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(path.encode("utf-8") + b"\x00")
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        except FileNotFoundError:
+            h.update(b"\x01")
+    return h.hexdigest()
+
+def input_key(*parts) -> str:
+    """入力（レコードのリスト・辞書・文字列など）の repr をつないだハッシュ"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(repr(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:KEY_LENGTH]
+
+class FragmentCache:
+    """セクション名とキー → 描画済みの HTML"""
+
+    def __init__(self, directory: str = FRAGMENT_DIR):
+        self.directory = directory
+        self.reused: List[str] = []
+        self.rendered: List[str] = []
+
+    def _path(self, section: str, key: str) -> str:
+        return os.path.join(self.directory, f"{section}.{key}.html")
+
+    def fetch(self, section: str, key: str, render: Callable[[], Iterable[str]], refresh: bool = False) -> str:
+        """保存済みの断片を返す（無い・refresh=True なら render() で描画して保存）"""
+        path = self._path(section, key)
+        if not refresh:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    html = f.read()
+                self.reused.append(section)
+                return html
+            except FileNotFoundError:
+                pass
+        html = "".join(render())
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(path, html)
+        for old in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(section)}.*.html")):
+            if old != path:
+                os.remove(old)
+        self.rendered.append(section)
+        return html
+
+    def report(self):
+        rendered = "、".join(self.rendered) or "なし"
+        print(f"index.html のセクション: 再利用 {len(self.reused)} / 描き直し {len(self.rendered)}（{rendered}）")
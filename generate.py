@@ -4,16 +4,37 @@
 # - ロジックは変更なし
 
 import sqlite3
-from typing import List, Dict
+import re
+from typing import Callable, List, Dict, Iterable, Iterator, Tuple
 from collections import defaultdict
+from contextlib import closing
+from itertools import groupby
 import os
 from datetime import datetime, timedelta
 import csv
-import urllib.request
-import io
+import json
+import hashlib
+import functools
+from html import unescape
+from sheets import configure_ttls, prefetch_csv, csv_digest
+from schema import SheetSchema, Column
+from viewstore import ViewStore, today
+from titles import TitleIndex, report_unresolved
+from fragments import FragmentCache, file_digest, input_key
+from common import to_int, to_iso_date, make_song_slug, make_cd_slug, write_atomic, write_if_changed, MANIFEST_DIR
+from assets import asset_url, asset_mapping
+from records import (
+    HistoryRecord, CoverVideo, TrendingVideo, ClipVideo, Release, ReleaseSong,
+    Tour, Concert, SetlistEntry, intern, video_entity,
+)
+import minify
+import instrument
+from templates import Template, CAROUSEL_OPEN, CAROUSEL_CLOSE
 
 DB_FILE = "data/history.db"
 OUTPUT_FILE = "index.html"
+# 追加: 前回の出力時の入力の指紋・最終更新の日時・出力のハッシュ
+INDEX_STATE_FILE = os.path.join(MANIFEST_DIR, "index.json")
 THANKS_CSV = "data/thanks.csv"
 # 追加: ライブ管理DB（Z_concert-db管理で生成）
 CONCERT_DB = "X_concert.db"
@@ -29,6 +50,40 @@ ALBUMS_SHEET_EDIT_URL = "https://docs.google.com/spreadsheets/d/1JxMwz-tLJlrP2wj
 SINGLES_SHEET_EDIT_URL = "https://docs.google.com/spreadsheets/d/1JxMwz-tLJlrP2wjoWqDOOC3oly2qIGp9FDNJSpdu3Sc/edit?gid=1975989717#gid=1975989717"
 # 追加: リリース楽曲一覧（リリース）取得用URL
 SONGS_SHEET_EDIT_URL = "https://docs.google.com/spreadsheets/d/1JxMwz-tLJlrP2wjoWqDOOC3oly2qIGp9FDNJSpdu3Sc/edit?gid=0#gid=0"
+# 追加: index.html 生成で使うシート一覧（ビルド開始時にまとめて並列取得）
+INDEX_SHEET_EDIT_URLS = [
+    ALBUMS_SHEET_EDIT_URL,
+    SINGLES_SHEET_EDIT_URL,
+    SONGS_SHEET_EDIT_URL,
+    TRENDING_SHEET_EDIT_URL,
+    COVERS_ALL_SHEET_EDIT_URL,
+    VIDEOS_SHEET_EDIT_URL,
+]
+# 追加: 歌動画ALL表の再生数の時系列（ビルドごとに記録）。TRENDING_DAYS 日分たまったら伸びた動画シートの代わりに使う
+VIEWS_DB = os.path.join("data", "views.db")
+TRENDING_DAYS = 7
+# 記録した再生数を views.db に保存するか（手元プレビューではメモリ上に記録するだけ）
+SAVE_VIEWS = True
+# 追加: 歌動画/切り抜き一覧をJSON＋仮想スクロールで描画するモード（VIRTUAL_GRIDS=1 で有効）
+VIRTUAL_GRIDS = os.environ.get("VIRTUAL_GRIDS", "") == "1"
+GRID_DATA_DIR = os.path.join("data", "grids")
+# 一覧のJSONの置き場（None なら GRID_DATA_DIR に書き出す。手元プレビューでは 名前 → 本文 をメモリ上に置く）
+GRID_PAYLOADS: Dict[str, str] | None = None
+# 追加: 年表の遅延読み込みモード（LAZY_TIMELINE=1 で有効）。最初のタブの直近 INLINE_YEARS 年だけを index.html に含め、
+# 他のタブの中身・古い年は data/timeline/ の断片ファイルをタブ/年を開いたときに読み込む
+LAZY_TIMELINE = os.environ.get("LAZY_TIMELINE", "") == "1"
+TIMELINE_FRAGMENT_DIR = os.path.join("data", "timeline")
+TIMELINE_MANIFEST = os.path.join(TIMELINE_FRAGMENT_DIR, "index.json")
+INLINE_YEARS = 2
+# シートごとのキャッシュ有効期限（秒）。リリース情報は更新頻度が低いので長め、再生数系は毎回確認
+SHEET_TTLS = {
+    ALBUMS_SHEET_EDIT_URL: 6 * 3600,
+    SINGLES_SHEET_EDIT_URL: 6 * 3600,
+    SONGS_SHEET_EDIT_URL: 6 * 3600,
+    VIDEOS_SHEET_EDIT_URL: 3600,
+    TRENDING_SHEET_EDIT_URL: 0,
+    COVERS_ALL_SHEET_EDIT_URL: 0,
+}
 
 def get_conn():
     """SQLite データベース接続を取得"""
@@ -36,47 +91,106 @@ def get_conn():
     conn.row_factory = sqlite3.Row
     return conn
 
-def fetch_records() -> List[Dict]:
-    """データベースから全レコードを取得"""
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT year, month, day, classification, genre, content, link FROM history ORDER BY year, month, day")
-        return [dict(row) for row in cur.fetchall()]
-
-def group_records_by_classification_and_date(records: List[Dict]) -> Dict:
-    """レコードを分類ごとにグループ化し、さらに年と月ごとに整理"""
-    grouped = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(list))))
-    for record in records:
-        year = f"{record['year']}年"
-        month = f"{record['month']}月"
-        grouped[record['classification']][year][month][record['genre']].append(record)
-    return grouped
-
-def format_content(record: Dict) -> str:
+TIMELINE_GENRES = ["主な出来事", "ライブ", "動画", "その他"]
+# ジャンルを表の列順に並べる（列に無いジャンルは末尾）
+_GENRE_ORDER_SQL = "CASE genre " + " ".join(f"WHEN '{g}' THEN {i}" for i, g in enumerate(TIMELINE_GENRES)) + f" ELSE {len(TIMELINE_GENRES)} END"
+
+@instrument.timed("query")
+def fetch_timeline_summary() -> Dict | None:
+    """年表の概要（タブ順の分類・分類ごとの件数・年ごとの月数）を集計クエリで取得（レコードが無ければ None）"""
+    with closing(get_conn()) as conn:
+        # タブ順は日付順で最初に現れた順
+        counts = {
+            row["classification"]: row["n"]
+            for row in conn.execute("""
+                SELECT classification, COUNT(*) AS n, MIN(seq) AS first_seq
+                FROM (SELECT classification, ROW_NUMBER() OVER (ORDER BY year, month, day, rowid) AS seq FROM history)
+                GROUP BY classification
+                ORDER BY first_seq
+            """)
+        }
+        if not counts:
+            return None
+        month_counts = {
+            (row["classification"], row["year"]): row["n"]
+            for row in conn.execute("SELECT classification, year, COUNT(DISTINCT month) AS n FROM history GROUP BY classification, year")
+        }
+    return {"classifications": list(counts), "counts": counts, "month_counts": month_counts}
+
+def iter_timeline_records(conn: sqlite3.Connection, classification: str) -> Iterator[HistoryRecord]:
+    """分類のレコードを 年・月・ジャンル（列順）・日 の順にカーソルから1件ずつ返す"""
+    cur = conn.cursor()
+    cur.row_factory = lambda _cur, row: HistoryRecord._make(row)
+    return cur.execute(
+        f"SELECT year, month, day, genre, content, link FROM history WHERE classification=? "
+        f"ORDER BY year, month, {_GENRE_ORDER_SQL}, day, rowid",
+        (classification,)
+    )
+
+def format_content(record: HistoryRecord) -> str:
     """レコードの内容をフォーマット"""
-    day_content = f"{record['day']}日:{record['content']}"
-    return f"<a href='{record['link']}' target='_blank'>{day_content}</a>" if record['link'] else day_content
-
-def generate_table_rows(years: Dict) -> List[str]:
-    """テーブル行を生成"""
-    rows = []
-    genres = ["主な出来事", "ライブ", "動画", "その他"]
-    
-    for year, months in years.items():
-        year_rowspan = len(months)
-        for idx, (month, genre_data) in enumerate(months.items()):
+    day_content = f"{record.day}日:{record.content}"
+    return f"<a href='{record.link}' target='_blank'>{day_content}</a>" if record.link else day_content
+
+def generate_year_rows(records: Iterable[HistoryRecord], year_months: Dict[int, int], masks: Dict[str, int] | None = None) -> Iterator[Tuple[int, List[str]]]:
+    """年・月・ジャンル順のレコード列から1パスで (年, その年のテーブル行) を年ごとに返す
+    year_months: 年 → 月数（rowspan）。masks を渡すと検索インデックス用の n-gram を集める（ビットは年の順番）"""
+    for group, (year, year_records) in enumerate(groupby(records, key=lambda r: r.year)):
+        rows: List[str] = []
+        for month, month_records in groupby(year_records, key=lambda r: r.month):
             row_parts = []
-            if idx == 0:
-                row_parts.append(f"<td rowspan='{year_rowspan}' class='date fit'>{year}</td>")
-            row_parts.append(f"<td class='date fit'>{month}</td>")
-            
-            for genre in genres:
-                contents = "<br>".join(format_content(r) for r in genre_data.get(genre, []))
+            if not rows:
+                row_parts.append(f"<td rowspan='{year_months.get(year, 1)}' class='date fit'>{year}年</td>")
+            row_parts.append(f"<td class='date fit'>{month}月</td>")
+
+            cells = dict.fromkeys(TIMELINE_GENRES, "")
+            for genre, items in groupby(month_records, key=lambda r: r.genre):
+                if genre in cells:
+                    cells[genre] = "<br>".join(format_content(r) for r in items)
+            for contents in cells.values():
                 row_parts.append(f"<td class='fix'>{contents}</td>")
-            
-            rows.append(f"<tr>{''.join(row_parts)}</tr>")
-    return rows
 
+            row = f"<tr>{''.join(row_parts)}</tr>"
+            if masks is not None:
+                add_search_grams(masks, row, group)
+            rows.append(row)
+        yield year, rows
+
+def generate_table_rows(records: Iterable[HistoryRecord], year_months: Dict[int, int], masks: Dict[str, int] | None = None) -> Iterator[str]:
+    """テーブル行を年ごとに <tbody> でまとめて生成（検索では年単位で表示/非表示）"""
+    for _year, rows in generate_year_rows(records, year_months, masks):
+        yield "<tbody>"
+        yield from rows
+        yield "</tbody>"
+
+# 追加: 年表検索用の n-gram インデックス
+def add_search_grams(masks: Dict[str, int], row_html: str, group: int):
+    """行の textContent と同じ文字列（タグを除き、文字参照は戻す）の1文字・2文字 n-gram に年グループのビットを立てる"""
+    text = unescape(re.sub(r"<[^>]+>", "", row_html)).lower()
+    for gram in set(text) | {text[i:i + 2] for i in range(len(text) - 1)}:
+        masks[gram] |= 1 << group
+
+def build_timeline_search_index(masks: Dict[str, int], groups: int) -> Dict:
+    """n-gram → 含む年グループ（<tbody> の順番）のビットマスク
+    同じマスクの n-gram は連結して1つの文字列にまとめる（uni: 1文字ずつ、bi: 2文字ずつ）"""
+    uni: Dict[int, List[str]] = defaultdict(list)
+    bi: Dict[int, List[str]] = defaultdict(list)
+    for gram in sorted(masks):
+        (uni if len(gram) == 1 else bi)[masks[gram]].append(gram)
+    return {
+        "v": 1,
+        "groups": groups,
+        "uni": {str(mask): "".join(grams) for mask, grams in sorted(uni.items())},
+        "bi": {str(mask): "".join(grams) for mask, grams in sorted(bi.items())},
+    }
+
+def generate_timeline_search_index(masks: Dict[str, int], groups: int) -> str:
+    """検索インデックスをパネル内に埋め込む <script type='application/json'>"""
+    body = json.dumps(build_timeline_search_index(masks, groups), ensure_ascii=False, separators=(",", ":"))
+    body = body.replace("</", "<\\/")
+    return f"<script type='application/json' class='timeline-search-index'>{body}</script>"
+
+@instrument.timed("parse")
 def fetch_thanks_groups(csv_path: str) -> Dict[str, List[str]]:
     """CSVから分類ごとに名前リストを取得（1列目:名前, 2列目:分類）"""
     groups = defaultdict(list)
@@ -90,139 +204,143 @@ def fetch_thanks_groups(csv_path: str) -> Dict[str, List[str]]:
                     groups[group].append(name)
     return groups
 
-def build_csv_url(edit_url: str) -> str:
-    """編集URLからCSVエクスポートURLを生成（gid未指定時は0）"""
-    parts = edit_url.split("/d/")
-    if len(parts) < 2:
-        return ""
-    sheet_id = parts[1].split("/")[0]
-    gid = "0"
-    if "gid=" in edit_url:
-        try:
-            gid = edit_url.split("gid=")[1].split("&")[0].split("#")[0]
-        except:
-            gid = "0"
-    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
-
-def fetch_csv_rows(edit_url: str) -> List[Dict]:
-    """CSVエクスポートURLから行を取得してDictのリストに変換"""
-    rows: List[Dict] = []
-    try:
-        csv_url = build_csv_url(edit_url)
-        if not csv_url:
-            return rows
-        with urllib.request.urlopen(csv_url, timeout=10) as resp:
-            data = resp.read().decode("utf-8", errors="ignore")
-        reader = csv.DictReader(io.StringIO(data))
-        rows = [r for r in reader]
-    except Exception as e:
-        print(f"CSV取得に失敗: {e}")
-    return rows
+# 切り抜き(非公式)シート
+VIDEOS_SCHEMA = SheetSchema("ClipRow",
+    Column("category", "種類"),
+    Column("date_str", "投稿日時"),
+    Column("video_id", "video_id"),
+    Column("title", "タイトル"),
+)
 
-# 追加: 共通ユーティリティ（重複削減）
-def to_int(val: str) -> int:
-    s = (val or "").replace(",", "").replace("回", "").replace(" ", "")
+@functools.lru_cache(maxsize=4096)
+def parse_clip_date(date_str: str) -> datetime:
+    """切り抜きの投稿日時（YYYY/MM/DD）。解析できなければ datetime.min"""
     try:
-        return int(s)
+        return datetime.strptime(date_str, "%Y/%m/%d")
     except:
-        return 0
+        return datetime.min
 
-def to_iso_date(s: str) -> str:
-    s = (s or "").strip()
-    if not s:
-        return ""
-    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y.%m.%d", "%Y/%m", "%Y-%m"):
-        try:
-            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
-        except:
-            pass
-    import re
-    m = re.search(r"(\d{4})[./-]?(\d{1,2})(?:[./-]?(\d{1,2}))?", s)
-    if m:
-        y, mo, da = m.group(1), m.group(2).zfill(2), (m.group(3) or "01").zfill(2)
-        return f"{y}-{mo}-{da}"
-    return ""
-
-def fetch_videos_from_sheet(edit_url: str) -> Dict[str, List[Dict]]:
+@instrument.timed("parse")
+def fetch_videos_from_sheet(edit_url: str) -> Dict[str, List[ClipVideo]]:
     """Googleスプレッドシートから切り抜き(非公式)データを取得（種類ごとに分類）"""
     videos = defaultdict(list)
     try:
-        for row in fetch_csv_rows(edit_url):
-            category = (row.get("種類") or "").strip() or "その他"
-            date_str = (row.get("投稿日時") or "").strip()
-            try:
-                date_obj = datetime.strptime(date_str, "%Y/%m/%d")
-            except:
-                date_obj = datetime.min
-            video_id = (row.get("video_id") or "").strip()
-            title = (row.get("タイトル") or "").strip()
-            if not video_id:
+        for row in VIDEOS_SCHEMA.rows(edit_url):
+            if not row.video_id:
                 continue
-            videos[category].append({
-                "video_id": video_id,
-                "title": title,
-                "date": date_str,
-                "date_obj": date_obj
-            })
+            category = row.category or "その他"
+            videos[intern(category)].append(ClipVideo(video_entity(row.video_id, row.title), intern(row.title), row.date_str, parse_clip_date(row.date_str)))
         for category in videos:
-            videos[category].sort(key=lambda x: x["date_obj"], reverse=True)
+            videos[category].sort(key=lambda x: x.date_obj, reverse=True)
     except Exception as e:
         print(f"切り抜き(非公式)データ取得に失敗: {e}")
     return videos
 
-def fetch_covers_from_sheet(edit_url: str, top_n: int = 10) -> List[Dict]:
+# 歌動画（100万未満）シート
+COVERS_SCHEMA = SheetSchema("CoverRow",
+    Column("video_id", "動画ID"),
+    Column("views", "再生数", convert=to_int),
+    Column("title", "タイトル"),
+    Column("published", "投稿日（日本時間）"),
+)
+
+@instrument.timed("parse")
+def fetch_covers_from_sheet(edit_url: str, top_n: int = 10) -> List[CoverVideo]:
     """100万未満の動画から上位N件を返す"""
-    rows_csv = fetch_csv_rows(edit_url)
-    out: List[Dict] = []
+    out: List[CoverVideo] = []
     try:
-        for row in rows_csv:
-            vid = (row.get("動画ID") or "").strip()
-            if not vid:
+        for row in COVERS_SCHEMA.rows(edit_url):
+            if not row.video_id:
                 continue
-            views = to_int(row.get("再生数") or "")
-            if views > 1_000_000:
+            if row.views > 1_000_000:
                 continue
-            out.append({
-                "video_id": vid,
-                "title": (row.get("タイトル") or "").strip() or "(タイトル不明)",
-                "views": views,
-                "date": (row.get("投稿日（日本時間）") or "").strip(),
-                "gap_to_million": 1_000_000 - views
-            })
-        out.sort(key=lambda r: (r["gap_to_million"], -r["views"]))
+            title = row.title or "(タイトル不明)"
+            out.append(CoverVideo(video_entity(row.video_id, title), intern(title), row.published, row.views, ""))
+        # 100万までの残りが少ない順
+        out.sort(key=lambda r: (1_000_000 - r.views, -r.views))
         return out[:top_n]
     except Exception as e:
         print(f"歌動画取得に失敗: {e}")
         return []
 
-def fetch_trending_from_sheet(edit_url: str, top_n: int | None = None) -> List[Dict]:
+# 伸びた動画シート
+TRENDING_SCHEMA = SheetSchema("TrendingRow",
+    Column("video_id", "動画ID"),
+    Column("increase", "増加数", convert=to_int),
+    Column("current_views", "現在再生数", convert=to_int),
+    Column("title", "タイトル"),
+    Column("published", "投稿日"),
+    Column("channel", "チャンネル"),
+)
+
+@instrument.timed("parse")
+def fetch_trending_from_sheet(edit_url: str, top_n: int | None = None) -> List[TrendingVideo]:
     """伸びた動画データを取得（top_n未指定時は全件）"""
-    rows_csv = fetch_csv_rows(edit_url)
-    out: List[Dict] = []
+    out: List[TrendingVideo] = []
     try:
-        for row in rows_csv:
-            vid = (row.get("動画ID") or "").strip()
-            if not vid:
+        for row in TRENDING_SCHEMA.rows(edit_url):
+            if not row.video_id:
                 continue
-            increase = to_int(row.get("増加数") or "")
-            current_views = to_int(row.get("現在再生数") or "")
-            out.append({
-                "video_id": vid,
-                "title": (row.get("タイトル") or "").strip() or "(タイトル不明)",
-                "increase": increase,
-                "current_views": current_views,
-                "date": (row.get("投稿日") or "").strip(),
-                "channel": (row.get("チャンネル") or "").strip(),
-            })
-        out.sort(key=lambda r: r["increase"], reverse=True)
+            title = row.title or "(タイトル不明)"
+            out.append(TrendingVideo(
+                video_entity(row.video_id, title),
+                intern(title),
+                row.increase,
+                row.current_views,
+                row.published,
+                intern(row.channel),
+            ))
+        out.sort(key=lambda r: r.increase, reverse=True)
         return out[:top_n] if top_n else out
     except Exception as e:
         print(f"伸びた動画取得に失敗: {e}")
         return []
 
-def fetch_covers_all_from_sheet(edit_url: str) -> List[Dict]:
+@functools.lru_cache(maxsize=None)
+def load_view_store() -> ViewStore:
+    """再生数の時系列（ビルド中1回だけ読み込む）"""
+    return ViewStore(VIEWS_DB)
+
+def use_local_trending() -> bool:
+    """伸びた動画を手元の時系列から集計できるか（TRENDING_DAYS 日分の記録がある）"""
+    return load_view_store().covers(TRENDING_DAYS, today())
+
+def record_views(covers_all: List[CoverVideo]) -> ViewStore:
+    """ALL表の再生数を今日の分として記録・保存（SAVE_VIEWS が False なら記録だけ）"""
+    store = load_view_store()
+    if covers_all:
+        store.record(((r.video_id, r.views) for r in covers_all), today())
+        if not SAVE_VIEWS:
+            return store
+        try:
+            store.save()
+        except Exception as e:
+            print(f"再生数の履歴を保存できませんでした: {e}")
+    return store
+
+def trending_from_views(covers_all: List[CoverVideo], store: ViewStore, days: int = TRENDING_DAYS) -> List[TrendingVideo]:
+    """ALL表の動画を手元の時系列の days 日間の増加数で並べる（伸びた動画シートの代わり）"""
+    day = today()
+    out = [
+        TrendingVideo(r.video, r.title, store.increase(r.video_id, days, day), r.views, r.date.replace("-", "/"), r.channel)
+        for r in covers_all
+    ]
+    out.sort(key=lambda r: r.increase, reverse=True)
+    return out
+
+# ALL表（歌動画一覧）
+COVERS_ALL_SCHEMA = SheetSchema("CoverAllRow",
+    Column("video_id", "動画ID", "video_id"),
+    Column("tag", "タグ", "tag"),
+    Column("title", "タイトル"),
+    Column("published", "投稿日", "投稿日（日本時間）", "投稿日時", convert=to_iso_date),
+    Column("views", "再生数", "現在再生数", convert=to_int),
+    Column("channel", "投稿チャンネル", "チャンネル"),
+)
+
+@instrument.timed("parse")
+def fetch_covers_all_from_sheet(edit_url: str) -> List[CoverVideo]:
     """ALL表から歌動画一覧を取得（タグをフラグ化）"""
-    rows_csv = fetch_csv_rows(edit_url)
     try:
         def parse_tags(tag_raw: str) -> Dict[str, bool]:
             s = (tag_raw or "")
@@ -232,223 +350,183 @@ def fetch_covers_all_from_sheet(edit_url: str) -> List[Dict]:
             has_kotoha = ("kotoha" in s_lower)
             return {"unit": has_unit, "hanon": has_hanon, "kotoha": has_kotoha}
 
-        rows: List[Dict] = []
-        for row in rows_csv:
-            vid = (row.get("動画ID") or row.get("video_id") or "").strip()
-            if not vid:
+        rows: List[CoverVideo] = []
+        for row in COVERS_ALL_SCHEMA.rows(edit_url):
+            if not row.video_id:
                 continue
-            flags = parse_tags((row.get("タグ") or row.get("tag") or "").strip())
+            flags = parse_tags(row.tag)
             main_tag = "unit" if (flags["unit"] or (flags["hanon"] and flags["kotoha"])) else ("hanon" if flags["hanon"] else ("kotoha" if flags["kotoha"] else "unit"))
-            rows.append({
-                "video_id": vid,
-                "title": (row.get("タイトル") or "").strip() or "(タイトル不明)",
-                "date": to_iso_date(row.get("投稿日") or row.get("投稿日（日本時間）") or row.get("投稿日時") or ""),
-                "views": to_int(row.get("再生数") or row.get("現在再生数") or ""),
-                "tag": main_tag,
-                "unit_flag": 1 if flags["unit"] else 0,
-                "hanon_flag": 1 if flags["hanon"] else 0,
-                "kotoha_flag": 1 if flags["kotoha"] else 0,
-            })
+            title = row.title or "(タイトル不明)"
+            rows.append(CoverVideo(
+                video_entity(row.video_id, title),
+                intern(title),
+                row.published,
+                row.views,
+                intern(main_tag),
+                1 if flags["unit"] else 0,
+                1 if flags["hanon"] else 0,
+                1 if flags["kotoha"] else 0,
+                intern(row.channel),
+            ))
         return rows
     except Exception as e:
         print(f"歌動画ALL取得に失敗: {e}")
         return []
 
-def fetch_albums_from_sheet(edit_url: str) -> List[Dict]:
+# アルバム一覧シート
+ALBUMS_SCHEMA = SheetSchema("AlbumRow",
+    Column("name", "名前", "name"),
+    Column("release_date", "リリース日", "release_date", convert=to_iso_date),
+    Column("comment", "一言"),
+)
+
+@instrument.timed("parse")
+def fetch_albums_from_sheet(edit_url: str) -> List[Release]:
     """アルバム一覧を取得（ネットワーク処理を共通化）"""
-    rows_csv = fetch_csv_rows(edit_url)
-    albums: List[Dict] = []
+    albums: List[Release] = []
     try:
-        for row in rows_csv:
-            name = (row.get("名前") or row.get("name") or "").strip()
-            if not name:
+        for row in ALBUMS_SCHEMA.rows(edit_url):
+            if not row.name:
                 continue
-            albums.append({
-                "name": name,
-                "release_date": to_iso_date(row.get("リリース日") or row.get("release_date") or ""),
-                "image": f"image/CD/{name}.png",
-                "comment": (row.get("一言") or "").strip()
-            })
-        albums.sort(key=lambda a: a["release_date"] or "", reverse=True)
+            albums.append(Release(row.name, row.release_date, f"image/CD/{row.name}.png", row.comment))
+        albums.sort(key=lambda a: a.release_date or "", reverse=True)
     except Exception as e:
         print(f"アルバム一覧取得に失敗: {e}")
     return albums
 
+# 追加: シングル一覧シート（タイトル列・日付列のゆらぎに対応）
+SINGLES_SCHEMA = SheetSchema("SingleRow",
+    Column("name", "名前", "title", "タイトル", "name"),
+    Column("release_date", "リリース日", "発売日", "release_date", "date", convert=to_iso_date),
+    Column("comment", "一言", "備考", "comment"),
+)
+
 # 追加: シングル一覧を取得
-def fetch_singles_from_sheet(edit_url: str) -> List[Dict]:
+@instrument.timed("parse")
+def fetch_singles_from_sheet(edit_url: str) -> List[Release]:
     """シングル一覧を取得（列名のゆらぎに対応）"""
-    rows_csv = fetch_csv_rows(edit_url)
-    singles: List[Dict] = []
+    singles: List[Release] = []
     try:
-        for row in rows_csv:
-            # タイトル列のゆらぎに対応
-            name = (row.get("名前") or row.get("title") or row.get("タイトル") or row.get("name") or "").strip()
-            if not name:
+        for row in SINGLES_SCHEMA.rows(edit_url):
+            if not row.name:
                 continue
-            release_raw = (row.get("リリース日") or row.get("発売日") or row.get("release_date") or row.get("date") or "").strip()
-            comment = (row.get("一言") or row.get("備考") or row.get("comment") or "").strip()
-            singles.append({
-                "name": name,
-                "release_date": to_iso_date(release_raw),
-                "image": f"image/CD/{name}.png",
-                "comment": comment
-            })
-        singles.sort(key=lambda a: a["release_date"] or "", reverse=True)
+            singles.append(Release(row.name, row.release_date, f"image/CD/{row.name}.png", row.comment))
+        singles.sort(key=lambda a: a.release_date or "", reverse=True)
     except Exception as e:
         print(f"シングル一覧取得に失敗: {e}")
     return singles
 
+# 追加: リリース楽曲一覧シート（楽曲名・種別・表紙・歌唱・IDの列名のゆらぎに対応）
+RELEASE_SONGS_SCHEMA = SheetSchema("ReleaseSongRow",
+    Column("name", "楽曲名", "曲名", "タイトル", "name"),
+    Column("kind", "種別", "タイプ", "カテゴリ", "category", "type"),
+    # 表紙が空なら楽曲名を使う（空白だけのセルはそのまま）
+    Column("cover", "表紙", "ジャケット", "cover", "image", convert=None),
+    Column("release_date", "リリース日", "release_date", convert=to_iso_date),
+    Column("singer", "歌唱", "歌唱者", "歌手", "singer", "タグ", "tag"),
+    Column("sheet_id", "ID", "id", "No", "no", convert=to_int),
+)
+
 # 追加: リリース楽曲一覧を取得
-def fetch_release_songs_from_sheet(edit_url: str) -> List[Dict]:
+@instrument.timed("parse")
+def fetch_release_songs_from_sheet(edit_url: str) -> List[ReleaseSong]:
     """リリース楽曲一覧を取得（楽曲名・種別・表紙・歌唱フラグに対応）"""
-    rows_csv = fetch_csv_rows(edit_url)
-    songs: List[Dict] = []
+    songs: List[ReleaseSong] = []
     try:
-        for row in rows_csv:
-            name = (row.get("楽曲名") or row.get("曲名") or row.get("タイトル") or row.get("name") or "").strip()
+        for row in RELEASE_SONGS_SCHEMA.rows(edit_url):
+            name = row.name
             if not name:
                 continue
             # 種別
-            raw_kind = (row.get("種別") or row.get("タイプ") or row.get("カテゴリ") or row.get("category") or row.get("type") or "").strip()
+            raw_kind = row.kind
             kind_lower = raw_kind.lower()
             kind_code = "original" if ("オリ" in raw_kind or "original" in kind_lower or kind_lower.startswith("ori")) else ("cover" if ("カバ" in raw_kind or "cover" in kind_lower) else "other")
             # 画像
-            cover = (row.get("表紙") or row.get("ジャケット") or row.get("cover") or row.get("image") or name).strip()
-            release_date = to_iso_date(row.get("リリース日") or row.get("release_date") or "")
+            cover = (row.cover or name).strip()
             # 歌唱（タグ/歌唱者のゆらぎに対応）
-            s_raw = (row.get("歌唱") or row.get("歌唱者") or row.get("歌手") or row.get("singer") or row.get("タグ") or row.get("tag") or "").strip()
+            s_raw = row.singer
             s_lower = s_raw.lower()
             has_unit = ("はのこと" in s_raw) or ("ハコリリ" in s_raw) or ("ハコニワリリィ" in s_raw) or ("hakoniwa" in s_lower) or ("hakoniwalily" in s_lower)
             has_hanon = ("hanon" in s_lower)
             has_kotoha = ("kotoha" in s_lower)
-            # ID（並び順用)
-            sheet_id = to_int(row.get("ID") or row.get("id") or row.get("No") or row.get("no") or "")
-
-            songs.append({
-                "name": name,
-                "kind": raw_kind or "不明",
-                "kind_code": kind_code,
-                "image": f"image/CD/{cover}.png",
-                "release_date": release_date,
-                "unit_flag": 1 if has_unit else 0,
-                "hanon_flag": 1 if has_hanon else 0,
-                "kotoha_flag": 1 if has_kotoha else 0,
-                "_id": sheet_id
-            })
+
+            songs.append(ReleaseSong(
+                name,
+                intern(raw_kind or "不明"),
+                kind_code,
+                f"image/CD/{cover}.png",
+                row.release_date,
+                1 if has_unit else 0,
+                1 if has_hanon else 0,
+                1 if has_kotoha else 0,
+                # ID（並び順用)
+                row.sheet_id
+            ))
 
         # 並び順: シートIDの降順。IDが無ければ日付→名前の降順。
-        if any(s.get("_id", 0) for s in songs):
-            songs.sort(key=lambda a: a.get("_id", 0), reverse=True)
+        if any(s.sheet_id for s in songs):
+            songs.sort(key=lambda a: a.sheet_id, reverse=True)
         else:
-            songs.sort(key=lambda a: (a.get("release_date") or "", a["name"]), reverse=True)
+            songs.sort(key=lambda a: (a.release_date or "", a.name), reverse=True)
     except Exception as e:
         print(f"リリース楽曲一覧取得に失敗: {e}")
     return songs
 
-def make_song_slug(name: str, sheet_id: int) -> str:
-    """曲ページ用の安全なファイル名を生成（ID付き）"""
-    import re
-    base = (name or "").strip()
-    # Windows不可文字を除去
-    base = re.sub(r'[\\/:*?"<>|]', '', base)
-    base = re.sub(r'\s+', '_', base)
-    return f"{sheet_id}-{base}" if sheet_id and sheet_id > 0 else base
-
-def make_cd_slug(name: str) -> str:
-    """CDページ用の安全なファイル名を生成（名前のみでスラッグ化）"""
-    import re
-    base = (name or "").strip()
-    base = re.sub(r'[\\/:*?"<>|]', '', base)  # Windows不可文字を除去
-    base = re.sub(r'\s+', '_', base)          # 空白→アンダースコア
-    return base or "untitled"
-
-def generate_music_section(albums: List[Dict]) -> str:
-    """リリース（アルバム一覧＋シングル一覧＋楽曲一覧）セクションHTML生成"""
-    section_parts = ["""
-<section id='music' class='section' role='region' aria-labelledby='music-heading'>
-  <h2 id='music-heading'><i class='fa-solid fa-headphones'></i>リリース</h2>
-"""]
-
-    # アルバム一覧
-    section_parts.append("""
-  <h3 class='videos-heading'><i class='fa-solid fa-compact-disc'></i> アルバム</h3>
-""")
-    if albums:
-        section_parts.append("""
-  <div class='videos-carousel-wrapper'>
-    <button class='carousel-btn prev' aria-label='前へ'>
-      <i class='fa-solid fa-chevron-left'></i>
-    </button>
-    <div class='videos-carousel'>
-""")
-        for a in albums:
-            disp_date = a["release_date"].replace("-", "/") if a["release_date"] else ""
-            comment_html = f"<div class='album-comment'>{a.get('comment', '')}</div>" if a.get("comment") else ""
-            slug = make_cd_slug(a["name"])  # 追加: スラッグ
-            section_parts.append(f"""
+# アルバム/シングルのカード（共通部分は読み込み時に1回だけ組み立てる）
+RELEASE_CARD = Template("""
       <div class='video-card'>
-        <a href='CDs/{slug}.html' class='video-thumb album-thumb' aria-label='{a['name']}の詳細ページ'>
-          <img src='{a["image"]}' alt='{a['name']}' loading='lazy'>
+        <a href='CDs/{slug}.html' class='video-thumb album-thumb' aria-label='{name}の詳細ページ'>
+          <img src='{image}' alt='{name}' loading='lazy'>
         </a>
         <div>
           <div class='video-meta'><i class='fa-regular fa-calendar'></i> {disp_date}</div>
           {comment_html}
-          <a class='video-title' href='CDs/{slug}.html'>{a['name']}</a>
+          <a class='video-title' href='CDs/{slug}.html'>{name}</a>
         </div>
       </div>
 """)
-        section_parts.append("""
-    </div>
-    <button class='carousel-btn next' aria-label='次へ'>
-      <i class='fa-solid fa-chevron-right'></i>
-    </button>
-  </div>
-""")
+
+def generate_release_cards(releases: List[Release]) -> Iterator[str]:
+    """アルバム/シングルの横スクロール一覧"""
+    yield CAROUSEL_OPEN
+    for r in releases:
+        yield RELEASE_CARD.render(
+            slug=make_cd_slug(r.name),  # 追加: スラッグ
+            name=r.name,
+            image=r.image,
+            disp_date=r.release_date.replace("-", "/") if r.release_date else "",
+            comment_html=f"<div class='album-comment'>{r.comment}</div>" if r.comment else "",
+        )
+    yield CAROUSEL_CLOSE
+
+@instrument.timed("render")
+def generate_music_section(albums: List[Release], singles: List[Release], songs: List[ReleaseSong]) -> Iterator[str]:
+    """リリース（アルバム一覧＋シングル一覧＋楽曲一覧）セクションHTML生成"""
+    yield """
+<section id='music' class='section' role='region' aria-labelledby='music-heading'>
+  <h2 id='music-heading'><i class='fa-solid fa-headphones'></i>リリース</h2>
+"""
+
+    # アルバム一覧
+    yield """
+  <h3 class='videos-heading'><i class='fa-solid fa-compact-disc'></i> アルバム</h3>
+"""
+    if albums:
+        yield from generate_release_cards(albums)
     else:
-        section_parts.append("<p class='video-meta'>アルバム情報を取得できませんでした。</p>\n")
+        yield "<p class='video-meta'>アルバム情報を取得できませんでした。</p>\n"
 
     # シングル一覧
-    singles = fetch_singles_from_sheet(SINGLES_SHEET_EDIT_URL)
-    section_parts.append("""
+    yield """
   <h3 class='videos-heading'><i class='fa-solid fa-music'></i> シングル</h3>
-""")
+"""
     if singles:
-        section_parts.append("""
-  <div class='videos-carousel-wrapper'>
-    <button class='carousel-btn prev' aria-label='前へ'>
-      <i class='fa-solid fa-chevron-left'></i>
-    </button>
-    <div class='videos-carousel'>
-""")
-        for s in singles:
-            disp_date = s["release_date"].replace("-", "/") if s["release_date"] else ""
-            comment_html = f"<div class='album-comment'>{s.get('comment', '')}</div>" if s.get("comment") else ""
-            slug = make_cd_slug(s["name"])  # 追加: スラッグ
-            section_parts.append(f"""
-      <div class='video-card'>
-        <a href='CDs/{slug}.html' class='video-thumb album-thumb' aria-label='{s['name']}の詳細ページ'>
-          <img src='{s["image"]}' alt='{s['name']}' loading='lazy'>
-        </a>
-        <div>
-          <div class='video-meta'><i class='fa-regular fa-calendar'></i> {disp_date}</div>
-          {comment_html}
-          <a class='video-title' href='CDs/{slug}.html'>{s['name']}</a>
-        </div>
-      </div>
-""")
-        section_parts.append("""
-    </div>
-    <button class='carousel-btn next' aria-label='次へ'>
-      <i class='fa-solid fa-chevron-right'></i>
-    </button>
-  </div>
-""")
+        yield from generate_release_cards(singles)
     else:
-        section_parts.append("<p class='video-meta'>シングル情報を取得できませんでした。</p>\n")
+        yield "<p class='video-meta'>シングル情報を取得できませんでした。</p>\n"
 
     # リリース楽曲一覧（フィルター＋全件グリッド表示）
-    songs = fetch_release_songs_from_sheet(SONGS_SHEET_EDIT_URL)
-    section_parts.append("""
+    yield """
   <h3 class='videos-heading'><i class='fa-solid fa-list'></i> リリース曲一覧（ALL）</h3>
   <div class='covers-controls list-controls' id='release-songs-controls' aria-label='リリース曲のフィルター'>
     <div class='filter-group' role='group' aria-label='歌唱でフィルター'>
@@ -469,101 +547,91 @@ def generate_music_section(albums: List[Dict]) -> str:
       <button type='button' class='list-search-clear release-search-clear' aria-label='検索クリア'>×</button>
     </div>
   </div>
-""")
+"""
     if songs:
-        section_parts.append("""
+        yield """
   <div class='songs-grid' id='release-songs-grid' aria-live='polite'>
-""")
+"""
         for s in songs:
             # 追加: 各曲ページへのリンク
-            slug = make_song_slug(s['name'], int(s.get('_id', 0)))
-            kind_html = f"<div class='video-meta'><i class='fa-solid fa-tag'></i> {s.get('kind','')}</div>" if s.get("kind") else ""
-            section_parts.append(f"""
+            slug = make_song_slug(s.name, s.sheet_id)
+            kind_html = f"<div class='video-meta'><i class='fa-solid fa-tag'></i> {s.kind}</div>" if s.kind else ""
+            yield f"""
     <div class='song-card'
-         data-unit='{s.get('unit_flag',0)}'
-         data-hanon='{s.get('hanon_flag',0)}'
-         data-kotoha='{s.get('kotoha_flag',0)}'
-         data-kind='{s.get('kind_code','other')}'
-         data-title='{s['name']}'
+         data-unit='{s.unit_flag}'
+         data-hanon='{s.hanon_flag}'
+         data-kotoha='{s.kotoha_flag}'
+         data-kind='{s.kind_code}'
+         data-title='{s.name}'
          data-slug='{slug}'>
-      <a href='songs/{slug}.html' class='video-thumb' aria-label='{s['name']}の詳細ページ'>
-        <img src='{s["image"]}' alt='{s['name']}' loading='lazy'>
+      <a href='songs/{slug}.html' class='video-thumb' aria-label='{s.name}の詳細ページ'>
+        <img src='{s.image}' alt='{s.name}' loading='lazy'>
       </a>
       <div>
         {kind_html}
-        <a href='songs/{slug}.html' class='video-title'>{s['name']}</a>
+        <a href='songs/{slug}.html' class='video-title'>{s.name}</a>
       </div>
     </div>
-""")
-        section_parts.append("""
+"""
+        yield """
   </div>
-""")
+"""
     else:
-        section_parts.append("<p class='video-meta'>楽曲情報を取得できませんでした。</p>\n")
+        yield "<p class='video-meta'>楽曲情報を取得できませんでした。</p>\n"
 
     # セクション終端
-    section_parts.append("</section>\n")
-    return "".join(section_parts)
+    yield "</section>\n"
 
 # 追加: 歌動画セクション（TOP10/ALL一覧）
-def generate_covers_section(trending: List[Dict], covers_all: List[Dict]) -> str:
-    section = """
+@instrument.timed("render")
+def generate_covers_section(trending: List[TrendingVideo], covers_all: List[CoverVideo], grid_src: str | None = None,
+                            updated: datetime | None = None) -> Iterator[str]:
+    """歌動画セクションHTML生成（grid_src 指定時はALL一覧をJSONから描画する空グリッドを出力。集計期間は updated（省略時は現在）までの7日間）"""
+    yield """
 <section id='covers' class='section' role='region' aria-labelledby='covers-heading'>
   <h2 id='covers-heading'><i class='fa-solid fa-microphone-lines'></i>歌動画</h2>
 """
     # 伸びた動画TOP10
     if trending:
-        today = datetime.now()
+        today = updated or datetime.now()
         start_date = (today - timedelta(days=7)).strftime("%Y/%m/%d")
         end_date = (today - timedelta(days=1)).strftime("%Y/%m/%d")
-        section += f"""
+        yield f"""
   <h3 class='videos-heading'>
     <i class='fa-solid fa-chart-line'></i> 伸びた動画TOP10
   </h3>
-  <p class='video-meta spaced'>直近7日間の再生数増加ランキング<span class="br-sp"></span>（{start_date}～{end_date}）</p>
-  <div class='videos-carousel-wrapper'>
-    <button class='carousel-btn prev' aria-label='前へ'>
-      <i class='fa-solid fa-chevron-left'></i>
-    </button>
-    <div class='videos-carousel'>
-"""
-        cards = []
+  <p class='video-meta spaced'>直近7日間の再生数増加ランキング<span class="br-sp"></span>（{start_date}～{end_date}）</p>"""
+        yield CAROUSEL_OPEN
         for i, v in enumerate(trending[:10], 1):
-            thumb = f"https://i.ytimg.com/vi/{v['video_id']}/mqdefault.jpg"
-            url = f"https://www.youtube.com/watch?v={v['video_id']}"
-            current_fmt = f"{v['current_views']:,}"
-            date_part = f"<div class='video-meta'><i class='fa-regular fa-calendar'></i> {v.get('date','')}</div>" if v.get("date") else ""
-            channel_part = f"<div class='video-meta'><i class='fa-solid fa-tv'></i> {v.get('channel','')}</div>" if v.get("channel") else ""
-            cards.append(f"""
+            thumb = v.video.thumb_url
+            url = v.video.watch_url
+            current_fmt = f"{v.current_views:,}"
+            date_part = f"<div class='video-meta'><i class='fa-regular fa-calendar'></i> {v.date}</div>" if v.date else ""
+            channel_part = f"<div class='video-meta'><i class='fa-solid fa-tv'></i> {v.channel}</div>" if v.channel else ""
+            yield f"""
       <div class='video-card'>
         <div class='video-rank'>{i}</div>
         <a href='{url}' target='_blank' rel='noopener noreferrer' class='video-thumb'>
-          <img src='{thumb}' alt='{v['title']}' loading='lazy'>
+          <img src='{thumb}' alt='{v.title}' loading='lazy'>
         </a>
         <div>
           {date_part}
           {channel_part}
           <div class='video-meta'><i class='fa-solid fa-eye'></i> {current_fmt} 回</div>
-          <a href='{url}' target='_blank' rel='noopener noreferrer'>{v['title']}</a>
+          <a href='{url}' target='_blank' rel='noopener noreferrer'>{v.title}</a>
         </div>
       </div>
-""")
-        section += "".join(cards) + """
-    </div>
-    <button class='carousel-btn next' aria-label='次へ'>
-      <i class='fa-solid fa-chevron-right'></i>
-    </button>
-  </div>
 """
+        yield CAROUSEL_CLOSE
 
-    trending_increase_map = { v.get("video_id"): int(v.get("increase", 0)) for v in (trending or []) }
-    section += """
+    trending_increase_map = { v.video_id: v.increase for v in (trending or []) }
+    yield """
   <h3 class='videos-heading'>
     <i class='fa-solid fa-list'></i> 歌動画一覧（ALL）
   </h3>
 """
     if covers_all:
-        section += """
+        yield """
   <div class='covers-controls list-controls' aria-label='歌動画のフィルターと並び替え'>
     <div class='filter-group' role='group' aria-label='チャンネル種別でフィルター'>
       <label class='filter-chip'><input type='radio' name='covers-tag' value='all' checked> すべて</label>
@@ -588,49 +656,57 @@ def generate_covers_section(trending: List[Dict], covers_all: List[Dict]) -> str
       <button type='button' class='list-search-clear covers-search-clear' aria-label='検索クリア'>×</button>
     </div>
   </div>
-  <div class='songs-grid' id='covers-all-grid' aria-live='polite'>
 """
-        cards = []
-        for r in covers_all:
-            popularity = trending_increase_map.get(r['video_id'], 0)
-            thumb = f"https://i.ytimg.com/vi/{r['video_id']}/mqdefault.jpg"
-            url = f"https://www.youtube.com/watch?v={r['video_id']}"
-            views_fmt = f"{int(r.get('views', 0)):,}"
-            date_disp = r["date"].replace("-", "/") if r["date"] else ""
-            cards.append(f"""
+        if grid_src:
+            yield f"""  <div class='songs-grid' id='covers-all-grid' aria-live='polite' data-src='{grid_src}'></div>
+"""
+        else:
+            yield from generate_covers_cards(covers_all, trending_increase_map)
+    else:
+        yield "<p class='video-meta'>ALL表のデータを取得できませんでした。</p>"
+
+    yield """
+</section>
+"""
+
+def generate_covers_cards(covers_all: List[CoverVideo], trending_increase_map: Dict[str, int]) -> Iterator[str]:
+    """歌動画一覧（ALL）のカードを全件HTMLで出力"""
+    yield """  <div class='songs-grid' id='covers-all-grid' aria-live='polite'>
+"""
+    for r in covers_all:
+        popularity = trending_increase_map.get(r.video_id, 0)
+        thumb = r.video.thumb_url
+        url = r.video.watch_url
+        views_fmt = f"{r.views:,}"
+        date_disp = r.date.replace("-", "/") if r.date else ""
+        yield f"""
     <div class='song-card'
-         data-tag='{r['tag']}'
-         data-unit='{1 if r.get('unit_flag') else 0}'
-         data-hanon='{1 if r.get('hanon_flag') else 0}'
-         data-kotoha='{1 if r.get('kotoha_flag') else 0}'
-         data-views='{int(r.get('views', 0))}'
-         data-date='{r['date']}'
-         data-title='{r['title']}'
+         data-tag='{r.tag}'
+         data-unit='{r.unit_flag}'
+         data-hanon='{r.hanon_flag}'
+         data-kotoha='{r.kotoha_flag}'
+         data-views='{r.views}'
+         data-date='{r.date}'
+         data-title='{r.title}'
          data-popularity='{popularity}'>
       <a href='{url}' target='_blank' rel='noopener noreferrer' class='video-thumb'>
-        <img src='{thumb}' alt='{r['title']}' loading='lazy'>
+        <img src='{thumb}' alt='{r.title}' loading='lazy'>
       </a>
       <div>
         <div class='video-meta'><i class='fa-regular fa-calendar'></i> {date_disp}</div>
         <div class='video-meta'><i class='fa-solid fa-eye'></i> {views_fmt} 回</div>
-        <a href='{url}' target='_blank' rel='noopener noreferrer'>{r['title']}</a>
+        <a href='{url}' target='_blank' rel='noopener noreferrer'>{r.title}</a>
       </div>
     </div>
-""")
-        section += "".join(cards) + """
-  </div>
 """
-    else:
-        section += "<p class='video-meta'>ALL表のデータを取得できませんでした。</p>"
-
-    section += """
-</section>
+    yield """
+  </div>
 """
-    return section
 
-def fetch_concerts_from_db(db_path: str) -> List[Dict]:
-    """ライブ管理DB: ツアー→公演→セトリ。セトリはツアー単位でINクエリ一括取得."""
-    data: List[Dict] = []
+@instrument.timed("query")
+def fetch_concerts_from_db(db_path: str) -> List[Tour]:
+    """ライブ管理DB: ツアー→公演→セトリ。3テーブルをそれぞれ1回ずつ並び順付きで取得し、1パスで組み立てる."""
+    data: List[Tour] = []
     if not os.path.exists(db_path):
         return data
     try:
@@ -642,58 +718,46 @@ def fetch_concerts_from_db(db_path: str) -> List[Dict]:
                 FROM tours
                 ORDER BY COALESCE(sort_order, 999999), id
             """)
-            tours = cur.fetchall()
-            for tour_id, tour_name, page_link, goods, sort_order in tours:
-                cur.execute(
-                    "SELECT id, name, date, venue, performer FROM concerts WHERE tour_id=? ORDER BY date, id",
-                    (tour_id,)
-                )
-                concerts_raw = cur.fetchall()
-                concert_ids = [row[0] for row in concerts_raw]
-                setlists_map: Dict[int, List[Dict]] = defaultdict(list)
-                if concert_ids:
-                    placeholders = ",".join("?" for _ in concert_ids)
-                    cur.execute(
-                        f"SELECT concert_id, order_no, song_title, singer, encore FROM setlists WHERE concert_id IN ({placeholders}) ORDER BY concert_id, order_no",
-                        concert_ids
-                    )
-                    for cid, order_no, title, singer, encore in cur.fetchall():
-                        setlists_map[cid].append({
-                            "order": order_no, "title": title, "singer": (singer or ""), "encore": 1 if (encore or 0) else 0
-                        })
-                concerts: List[Dict] = []
-                for concert_id, concert_name, date, venue, performer in concerts_raw:
-                    concerts.append({
-                        "id": concert_id,
-                        "name": concert_name or "",
-                        "date": date or "",
-                        "venue": venue or "",
-                        "performer": performer or "",
-                        "setlist": setlists_map.get(concert_id, [])
-                    })
-                data.append({
-                    "id": tour_id,
-                    "name": tour_name or "",
-                    "page_link": page_link or "",
-                    "goods": goods or "",
-                    "sort_order": sort_order,  # 任意保持
-                    "concerts": concerts
-                })
+            tours_by_id: Dict[int, Tour] = {}
+            for tour_id, tour_name, page_link, goods, sort_order in cur.fetchall():
+                tour = Tour(tour_id, tour_name or "", page_link or "", goods or "", sort_order)
+                tours_by_id[tour_id] = tour
+                data.append(tour)
+
+            # 公演はツアー内で日付順（idx_concerts_tour_date）
+            cur.execute("SELECT id, tour_id, name, date, venue, performer FROM concerts ORDER BY tour_id, date, id")
+            concerts_by_id: Dict[int, Concert] = {}
+            for concert_id, tour_id, concert_name, date, venue, performer in cur:
+                tour = tours_by_id.get(tour_id)
+                if tour is None:
+                    continue
+                concert = Concert(concert_id, concert_name or "", date or "", intern(venue or ""), intern(performer or ""))
+                concerts_by_id[concert_id] = concert
+                tour.concerts.append(concert)
+
+            # セトリは公演内で曲順（idx_setlists_concert_order）
+            cur.execute("SELECT concert_id, order_no, song_title, singer, encore FROM setlists ORDER BY concert_id, order_no")
+            for cid, order_no, title, singer, encore in cur:
+                concert = concerts_by_id.get(cid)
+                if concert is not None:
+                    concert.setlist.append(SetlistEntry(order_no, intern(title), intern(singer or ""), 1 if (encore or 0) else 0))
     except Exception as e:
         print(f"ライブデータ取得に失敗: {e}")
     return data
 
 # 追加: コンサートセクションHTML生成（削除されていたため復元）
-def generate_concert_section(concert_data: List[Dict]) -> str:
-    section = """
+@instrument.timed("render")
+def generate_concert_section(concert_data: List[Tour], titles: TitleIndex | None = None) -> Iterator[str]:
+    """ライブ一覧とセトリ（titles があればセトリの曲名を曲ページへリンク）"""
+    yield """
 <section id='concert' class='section' role='region' aria-labelledby='concert-heading'>
   <h2 id='concert-heading'><i class='fa-solid fa-music'></i>ライブ</h2>
 """
     if not concert_data:
-        section += "<p class='video-meta'>ライブデータがありません。</p></section>"
-        return section
+        yield "<p class='video-meta'>ライブデータがありません。</p></section>"
+        return
 
-    section += """
+    yield """
   <div class='concert-layout'>
     <nav class='concert-list' aria-label='ライブ一覧'>
 """
@@ -706,92 +770,94 @@ def generate_concert_section(concert_data: List[Dict]) -> str:
             return "perf-unit"
         return ""
 
+    # セトリの曲名はまとめて照合
+    song_slugs: Dict[str, str | None] = {}
+    if titles is not None:
+        song_slugs = titles.resolve_many(s.title for tour in concert_data for c in tour.concerts for s in c.setlist)
+        report_unresolved("ライブのセトリ", song_slugs)
+
     first_concert_id = None
     for tour in concert_data:
         link_part = ""
-        if tour.get("goods"):
-            link_part += f" <a href='{tour['goods']}' target='_blank' rel='noopener noreferrer'><i class='fa-solid fa-bag-shopping'></i></a>"
-        if tour.get("page_link"):
-            link_part += f" <a href='{tour['page_link']}' target='_blank' rel='noopener noreferrer'><i class='fa-solid fa-link'></i></a>"
-        section += f"      <div class='concert-group'>\n"
-        section += (
+        if tour.goods:
+            link_part += f" <a href='{tour.goods}' target='_blank' rel='noopener noreferrer'><i class='fa-solid fa-bag-shopping'></i></a>"
+        if tour.page_link:
+            link_part += f" <a href='{tour.page_link}' target='_blank' rel='noopener noreferrer'><i class='fa-solid fa-link'></i></a>"
+        yield f"      <div class='concert-group'>\n"
+        yield (
             f"        <div class='concert-tour'>"
-            f"<button class='concert-toggle' type='button' aria-expanded='false' aria-controls='tour-items-{tour['id']}'>"
-            f"<i class='fa-solid fa-caret-right caret' aria-hidden='true'></i>{tour['name']}</button>"
+            f"<button class='concert-toggle' type='button' aria-expanded='false' aria-controls='tour-items-{tour.id}'>"
+            f"<i class='fa-solid fa-caret-right caret' aria-hidden='true'></i>{tour.name}</button>"
             f"{link_part}</div>\n"
         )
-        section += f"        <ul id='tour-items-{tour['id']}' class='concert-items' hidden>\n"
-        for c in tour["concerts"]:
+        yield f"        <ul id='tour-items-{tour.id}' class='concert-items' hidden>\n"
+        for c in tour.concerts:
             if first_concert_id is None:
-                first_concert_id = c["id"]
-            name_part = f" {c['name']}" if c["name"] else ""
-            venue_part = f" @ {c['venue']}" if c["venue"] else ""
-            perf_cls = perf_class(c.get("performer", ""))
-            perf_dot = f"<span class='perf-dot {perf_cls}' title='{c.get('performer','')}' aria-hidden='true'></span>" if perf_cls else ""
-            section += (
-                f"          <li class='concert-item' tabindex='0' data-concert-id='{c['id']}' "
-                f"aria-controls='concert-detail-{c['id']}'><span class='concert-date'>"
-                f"{perf_dot}{c['date']}</span>"
+                first_concert_id = c.id
+            name_part = f" {c.name}" if c.name else ""
+            venue_part = f" @ {c.venue}" if c.venue else ""
+            perf_cls = perf_class(c.performer)
+            perf_dot = f"<span class='perf-dot {perf_cls}' title='{c.performer}' aria-hidden='true'></span>" if perf_cls else ""
+            yield (
+                f"          <li class='concert-item' tabindex='0' data-concert-id='{c.id}' "
+                f"aria-controls='concert-detail-{c.id}'><span class='concert-date'>"
+                f"{perf_dot}{c.date}</span>"
                 f"<span class='concert-name'>{name_part}</span><span class='concert-venue'>{venue_part}</span></li>\n"
             )
-        section += f"        </ul>\n"
-        section += f"      </div>\n"
-    section += "    </nav>\n"
+        yield f"        </ul>\n"
+        yield f"      </div>\n"
+    yield "    </nav>\n"
 
-    section += "    <div class='concert-detail' role='region' aria-live='polite'>\n"
+    yield "    <div class='concert-detail' role='region' aria-live='polite'>\n"
     for tour in concert_data:
-        for c in tour["concerts"]:
-            active = " active" if c["id"] == first_concert_id else ""
-            section += f"      <div id='concert-detail-{c['id']}' class='concert-detail-panel{active}' data-concert-id='{c['id']}'>\n"
+        for c in tour.concerts:
+            active = " active" if c.id == first_concert_id else ""
+            yield f"      <div id='concert-detail-{c.id}' class='concert-detail-panel{active}' data-concert-id='{c.id}'>\n"
             # 変更: タイトルを2ブロックに分割（1行目: 日付＋公演名、2行目: 会場）
-            main_line = f"{c['date']}" + (f" {c['name']}" if c.get("name") else "")
-            venue_html = c.get("venue", "")
-            perf_cls = perf_class(c.get("performer", ""))
-            perf_dot = f"<span class='perf-dot {perf_cls}' title='{c.get('performer','')}' aria-hidden='true'></span>" if perf_cls else ""
-            section += (
+            main_line = f"{c.date}" + (f" {c.name}" if c.name else "")
+            venue_html = c.venue
+            perf_cls = perf_class(c.performer)
+            perf_dot = f"<span class='perf-dot {perf_cls}' title='{c.performer}' aria-hidden='true'></span>" if perf_cls else ""
+            yield (
                 "        <h3 class='concert-detail-title'>"
                 f"<span class='concert-title-row'>{perf_dot}<span class='concert-title-main'>{main_line}</span></span>"
             )
             if venue_html:
-                section += f"<span class='concert-venue'>{venue_html}</span>"
-            section += "</h3>\n"
-            if c["setlist"]:
-                section += "        <ol class='setlist'>\n"
-                for s in c["setlist"]:
-                    encore_part = " <span class='setlist-encore'>[EN]</span>" if s.get("encore") else ""
-                    singer_part = f" <span class='setlist-singer'>({s['singer']})</span>" if s["singer"] else ""
-                    section += f"          <li><span class='setlist-title'>{s['title']}</span>{encore_part}{singer_part}</li>\n"
-                section += "        </ol>\n"
+                yield f"<span class='concert-venue'>{venue_html}</span>"
+            yield "</h3>\n"
+            if c.setlist:
+                yield "        <ol class='setlist'>\n"
+                for s in c.setlist:
+                    encore_part = " <span class='setlist-encore'>[EN]</span>" if s.encore else ""
+                    singer_part = f" <span class='setlist-singer'>({s.singer})</span>" if s.singer else ""
+                    slug = song_slugs.get(s.title)
+                    title_html = f"<a href='songs/{slug}.html'>{s.title}</a>" if slug else s.title
+                    yield f"          <li><span class='setlist-title'>{title_html}</span>{encore_part}{singer_part}</li>\n"
+                yield "        </ol>\n"
             else:
-                section += "        <p class='video-meta'>セトリ情報がありません。</p>\n"
-            section += "      </div>\n"
-    section += "    </div>\n"
-    section += "  </div>\n</section>\n"
-    return section
-
-def generate_videos_section(videos_by_category: Dict[str, List[Dict]]) -> str:
-    """切り抜き(非公式)セクションHTML生成（一覧のみ）"""
-    section = """
-<section id='videos' class='section' role='region' aria-labelledby='videos-heading'>
-  <h2 id='videos-heading'><i class='fa-brands fa-youtube'></i>切り抜き(非公式)</h2>
-"""
-    # フラット化
+                yield "        <p class='video-meta'>セトリ情報がありません。</p>\n"
+            yield "      </div>\n"
+    yield "    </div>\n"
+    yield "  </div>\n</section>\n"
+
+def flatten_videos(videos_by_category: Dict[str, List[ClipVideo]]) -> List[Tuple[str, ClipVideo]]:
+    """カテゴリ別の切り抜きを (種類トークン, 切り抜き) の1つのリストにまとめて投稿日の新しい順に並べる"""
     all_items = []
     cat_token = {"はのこと": "hanokoto", "見どころはのぴ": "hanopi", "ことメモ": "kotomemo"}
     for cat, items in videos_by_category.items():
-        for v in items:
-            date_obj = v.get("date_obj")
-            iso_date = date_obj.strftime("%Y-%m-%d") if isinstance(date_obj, datetime) and date_obj != datetime.min else ""
-            all_items.append({
-                "video_id": v["video_id"],
-                "title": v["title"],
-                "date": v.get("date", ""),
-                "iso_date": iso_date,
-                "cat": cat_token.get(cat, "other")
-            })
-    all_items.sort(key=lambda x: x["iso_date"], reverse=True)
-
-    section += """
+        token = cat_token.get(cat, "other")
+        all_items.extend((token, v) for v in items)
+    all_items.sort(key=lambda x: x[1].iso_date, reverse=True)
+    return all_items
+
+@instrument.timed("render")
+def generate_videos_section(videos_by_category: Dict[str, List[ClipVideo]], grid_src: str | None = None) -> Iterator[str]:
+    """切り抜き(非公式)セクションHTML生成（一覧のみ。grid_src 指定時はJSONから描画する空グリッドを出力）"""
+    yield """
+<section id='videos' class='section' role='region' aria-labelledby='videos-heading'>
+  <h2 id='videos-heading'><i class='fa-brands fa-youtube'></i>切り抜き(非公式)</h2>
+"""
+    yield """
   <h3 class='videos-heading'>
     <i class='fa-solid fa-list'></i> 切り抜き一覧（ALL）
   </h3>
@@ -811,35 +877,40 @@ def generate_videos_section(videos_by_category: Dict[str, List[Dict]]) -> str:
       </label>
     </div>
   </div>
-  <div class='songs-grid' id='clips-all-grid' aria-live='polite'>
 """
-    cards = []
-    for r in all_items:
-        thumb = f"https://i.ytimg.com/vi/{r['video_id']}/mqdefault.jpg"
-        url = f"https://www.youtube.com/watch?v={r['video_id']}"
-        date_disp = (r["iso_date"].replace("-", "/") if r["iso_date"] else r["date"])
-        cards.append(f"""
-    <div class='song-card' data-cat='{r['cat']}' data-date='{r['iso_date']}' data-title='{r['title']}'>
+    if grid_src:
+        yield f"""  <div class='songs-grid' id='clips-all-grid' aria-live='polite' data-src='{grid_src}'></div>
+</section>
+"""
+        return
+    yield """  <div class='songs-grid' id='clips-all-grid' aria-live='polite'>
+"""
+    for cat, r in flatten_videos(videos_by_category):
+        thumb = r.video.thumb_url
+        url = r.video.watch_url
+        date_disp = (r.iso_date.replace("-", "/") if r.iso_date else r.date)
+        yield f"""
+    <div class='song-card' data-cat='{cat}' data-date='{r.iso_date}' data-title='{r.title}'>
       <a href='{url}' target='_blank' rel='noopener noreferrer' class='video-thumb'>
-        <img src='{thumb}' alt='{r['title']}' loading='lazy'>
+        <img src='{thumb}' alt='{r.title}' loading='lazy'>
       </a>
       <div>
         <div class='video-meta'><i class='fa-regular fa-calendar'></i> {date_disp}</div>
-        <a href='{url}' target='_blank' rel='noopener noreferrer'>{r['title']}</a>
+        <a href='{url}' target='_blank' rel='noopener noreferrer'>{r.title}</a>
       </div>
     </div>
-""")
-    section += "".join(cards) + """
+"""
+    yield """
   </div>
 </section>
 """
-    return section
 
 # 追加: タイムライン用のタブ/パネルIDを生成
 def make_timeline_ids(index: int):
     return f"timeline-tab-{index}", f"timeline-panel-{index}"
 
 # 追加: サイトについてセクション生成
+@instrument.timed("render")
 def generate_about_section() -> str:
     return """
 <section id='about' class='section' role='region' aria-labelledby='about-heading'>
@@ -911,6 +982,7 @@ def generate_about_section() -> str:
 </section>"""
 
 # 追加: 情報提供セクション生成
+@instrument.timed("render")
 def generate_contribute_section() -> str:
     return """
 <section id='contribute' class='section contribute-section' role='region' aria-labelledby='contribute-heading'>
@@ -976,26 +1048,187 @@ def generate_contribute_section() -> str:
 </section>"""
 
 # 追加: Thanksセクション生成
-def generate_thanks_section(thanks_groups: Dict[str, List[str]]) -> str:
-    parts = ["""
+@instrument.timed("render")
+def generate_thanks_section(thanks_groups: Dict[str, List[str]]) -> Iterator[str]:
+    yield """
 <section id='thanks' class='section' role='region' aria-labelledby='thanks-heading'>
   <h2 id='thanks-heading'><i class='fa-solid fa-heart'></i>Thanks</h2>
   <p style='margin-bottom: 16px; color: var(--text-secondary); font-size: 14px;'>
     このサイトの運営にご協力いただいた皆様のお名前を掲載しています（公開希望者のみ）。<br>
     情報提供やアンケートへのご協力、誠にありがとうございます。
   </p>
-"""]
+"""
     for group, names in thanks_groups.items():
-        parts.append(f"<h3><i class='fa-solid fa-users'></i> {group}</h3>\n<ul class='thanks-name-list'>")
+        yield f"<h3><i class='fa-solid fa-users'></i> {group}</h3>\n<ul class='thanks-name-list'>"
         for name in names:
-            parts.append(f"<li class='thanks-name-item'>{name}</li>")
-        parts.append("</ul>\n")
-    parts.append("<p class='thanks-note'>（順不同・公開希望者のみ掲載）</p>\n</section>\n")
+            yield f"<li class='thanks-name-item'>{name}</li>"
+        yield "</ul>\n"
+    yield "<p class='thanks-note'>（順不同・公開希望者のみ掲載）</p>\n</section>\n"
+
+def build_title_index(songs: List[ReleaseSong]) -> TitleIndex:
+    """リリース楽曲（曲ページと同じ楽曲シート）から 曲名 → 曲ページのスラッグ の索引を作成"""
+    return TitleIndex((s.name, make_song_slug(s.name, s.sheet_id)) for s in songs)
+
+def index_sheet_urls() -> List[str]:
+    """index.html 用に取得するシート（手元の時系列で足りる場合は伸びた動画シートを省く）"""
+    if use_local_trending():
+        return [url for url in INDEX_SHEET_EDIT_URLS if url != TRENDING_SHEET_EDIT_URL]
+    return list(INDEX_SHEET_EDIT_URLS)
+
+def load_sheet_datasets() -> Dict:
+    """index.html 用のシートデータを取得（シートは先にまとめて並列取得）"""
+    configure_ttls(SHEET_TTLS)
+    local_trending = use_local_trending()
+    prefetch_csv(index_sheet_urls())
+    covers_all = fetch_covers_all_from_sheet(COVERS_ALL_SHEET_EDIT_URL)
+    store = record_views(covers_all)
+    return {
+        "albums": fetch_albums_from_sheet(ALBUMS_SHEET_EDIT_URL),
+        "singles": fetch_singles_from_sheet(SINGLES_SHEET_EDIT_URL),
+        "songs": fetch_release_songs_from_sheet(SONGS_SHEET_EDIT_URL),
+        "trending": trending_from_views(covers_all, store) if local_trending else fetch_trending_from_sheet(TRENDING_SHEET_EDIT_URL, top_n=None),
+        "covers_all": covers_all,
+        "videos": fetch_videos_from_sheet(VIDEOS_SHEET_EDIT_URL),
+    }
+
+def load_index_datasets() -> Dict:
+    """index.html の各セクションに必要なデータ（シート・ライブDB・Thanks）をまとめて取得"""
+    datasets = load_sheet_datasets()
+    datasets["concerts"] = fetch_concerts_from_db(CONCERT_DB)
+    datasets["thanks"] = fetch_thanks_groups(THANKS_CSV)
+    datasets["titles"] = build_title_index(datasets["songs"])
+    return datasets
+
+# 追加: 仮想スクロール用の一覧データ（fields + rows の配列形式でキー名の繰り返しを省く）
+def build_covers_payload(trending: List[TrendingVideo], covers_all: List[CoverVideo]) -> Dict:
+    """歌動画一覧（ALL）のJSONデータ"""
+    increase_map = { v.video_id: v.increase for v in (trending or []) }
+    rows = [
+        [r.video_id, r.title, r.date, r.views, r.tag, r.unit_flag, r.hanon_flag, r.kotoha_flag,
+         increase_map.get(r.video_id, 0)]
+        for r in covers_all
+    ]
+    return {"v": 1, "fields": ["id", "title", "date", "views", "tag", "unit", "hanon", "kotoha", "pop"], "rows": rows}
+
+def build_clips_payload(videos_by_category: Dict[str, List[ClipVideo]]) -> Dict:
+    """切り抜き一覧（ALL）のJSONデータ"""
+    rows = [[r.video_id, r.title, r.date, r.iso_date, cat] for cat, r in flatten_videos(videos_by_category)]
+    return {"v": 1, "fields": ["id", "title", "date", "iso", "cat"], "rows": rows}
+
+@instrument.timed("write")
+def write_grid_payload(name: str, payload: Dict) -> str:
+    """data/grids/<name>.json に書き出し（内容が同じなら書き換えない。GRID_PAYLOADS があればそこに置く）、キャッシュ対策のハッシュ付きURLを返す"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:10]
+    if GRID_PAYLOADS is not None:
+        GRID_PAYLOADS[name] = body
+    else:
+        write_if_changed(os.path.join(GRID_DATA_DIR, f"{name}.json"), body)
+    return f"data/grids/{name}.json?v={digest}"
+
+TIMELINE_TABLE_OPEN = (
+    "<div class='table-responsive'>"
+    "<table><thead><tr><th class='fit'>年</th><th class='fit'>月</th>"
+    "<th class='fix'>主な出来事</th><th class='fix'>ライブ</th>"
+    "<th class='fix'>動画</th><th class='fix'>その他</th></tr></thead>"
+)
+
+def timeline_panel_open(index: int, src: str | None = None) -> str:
+    """タブパネルの開始タグ（src 指定時は中身を断片ファイルから読み込む）"""
+    is_active = index == 0
+    active_class = "active" if is_active else ""
+    tab_id, panel_id = make_timeline_ids(index)
+    data_src = f" data-src='{src}'" if src else ""
+    return (
+        f"<div class='tab-content {active_class}' role='tabpanel' id='{panel_id}' "
+        f"aria-labelledby='{tab_id}' aria-hidden='{'false' if is_active else 'true'}'{data_src}>"
+    )
+
+@instrument.timed("render")
+def generate_timeline_panels(conn: sqlite3.Connection, classifications: List[str], month_counts: Dict) -> Iterator[str]:
+    """分類ごとのタブパネル（表＋検索インデックス）を生成"""
+    if LAZY_TIMELINE:
+        yield from generate_lazy_timeline_panels(conn, classifications, month_counts)
+        return
+    for i, classification in enumerate(classifications):
+        yield timeline_panel_open(i) + TIMELINE_TABLE_OPEN
+        year_months = {year: n for (cls, year), n in month_counts.items() if cls == classification}
+        masks: Dict[str, int] = defaultdict(int)
+        yield from generate_table_rows(iter_timeline_records(conn, classification), year_months, masks)
+        yield "</table></div>"
+        yield generate_timeline_search_index(masks, len(year_months))
+        yield "</div>"
+
+# 追加: 年表の遅延読み込み（最初のタブの直近の年だけを index.html に含める）
+def write_timeline_fragment(name: str, html: str, written: Dict[str, str]) -> str:
+    """data/timeline/<name> に書き出し（内容が同じなら書き換えない）、キャッシュ対策のハッシュ付きURLを返す"""
+    if minify.ENABLED:
+        html = minify.minify_html(html)
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    write_if_changed(os.path.join(TIMELINE_FRAGMENT_DIR, name), html)
+    written[name] = digest
+    return f"data/timeline/{name}?v={digest[:10]}"
+
+def render_lazy_timeline_panel(conn: sqlite3.Connection, index: int, classification: str, year_months: Dict[int, int], written: Dict[str, str]) -> str:
+    """パネルの中身（表＋検索インデックス）。直近 INLINE_YEARS 年より前の年は断片ファイルにして、開くボタンだけを置く"""
+    _, panel_id = make_timeline_ids(index)
+    masks: Dict[str, int] = defaultdict(int)
+    years = list(generate_year_rows(iter_timeline_records(conn, classification), year_months, masks))
+    parts = [TIMELINE_TABLE_OPEN]
+    for k, (year, rows) in enumerate(years):
+        if k >= len(years) - INLINE_YEARS:
+            parts.append("<tbody>" + "".join(rows) + "</tbody>")
+            continue
+        src = write_timeline_fragment(f"{panel_id}-{year}.html", "".join(rows), written)
+        parts.append(
+            f"<tbody class='timeline-lazy' data-src='{src}'><tr><td colspan='6' class='timeline-lazy-cell'>"
+            f"<button type='button' class='timeline-lazy-button'><i class='fa-solid fa-chevron-down'></i> {year}年を表示</button>"
+            f"</td></tr></tbody>"
+        )
+    parts.append("</table></div>")
+    parts.append(generate_timeline_search_index(masks, len(years)))
     return "".join(parts)
 
-def generate_html_with_classification_tabs(grouped_records: Dict) -> str:
-    """分類ごとのレコードをタブ切り替えで表示する HTML を生成"""
-    header = """<!DOCTYPE html>
+def generate_lazy_timeline_panels(conn: sqlite3.Connection, classifications: List[str], month_counts: Dict) -> Iterator[str]:
+    """最初のタブだけ中身を出力し、他のタブの中身・古い年は data/timeline/ の断片ファイルに書き出す"""
+    written: Dict[str, str] = {}
+    for i, classification in enumerate(classifications):
+        year_months = {year: n for (cls, year), n in month_counts.items() if cls == classification}
+        body = render_lazy_timeline_panel(conn, i, classification, year_months, written)
+        if i == 0:
+            yield timeline_panel_open(i) + body + "</div>"
+        else:
+            _, panel_id = make_timeline_ids(i)
+            src = write_timeline_fragment(f"{panel_id}.html", body, written)
+            yield timeline_panel_open(i, src) + "<div class='timeline-lazy-loading'>読み込み中…</div></div>"
+    finish_timeline_fragments(written)
+
+def finish_timeline_fragments(written: Dict[str, str]):
+    """今回書き出さなかった断片ファイルを削除し、一覧（ファイル名 → 内容ハッシュ）を保存"""
+    for name in os.listdir(TIMELINE_FRAGMENT_DIR) if os.path.isdir(TIMELINE_FRAGMENT_DIR) else []:
+        if name.endswith(".html") and name not in written:
+            os.remove(os.path.join(TIMELINE_FRAGMENT_DIR, name))
+    os.makedirs(TIMELINE_FRAGMENT_DIR, exist_ok=True)
+    write_if_changed(TIMELINE_MANIFEST, json.dumps(dict(sorted(written.items())), ensure_ascii=False, indent=2))
+
+def timeline_fragments_ok() -> bool:
+    """遅延読み込み時、前回書き出した断片ファイルがそろっていて書き換えられていないか（通常モードなら常に True）"""
+    if not LAZY_TIMELINE:
+        return True
+    try:
+        with open(TIMELINE_MANIFEST, encoding="utf-8") as f:
+            expected = json.load(f)
+        for name, digest in expected.items():
+            with open(os.path.join(TIMELINE_FRAGMENT_DIR, name), encoding="utf-8") as f:
+                if hashlib.sha256(f.read().encode("utf-8")).hexdigest() != digest:
+                    return False
+    except Exception:
+        return False
+    return True
+
+def generate_index_head() -> str:
+    """ヘッダーからホーム（年表）のタブ一覧の開始まで"""
+    return f"""<!DOCTYPE html>
 <html lang='ja'>
 <head>
 <meta charset='UTF-8'>
@@ -1011,8 +1244,8 @@ def generate_html_with_classification_tabs(grouped_records: Dict) -> str:
 <link rel='icon' type='image/png' href='image/icon.png'>
 <link rel='icon' type='image/x-icon' href='image/icon.ico'>
 <link rel='stylesheet' href='https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css'>
-<link rel='stylesheet' href='style.css'>
-<script src='script.js' defer></script>
+<link rel='stylesheet' href='{asset_url("style.css")}'>
+<script src='{asset_url("script.js")}' defer></script>
 </head>
 <body>
 <header class='site-header'>
@@ -1048,27 +1281,21 @@ def generate_html_with_classification_tabs(grouped_records: Dict) -> str:
   </div>
     <h2 id='home-heading'><i class="fa-solid fa-book"></i>年表</h2>
   <div class='tabs' role='tablist' aria-label='年表分類タブ'>"""
+
+def generate_home_section(timeline: Dict) -> Iterator[str]:
+    """年表のタブとパネル（timeline は fetch_timeline_summary() の結果）"""
     # タブ順の整備
-    classifications = list(grouped_records.keys())
+    classifications = list(timeline["classifications"])
     preferred = "はのこと・ハコリリ"
     if preferred in classifications:
         classifications.remove(preferred)
         classifications.insert(0, preferred)
 
-    # 件数カウント
-    classification_counts = {}
-    for cls in classifications:
-        years = grouped_records.get(cls, {})
-        classification_counts[cls] = sum(
-            len(items)
-            for months in years.values()
-            for genres in months.values()
-            for items in genres.values()
-        )
+    # 件数カウント（集計クエリの結果）
+    classification_counts = timeline["counts"]
 
-    # タブとパネル
+    # タブ（パネルより先に出力するため先にまとめる）
     tabs = []
-    panels = []
     for i, classification in enumerate(classifications):
         is_active = i == 0
         active_class = "active" if is_active else ""
@@ -1089,41 +1316,37 @@ def generate_html_with_classification_tabs(grouped_records: Dict) -> str:
             f"</span>"
             f"</button>"
         )
+    yield "".join(tabs)
+    yield "</div>"
 
-        table_rows = generate_table_rows(grouped_records[classification])
-        panels.append(
-            f"<div class='tab-content {active_class}' role='tabpanel' id='{panel_id}' "
-            f"aria-labelledby='{tab_id}' aria-hidden='{'false' if is_active else 'true'}'>"
-            f"<div class='table-responsive'>"
-            f"<table><thead><tr><th class='fit'>年</th><th class='fit'>月</th>"
-            f"<th class='fix'>主な出来事</th><th class='fix'>ライブ</th>"
-            f"<th class='fix'>動画</th><th class='fix'>その他</th></tr></thead>"
-            f"<tbody>{''.join(table_rows)}</tbody></table>"
-            f"</div></div>"
-        )
+    # パネル（分類ごとにカーソルから逐次出力）
+    with closing(get_conn()) as conn:
+        yield from generate_timeline_panels(conn, classifications, timeline["month_counts"])
+    yield "</section>"
 
-    # 既存セクションを順に生成
-    # リリース
-    albums = fetch_albums_from_sheet(ALBUMS_SHEET_EDIT_URL)
-    music_section = generate_music_section(albums)
-    # 歌動画
-    trending = fetch_trending_from_sheet(TRENDING_SHEET_EDIT_URL, top_n=None)
-    covers_all = fetch_covers_all_from_sheet(COVERS_ALL_SHEET_EDIT_URL)
-    covers_section = generate_covers_section(trending, covers_all)
-    # 切り抜き(非公式)
-    videos = fetch_videos_from_sheet(VIDEOS_SHEET_EDIT_URL)
-    videos_section = generate_videos_section(videos)
-    # ライブ
-    concert_data = fetch_concerts_from_db(CONCERT_DB)
-    concert_section = generate_concert_section(concert_data)
-    # サイトについて / 情報提供 / Thanks を分離関数で生成
-    about_section = generate_about_section()
-    contribute_section = generate_contribute_section()
-    thanks_section = generate_thanks_section(fetch_thanks_groups(THANKS_CSV))
-
-    # フッター
-    current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M")
-    footer = f"""
+def covers_grid_src(datasets: Dict) -> str | None:
+    """仮想スクロール時は歌動画一覧のJSONを書き出してURLを返す"""
+    if VIRTUAL_GRIDS and datasets["covers_all"]:
+        return write_grid_payload("covers", build_covers_payload(datasets["trending"], datasets["covers_all"]))
+    return None
+
+def clips_grid_src(datasets: Dict) -> str | None:
+    """仮想スクロール時は切り抜き一覧のJSONを書き出してURLを返す"""
+    if VIRTUAL_GRIDS:
+        return write_grid_payload("clips", build_clips_payload(datasets["videos"]))
+    return None
+
+def grid_files_ok(datasets: Dict) -> bool:
+    """仮想スクロール時、一覧のJSONが書き出されているか（通常モードなら常に True）"""
+    if not VIRTUAL_GRIDS:
+        return True
+    names = ["clips"] + (["covers"] if datasets["covers_all"] else [])
+    return all(os.path.exists(os.path.join(GRID_DATA_DIR, f"{name}.json")) for name in names)
+
+def generate_index_footer(updated: datetime | None = None) -> str:
+    """フッター（最終更新の日時は updated、省略時は描画した時点）"""
+    current_time = (updated or datetime.now()).strftime("%Y年%m月%d日 %H:%M")
+    return f"""
 </main>
 <footer class='site-footer'>
   <div class='footer-content'>
@@ -1145,28 +1368,180 @@ def generate_html_with_classification_tabs(grouped_records: Dict) -> str:
 </footer>
 </body></html>"""
 
-    return f"{header}{''.join(tabs)}</div>{''.join(panels)}</section>{music_section}{covers_section}{videos_section}{concert_section}{about_section}{contribute_section}{thanks_section}{footer}"
+# index.html のセクション（出力順）。serve.py は変更のあったデータのセクションだけを描き直す
+INDEX_SECTIONS = ("head", "home", "music", "covers", "videos", "concert", "about", "contribute", "thanks", "footer")
+
+# 最終更新の日付で内容が変わるセクション（伸びた動画の集計期間）。描画キャッシュのキーに日付を含める
+DATED_SECTIONS = ("covers",)
+
+def index_sections(timeline: Dict, datasets: Dict, updated: datetime | None = None) -> Dict[str, Callable[[], Iterable[str]]]:
+    """セクション名 → そのセクションのチャンクを生成する関数（updated は最終更新の日時、省略時は描画した時点）"""
+    return {
+        "head": lambda: (generate_index_head(),),
+        "home": lambda: generate_home_section(timeline),
+        # リリース
+        "music": lambda: generate_music_section(datasets["albums"], datasets["singles"], datasets["songs"]),
+        # 歌動画
+        "covers": lambda: generate_covers_section(datasets["trending"], datasets["covers_all"], covers_grid_src(datasets), updated),
+        # 切り抜き(非公式)
+        "videos": lambda: generate_videos_section(datasets["videos"], clips_grid_src(datasets)),
+        # ライブ
+        "concert": lambda: generate_concert_section(datasets["concerts"], datasets.get("titles")),
+        # サイトについて / 情報提供 / Thanks
+        "about": lambda: (generate_about_section(),),
+        "contribute": lambda: (generate_contribute_section(),),
+        "thanks": lambda: generate_thanks_section(datasets["thanks"]),
+        "footer": lambda: (generate_index_footer(updated),),
+    }
+
+# 追加: セクションの描画結果を左右するソース（解析・描画のコード。変更すると全セクションを描き直す）
+SECTION_SOURCES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("generate.py", "templates.py", "common.py", "records.py", "schema.py", "sheets.py", "viewstore.py")
+]
+
+@functools.lru_cache(maxsize=None)
+def section_code_digest() -> str:
+    return file_digest(*SECTION_SOURCES)
+
+def setlist_links(datasets: Dict) -> Dict[str, str | None] | None:
+    """セトリの曲名 → 曲ページのスラッグ（索引が無ければ None）"""
+    titles = datasets.get("titles")
+    if titles is None:
+        return None
+    return titles.resolve_many(s.title for tour in datasets["concerts"] for c in tour.concerts for s in c.setlist)
+
+def index_section_keys(datasets: Dict) -> Dict[str, str]:
+    """描画キャッシュを使うセクション → 入力のハッシュ（見出し・固定文・フッターは毎回描画）。
+    datasets はこのビルドで取得したシート・DB・CSV から読み込んだもの（入力はレコードではなく元の本文・ファイルでハッシュする）"""
+    code = section_code_digest()
+    return {
+        # 遅延読み込み時は断片ファイルのURL（ハッシュ付き）も含むので、断片を圧縮するかどうかも
+        "home": input_key(code, "home", file_digest(DB_FILE), LAZY_TIMELINE and (INLINE_YEARS, minify.ENABLED)),
+        "music": input_key(code, "music", *map(csv_digest, (ALBUMS_SHEET_EDIT_URL, SINGLES_SHEET_EDIT_URL, SONGS_SHEET_EDIT_URL))),
+        # 伸びた動画はシートか再生数の履歴から集計したものなので、集計結果の値そのもの。
+        # 仮想スクロール時の一覧のJSONも同じ入力から作るので、キーには出力形式だけを加える（JSONは描画時に書き出す）
+        "covers": input_key(code, "covers", csv_digest(COVERS_ALL_SHEET_EDIT_URL),
+                            [(v.video_id, v.title, v.increase, v.current_views, v.date, v.channel) for v in datasets["trending"]],
+                            VIRTUAL_GRIDS),
+        "videos": input_key(code, "videos", csv_digest(VIDEOS_SHEET_EDIT_URL), VIRTUAL_GRIDS),
+        "concert": input_key(code, "concert", file_digest(CONCERT_DB), setlist_links(datasets)),
+        "thanks": input_key(code, "thanks", file_digest(THANKS_CSV)),
+    }
+
+def generate_index_chunks(timeline: Dict, datasets: Dict | None = None, cache: FragmentCache | None = None,
+                          updated: datetime | None = None, keys: Dict[str, str] | None = None) -> Iterator[str]:
+    """分類ごとのレコードをタブ切り替えで表示する HTML をチャンク単位で生成（timeline は fetch_timeline_summary() の結果、datasets 未指定時はここで取得）。
+    cache を渡すと、入力が前回と同じセクションは保存済みの断片を使う（keys は計算済みの index_section_keys()）"""
+    if datasets is None:
+        datasets = load_index_datasets()
+    if updated is None:
+        updated = datetime.now()
+    sections = index_sections(timeline, datasets, updated)
+    if cache is None:
+        keys = {}
+    elif keys is None:
+        keys = index_section_keys(datasets)
+    for name in INDEX_SECTIONS:
+        if name in keys:
+            key = input_key(keys[name], updated.date()) if name in DATED_SECTIONS else keys[name]
+            # 年表の断片ファイル・一覧のJSONが消えた（書き換えられた）場合は描き直して書き出し直す
+            yield cache.fetch(name, key, sections[name], refresh=not section_files_ok(name, datasets))
+        else:
+            yield from sections[name]()
+
+def section_files_ok(name: str, datasets: Dict) -> bool:
+    """セクションが参照する別ファイル（年表の断片・一覧のJSON）がそろっているか"""
+    if name == "home":
+        return timeline_fragments_ok()
+    if name in ("covers", "videos"):
+        return grid_files_ok(datasets)
+    return True
+
+# 追加: 入力が変わらなければ出力もバイト単位で同じにする
+def index_fingerprint(keys: Dict[str, str]) -> str:
+    """index.html の全入力の指紋（各セクションの入力・アセット名・出力の設定）"""
+    return input_key(keys, section_code_digest(), asset_mapping(), VIRTUAL_GRIDS, LAZY_TIMELINE, minify.ENABLED)
+
+def load_index_state() -> Dict:
+    if os.path.exists(INDEX_STATE_FILE):
+        try:
+            with open(INDEX_STATE_FILE, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+def write_index_page(timeline: Dict, datasets: Dict, cache: FragmentCache | None = None, filepath: str = OUTPUT_FILE) -> bool:
+    """入力の指紋が前回と同じで出力も前回のままなら書き出さない（False）。
+    最終更新の日時（フッター・伸びた動画の集計期間）は指紋が変わったときだけ進める"""
+    keys = index_section_keys(datasets)
+    fingerprint = index_fingerprint(keys)
+    state = load_index_state()
+    if state.get("fingerprint") == fingerprint and state.get("updated"):
+        if state.get("digest") == file_digest(filepath) and timeline_fragments_ok() and grid_files_ok(datasets):
+            return False
+        # 出力だけが消えた・書き換えられた場合は前回と同じ日時で書き直す
+        updated = datetime.fromisoformat(state["updated"])
+    else:
+        updated = datetime.now().replace(microsecond=0)
+    write_html_stream(generate_index_chunks(timeline, datasets, cache, updated, keys), filepath)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    write_atomic(INDEX_STATE_FILE, json.dumps({
+        "fingerprint": fingerprint,
+        "updated": updated.isoformat(),
+        "digest": file_digest(filepath),
+    }, ensure_ascii=False, indent=2))
+    return True
+
+def generate_html_with_classification_tabs(timeline: Dict, datasets: Dict | None = None) -> str:
+    """分類ごとのレコードをタブ切り替えで表示する HTML を生成（文字列で返す）"""
+    return "".join(generate_index_chunks(timeline, datasets))
+
+@instrument.timed("write")
+def write_html_stream(chunks: Iterable[str], filepath: str, buffer_size: int = 64 * 1024):
+    """チャンクをバッファ付きで一時ファイルへ逐次書き込み、完了後に置き換え（失敗時は既存ファイルを残す）"""
+    tmp_path = f"{filepath}.tmp"
+    minifier = None
+    if minify.ENABLED:
+        minifier = minify.HtmlMinifier()
+        chunks = minify.minify_chunks(chunks, minifier)
+    try:
+        with open(tmp_path, "w", encoding="utf-8", buffering=buffer_size) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, filepath)
+        if instrument.ENABLED:
+            instrument.add(bytes=os.path.getsize(filepath))
+        if minifier:
+            minify.report(filepath, minifier.bytes_in, minifier.bytes_out)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 def save_html(content: str, filepath: str):
     """HTML コンテンツをファイルに保存"""
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(content)
+    write_html_stream((content,), filepath)
 
 def main():
     """メイン処理"""
+    if instrument.ENABLED:
+        instrument.start()
     if not os.path.exists(DB_FILE):
         print(f"データベースファイル '{DB_FILE}' が見つかりません。")
         return
 
-    records = fetch_records()
-    if not records:
+    timeline = fetch_timeline_summary()
+    if timeline is None:
         print("データベースにレコードがありません。")
         return
 
-    grouped_records = group_records_by_classification_and_date(records)
-    html_content = generate_html_with_classification_tabs(grouped_records)
-    save_html(html_content, OUTPUT_FILE)
-    print(f"年表を '{OUTPUT_FILE}' に生成しました。")
+    if write_index_page(timeline, load_index_datasets()):
+        print(f"年表を '{OUTPUT_FILE}' に生成しました。")
+    else:
+        print(f"'{OUTPUT_FILE}' は変更なし（入力が前回と同じ）")
+    instrument.report()
 
 if __name__ == "__main__":
     main()
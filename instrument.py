@@ -0,0 +1,218 @@
+# はのこと活動記録 - ビルドの計測（任意）
+# - 取得・クエリ・解析・セクション生成・書き込みごとに所要時間・取得バイト数・行数・tracemalloc のピークを記録
+# - 同じ名前の段階は集計して表示（曲ページの描画など）
+# - 終了時にコンソールへ一覧を出し、指定があればJSONにも保存
+# - cProfile でホットパスのプロファイルを保存（build.py --cprofile）
+#
+# 有効化: 環境変数 BUILD_PROFILE=1 または python build.py --profile
+#         BUILD_PROFILE_JSON=<パス> または --profile-json <パス> でJSON出力
+
+import os
+import json
+import time
+import pstats
+import cProfile
+import functools
+import inspect
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+ENABLED = os.environ.get("BUILD_PROFILE", "") == "1"
+REPORT_PATH = os.environ.get("BUILD_PROFILE_JSON", "")
+
+# 表示順（種類）
+KINDS = ["node", "fetch", "query", "parse", "render", "write"]
+
+_records: List[Dict] = []
+# 計測中の段階（tracemalloc のピークを共有するため全スレッド分）
+_active: Dict[int, Dict] = {}
+_lock = threading.Lock()
+# スレッドごとの計測中の段階（add() の加算先）
+_local = threading.local()
+_started_at = 0.0
+# ビルド全体の tracemalloc ピーク（段階ごとに reset_peak するため別に保持）
+_overall_peak = 0
+
+def start():
+    """計測を開始（tracemalloc を有効化）"""
+    global _started_at, _overall_peak
+    _records.clear()
+    _overall_peak = 0
+    _started_at = time.perf_counter()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def _sample_peak():
+    """前回からのピークを計測中の全段階に反映してリセット（_lock 内で呼ぶ）"""
+    global _overall_peak
+    _, peak = tracemalloc.get_traced_memory()
+    _overall_peak = max(_overall_peak, peak)
+    for rec in _active.values():
+        rec["_peak"] = max(rec["_peak"], peak)
+    tracemalloc.reset_peak()
+
+def _open(kind: str, name: str) -> Dict:
+    rec = {"kind": kind, "name": name, "seconds": 0.0, "bytes": 0, "rows": 0}
+    if tracemalloc.is_tracing():
+        with _lock:
+            _sample_peak()
+            rec["_peak"] = rec["_mem_start"] = tracemalloc.get_traced_memory()[0]
+            _active[id(rec)] = rec
+    return rec
+
+def _close(rec: Dict):
+    if "_mem_start" in rec:
+        with _lock:
+            _sample_peak()
+            _active.pop(id(rec), None)
+            # 並列実行中は他のスレッドの確保分も含む（正確に見るには --workers 1）
+            rec["mem_peak"] = rec.pop("_peak") - rec["_mem_start"]
+            rec["mem_net"] = tracemalloc.get_traced_memory()[0] - rec.pop("_mem_start")
+    with _lock:
+        _records.append(rec)
+
+def _stack() -> List[Dict]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def add(**counts: int):
+    """このスレッドで計測中の段階に bytes / rows などを加算"""
+    if not ENABLED:
+        return
+    stack = _stack()
+    if stack:
+        rec = stack[-1]
+        for key, value in counts.items():
+            rec[key] = rec.get(key, 0) + value
+
+@contextmanager
+def stage(kind: str, name: str) -> Iterator[None]:
+    """with ブロックを1つの段階として計測"""
+    if not ENABLED:
+        yield
+        return
+    rec = _open(kind, name)
+    stack = _stack()
+    stack.append(rec)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec["seconds"] += time.perf_counter() - start_time
+        stack.pop()
+        _close(rec)
+
+def _timed_chunks(kind: str, name: str, chunks: Iterator) -> Iterator:
+    """ジェネレーターの計測（next() の中の時間だけを数え、出力バイト数を記録）"""
+    rec = _open(kind, name)
+    stack = _stack()
+    try:
+        while True:
+            stack.append(rec)
+            start_time = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                rec["seconds"] += time.perf_counter() - start_time
+                stack.pop()
+            if isinstance(chunk, str):
+                rec["bytes"] += len(chunk.encode("utf-8"))
+            yield chunk
+    finally:
+        _close(rec)
+
+def timed(kind: str, name: str | None = None) -> Callable:
+    """関数を1つの段階として計測するデコレーター（ジェネレーター関数は出力し終わるまで。戻り値が文字列なら bytes、リストなら rows を記録）"""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                if not ENABLED:
+                    return func(*args, **kwargs)
+                return _timed_chunks(kind, label, func(*args, **kwargs))
+            return gen_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with stage(kind, label):
+                result = func(*args, **kwargs)
+                if isinstance(result, str):
+                    add(bytes=len(result.encode("utf-8")))
+                elif isinstance(result, list):
+                    add(rows=len(result))
+            return result
+        return wrapper
+    return decorator
+
+def summarize() -> List[Dict]:
+    """(種類, 名前) ごとに集計（呼び出し回数・合計時間・合計バイト数/行数・最大ピーク）"""
+    merged: Dict[tuple, Dict] = {}
+    with _lock:
+        records = list(_records)
+    for rec in records:
+        key = (rec["kind"], rec["name"])
+        row = merged.get(key)
+        if row is None:
+            row = merged[key] = {"kind": rec["kind"], "name": rec["name"], "calls": 0, "seconds": 0.0, "bytes": 0, "rows": 0}
+        row["calls"] += 1
+        row["seconds"] += rec["seconds"]
+        row["bytes"] += rec.get("bytes", 0)
+        row["rows"] += rec.get("rows", 0)
+        if "mem_peak" in rec:
+            row["mem_peak"] = max(row.get("mem_peak", 0), rec["mem_peak"])
+    order = {kind: i for i, kind in enumerate(KINDS)}
+    return sorted(merged.values(), key=lambda r: (order.get(r["kind"], len(KINDS)), -r["seconds"]))
+
+def report(json_path: str = ""):
+    """集計をコンソールに表示し、json_path（未指定時は BUILD_PROFILE_JSON）があればJSONで保存"""
+    if not ENABLED:
+        return
+    rows = summarize()
+    wall = time.perf_counter() - _started_at if _started_at else 0.0
+    width = max([len(row["name"]) for row in rows] + [4])
+    print(f"\n計測結果（合計 {wall:.2f} 秒。時間は入れ子の段階を含む）")
+    print(f"  {'kind':<7} {'name':<{width}} {'calls':>6} {'ms':>10} {'bytes':>12} {'rows':>9} {'peak KB':>9}")
+    for row in rows:
+        peak = f"{row['mem_peak'] / 1024:,.0f}" if "mem_peak" in row else "-"
+        print(f"  {row['kind']:<7} {row['name']:<{width}} {row['calls']:>6} {row['seconds'] * 1000:>10.1f} "
+              f"{row['bytes']:>12,} {row['rows']:>9,} {peak:>9}")
+    totals: Dict[str, float] = {}
+    for row in rows:
+        totals[row["kind"]] = totals.get(row["kind"], 0.0) + row["seconds"]
+    print("  種類ごとの合計: " + " / ".join(f"{kind} {seconds * 1000:.1f} ms" for kind, seconds in totals.items()))
+    if tracemalloc.is_tracing():
+        with _lock:
+            _sample_peak()
+        print(f"  tracemalloc ピーク（全体）: {_overall_peak / 1024:,.0f} KB")
+
+    json_path = json_path or REPORT_PATH
+    if json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "wall_seconds": wall,
+                "totals_by_kind": totals,
+                "mem_peak": _overall_peak,
+                "stages": rows,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"計測結果を '{json_path}' に保存しました。")
+
+def profile_call(path: str, func: Callable, *args, **kwargs):
+    """func を cProfile 付きで実行し、統計を path に保存（上位を表示）。呼び出したスレッドのみが対象"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        print(f"\ncProfile を '{path}' に保存しました（上位20件・累積時間順）。")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
@@ -0,0 +1,42 @@
+# はのこと活動記録 - ライブ管理DB（X_concert.db）のマイグレーション
+# - concerts.tour_id / setlists.concert_id の索引を追加（公演・セトリの一括読み込みを並び順のまま索引で処理）
+# - 何度実行しても同じ結果（IF NOT EXISTS）
+#
+# 使い方: python migrate_concert_db.py [DBファイル]
+
+import os
+import sys
+import sqlite3
+
+CONCERT_DB = "X_concert.db"
+
+# (索引名, テーブル, 列)
+CONCERT_INDEXES = [
+    ("idx_concerts_tour_date", "concerts", "tour_id, date, id"),
+    ("idx_setlists_concert_order", "setlists", "concert_id, order_no"),
+]
+
+def ensure_concert_indexes(conn: sqlite3.Connection) -> int:
+    """不足している索引を作成し、作成した数を返す"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    created = 0
+    for name, table, columns in CONCERT_INDEXES:
+        if name in existing:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        created += 1
+    if created:
+        conn.commit()
+    return created
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else CONCERT_DB
+    if not os.path.exists(db_path):
+        print(f"データベースファイル '{db_path}' が見つかりません。")
+        return
+    with sqlite3.connect(db_path) as conn:
+        created = ensure_concert_indexes(conn)
+    print(f"'{db_path}' に索引を {created} 件追加しました。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# はのこと活動記録 - 生成HTMLの圧縮（任意）
+# - 意味のない空白（インデント・改行）をまとめ、コメントを削除
+# - 引用符が不要な属性値（英数字など）は引用符を外す
+# - <pre> / <script> / <style> / <textarea> の中身はそのまま
+# - チャンク単位でも処理できる（index.html の逐次書き込み用）
+#
+# 有効化: 環境変数 MINIFY_HTML=1 または python build.py --minify
+
+import os
+import re
+from typing import Iterable, Iterator, List, Tuple
+
+ENABLED = os.environ.get("MINIFY_HTML", "") == "1"
+
+# 中身を変更しない要素
+RAW_TAGS = ("pre", "script", "style", "textarea")
+# 前後の空白を表示に影響させないブロック要素（これらのタグに接する空白は削除）
+BLOCK_TAGS = {
+    "html", "head", "body", "title", "meta", "link", "script", "style", "noscript",
+    "header", "footer", "main", "nav", "section", "article", "aside", "div", "p",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption", "colgroup", "col",
+    "form", "fieldset", "legend", "details", "summary", "figure", "figcaption", "hr", "br",
+    "option", "select", "iframe", "template", "!doctype",
+}
+
+# 引用符は「=」の直後のときだけ値の開始として扱う（ブラウザと同じく、それ以外は属性名の一部）
+_TAG_RE = re.compile(r"""</?[A-Za-z!][^\s/>]*(?:=\s*"[^"]*"|=\s*'[^']*'|[^>])*>""")
+_TAG_NAME_RE = re.compile(r"</?([A-Za-z!][^\s/>]*)")
+_ATTR_RE = re.compile(r"""([^\s>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+_RAW_OPEN_RE = re.compile(rf"<({'|'.join(RAW_TAGS)})\b", re.I)
+_UNQUOTED_OK_RE = re.compile(r"^[^\s\"'=<>`]+$")
+# HTMLで意味を持つ空白（全角スペースなどは残す）
+_SPACE_RE = re.compile(r"[ \t\r\n\f]+")
+
+def _tag_name(tag: str) -> str:
+    m = _TAG_NAME_RE.match(tag)
+    return m.group(1).lower() if m else ""
+
+def _minify_tag(tag: str) -> str:
+    """タグ内の空白をまとめ、不要な引用符を外す"""
+    if tag.startswith("</"):
+        return f"</{_tag_name(tag)}>"
+    name_match = _TAG_NAME_RE.match(tag)
+    if not name_match or tag.startswith("<!"):
+        return tag
+    body = tag[name_match.end():-1]
+    self_closing = body.rstrip().endswith("/")
+    if self_closing:
+        body = body.rstrip()[:-1]
+    attrs = _ATTR_RE.findall(body)
+    parts = [tag[:name_match.end()]]
+    for i, (key, value) in enumerate(attrs):
+        if not value:
+            parts.append(f" {key}")
+            continue
+        inner = value[1:-1] if value[:1] in ("'", '"') else value
+        # 自己終了タグの最後の属性は「値/」と紛れるので引用符を残す
+        keep_quotes = self_closing and i == len(attrs) - 1
+        if _UNQUOTED_OK_RE.match(inner) and not keep_quotes:
+            parts.append(f" {key}={inner}")
+        else:
+            parts.append(f" {key}={value}")
+    if self_closing:
+        parts.append("/")
+    parts.append(">")
+    return "".join(parts)
+
+def _is_block(token: Tuple[str, str] | None) -> bool:
+    if token is None:
+        return True
+    kind, text = token
+    if kind == "raw":
+        return True
+    return kind == "tag" and _tag_name(text) in BLOCK_TAGS
+
+class HtmlMinifier:
+    """feed() に渡したHTML片を順に圧縮（タグや要素の途中で切れた分は次回に持ち越す）"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._prev: Tuple[str, str] | None = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _tokenize(self, final: bool) -> Tuple[List[Tuple[str, str]], int]:
+        buf = self._buffer
+        tokens: List[Tuple[str, str]] = []
+        pos = 0
+        while pos < len(buf):
+            if buf.startswith("<!--", pos):
+                end = buf.find("-->", pos + 4)
+                if end < 0:
+                    if not final:
+                        break
+                    end = len(buf) - 3
+                tokens.append(("comment", buf[pos:end + 3]))
+                pos = end + 3
+                continue
+            if buf[pos] == "<":
+                raw = _RAW_OPEN_RE.match(buf, pos)
+                if raw:
+                    close = re.compile(rf"</{raw.group(1)}\s*>", re.I).search(buf, pos)
+                    if close:
+                        tokens.append(("raw", buf[pos:close.end()]))
+                        pos = close.end()
+                        continue
+                    if not final:
+                        break
+                tag = _TAG_RE.match(buf, pos)
+                if tag:
+                    tokens.append(("tag", tag.group(0)))
+                    pos = tag.end()
+                    continue
+                if not final and (len(buf) - pos < 2 or buf[pos + 1].isalpha() or buf[pos + 1] in "/!"):
+                    # タグが途中で切れている可能性がある
+                    break
+                end = buf.find("<", pos + 1)
+            else:
+                end = buf.find("<", pos)
+            if end < 0:
+                if not final:
+                    break
+                end = len(buf)
+            tokens.append(("text", buf[pos:end]))
+            pos = end
+        return tokens, pos
+
+    def _process(self, final: bool) -> str:
+        tokens, pos = self._tokenize(final)
+        # 末尾のテキストは次のタグが分かるまで持ち越す
+        if tokens and tokens[-1][0] == "text" and not final:
+            pos -= len(tokens[-1][1])
+            tokens.pop()
+        self._buffer = self._buffer[pos:]
+        out: List[str] = []
+        for i, token in enumerate(tokens):
+            kind, text = token
+            if kind == "comment":
+                # 条件付きコメントは残す
+                if text.startswith("<!--[if"):
+                    out.append(text)
+                continue
+            if kind == "text":
+                text = _SPACE_RE.sub(" ", text)
+                if _is_block(self._prev):
+                    text = text.lstrip(" ")
+                nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+                if _is_block(nxt):
+                    text = text.rstrip(" ")
+                if text:
+                    out.append(text)
+                    self._prev = token
+                continue
+            out.append(_minify_tag(text) if kind == "tag" else text)
+            self._prev = token
+        return "".join(out)
+
+    def feed(self, chunk: str) -> str:
+        self.bytes_in += len(chunk.encode("utf-8"))
+        self._buffer += chunk
+        result = self._process(final=False)
+        self.bytes_out += len(result.encode("utf-8"))
+        return result
+
+    def close(self) -> str:
+        result = self._process(final=True)
+        self.bytes_out += len(result.encode("utf-8"))
+        return result
+
+def minify_chunks(chunks: Iterable[str], minifier: HtmlMinifier | None = None) -> Iterator[str]:
+    """HTMLチャンク列を圧縮しながら順に返す（バイト数は minifier に記録）"""
+    minifier = minifier or HtmlMinifier()
+    for chunk in chunks:
+        result = minifier.feed(chunk)
+        if result:
+            yield result
+    result = minifier.close()
+    if result:
+        yield result
+
+def minify_html(html: str) -> str:
+    """HTML文字列全体を圧縮"""
+    minifier = HtmlMinifier()
+    return minifier.feed(html) + minifier.close()
+
+def report(label: str, bytes_in: int, bytes_out: int):
+    saved = bytes_in - bytes_out
+    ratio = saved / bytes_in * 100 if bytes_in else 0
+    print(f"minify: {label} {bytes_in:,} → {bytes_out:,} バイト（-{saved:,} / {ratio:.1f}%）")
@@ -0,0 +1,170 @@
+# はのこと活動記録 - generate*.py 共通のレコード型
+# - __slots__ 付きの dataclass / NamedTuple（辞書より1件あたりのメモリが小さい）
+# - 動画は video_id ごとに1つの Video を共有（歌動画ALL・伸びた動画・切り抜きで同じ実体を参照）
+# - ID・タグなど繰り返し現れる文字列は sys.intern で共有
+
+import sys
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Tuple
+
+intern = sys.intern
+
+class HistoryRecord(NamedTuple):
+    """年表（history テーブル）の1行"""
+    year: int
+    month: int
+    day: int
+    genre: str
+    content: str
+    link: str | None
+
+@dataclass(slots=True)
+class Video:
+    """YouTube動画（video_id ごとに1つ）"""
+    video_id: str
+    title: str
+
+    @property
+    def thumb_url(self) -> str:
+        return f"https://i.ytimg.com/vi/{self.video_id}/mqdefault.jpg"
+
+    @property
+    def watch_url(self) -> str:
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+
+# video_id → Video（ビルド中に共有）
+_videos: Dict[str, Video] = {}
+_videos_lock = threading.Lock()
+
+def video_entity(video_id: str, title: str) -> Video:
+    """video_id に対応する Video を返す（初出時に登録。タイトルは最初に見つかったもの）"""
+    video_id = intern(video_id)
+    with _videos_lock:
+        video = _videos.get(video_id)
+        if video is None:
+            video = _videos[video_id] = Video(video_id, intern(title))
+        return video
+
+@dataclass(slots=True, frozen=True)
+class CoverVideo:
+    """歌動画（ALL表）"""
+    video: Video
+    title: str
+    date: str
+    views: int
+    tag: str
+    unit_flag: int = 0
+    hanon_flag: int = 0
+    kotoha_flag: int = 0
+    channel: str = ""
+
+    @property
+    def video_id(self) -> str:
+        return self.video.video_id
+
+@dataclass(slots=True, frozen=True)
+class TrendingVideo:
+    """伸びた動画（直近7日の再生数増加）"""
+    video: Video
+    title: str
+    increase: int
+    current_views: int
+    date: str
+    channel: str
+
+    @property
+    def video_id(self) -> str:
+        return self.video.video_id
+
+@dataclass(slots=True, frozen=True)
+class ClipVideo:
+    """切り抜き(非公式)"""
+    video: Video
+    title: str
+    date: str
+    date_obj: datetime
+
+    @property
+    def video_id(self) -> str:
+        return self.video.video_id
+
+    @property
+    def iso_date(self) -> str:
+        return self.date_obj.strftime("%Y-%m-%d") if self.date_obj != datetime.min else ""
+
+@dataclass(slots=True, frozen=True)
+class Release:
+    """アルバム/シングル（index.html のリリース一覧）"""
+    name: str
+    release_date: str
+    image: str
+    comment: str
+
+@dataclass(slots=True, frozen=True)
+class ReleaseSong:
+    """リリース楽曲（index.html のリリース楽曲一覧）"""
+    name: str
+    kind: str
+    kind_code: str
+    image: str
+    release_date: str
+    unit_flag: int
+    hanon_flag: int
+    kotoha_flag: int
+    sheet_id: int = 0
+
+@dataclass(slots=True, frozen=True)
+class CdItem:
+    """CD詳細ページ（generate_CDs.py）"""
+    name: str
+    slug: str
+    image: str
+    date: str
+    oneword: str
+    tracks: Tuple[str, ...]
+    videos: Tuple[str, ...]
+    desc: str
+
+@dataclass(slots=True, frozen=True)
+class SongDetail:
+    """曲詳細ページ（generate_songs.py）"""
+    name: str
+    slug: str
+    image: str
+    release_date: str
+    albums: Tuple[str, ...]
+    kind: str
+    kind_code: str
+    youtube: str
+    lyrics: str
+    composer: str
+    arranger: str
+    vocal: str
+    credit_raw: str
+
+@dataclass(slots=True, frozen=True)
+class SetlistEntry:
+    order: int
+    title: str
+    singer: str
+    encore: int
+
+@dataclass(slots=True, frozen=True)
+class Concert:
+    id: int
+    name: str
+    date: str
+    venue: str
+    performer: str
+    setlist: List[SetlistEntry] = field(default_factory=list)
+
+@dataclass(slots=True, frozen=True)
+class Tour:
+    id: int
+    name: str
+    page_link: str
+    goods: str
+    sort_order: int | None
+    concerts: List[Concert] = field(default_factory=list)
@@ -0,0 +1,74 @@
+# はのこと活動記録 - シートの列定義（generate*.py 共通）
+# - シートごとに「列名とそのゆらぎ（別名）」「変換関数」を宣言しておく
+# - 見出し行から列番号への対応はシートごとに1回だけ解決し、行は列定義の順に並んだ名前付きタプルで返す
+# - 取り出しと変換は列ごとにまとめて行う（行ごとの辞書・別名の探索をしない）
+# - 値は別名の順で最初に空でないセル（従来の row.get("A") or row.get("B") と同じ）
+#
+# 例:
+#   SONGS = SheetSchema("SongRow",
+#       Column("name", "楽曲名", "曲名", "タイトル", "name"),
+#       Column("sheet_id", "ID", "id", convert=to_int),
+#   )
+#   for row in SONGS.rows(edit_url):
+#       row.name, row.sheet_id
+
+from collections import namedtuple
+from functools import partial
+from operator import itemgetter
+from typing import Callable, Dict, List, Tuple
+from sheets import fetch_csv_table
+
+class Column:
+    """1列分の定義（convert は選ばれたセルの文字列に適用。None なら文字列のまま）"""
+    __slots__ = ("name", "aliases", "convert")
+
+    def __init__(self, name: str, *aliases: str, convert: Callable[[str], object] | None = str.strip):
+        self.name = name
+        self.aliases = aliases
+        self.convert = convert
+
+class SheetSchema:
+    """シート1枚分の列定義"""
+
+    def __init__(self, row_name: str, *columns: Column):
+        self.columns = columns
+        self.row_type = namedtuple(row_name, [c.name for c in columns])
+
+    def resolve(self, header: List[str]) -> List[Tuple[int, ...]]:
+        """列ごとに、見出しにある別名の列番号を別名の順で返す（同名の見出しは後勝ち。DictReader と同じ）"""
+        positions: Dict[str, int] = {}
+        for i, name in enumerate(header):
+            positions[name] = i
+        resolved = []
+        for column in self.columns:
+            indexes: List[int] = []
+            for alias in column.aliases:
+                i = positions.get(alias)
+                if i is not None and i not in indexes:
+                    indexes.append(i)
+            resolved.append(tuple(indexes))
+        return resolved
+
+    def convert(self, header: List[str], rows: List[List[str]]) -> List[tuple]:
+        """表（各行は見出しの幅）→ 名前付きタプルのリスト。行ごとではなく列ごとに取り出して変換する"""
+        n = len(rows)
+        columns: List[List] = []
+        for column, indexes in zip(self.columns, self.resolve(header)):
+            convert = column.convert
+            if not indexes:
+                columns.append([convert("") if convert else ""] * n)
+                continue
+            values = list(map(itemgetter(indexes[0]), rows))
+            if len(indexes) > 1:
+                # 別名の列が複数ある場合だけ、先頭の列が空の行で残りの列を見る
+                for k, value in enumerate(values):
+                    if not value:
+                        row = rows[k]
+                        values[k] = next((row[i] for i in indexes[1:] if row[i]), "")
+            columns.append(list(map(convert, values)) if convert else values)
+        return list(map(partial(tuple.__new__, self.row_type), zip(*columns)))
+
+    def rows(self, edit_url: str) -> List[tuple]:
+        """シートの各行を名前付きタプルで返す"""
+        header, rows = fetch_csv_table(edit_url)
+        return self.convert(header, rows) if header else []
@@ -26,6 +26,46 @@ document.addEventListener('DOMContentLoaded', () => {
 		tabsContainer.dataset.active = tab.dataset.class || '';
 	};
 
+	// 追加: 年表の遅延読み込み（data-src の断片HTMLを初めて開いたときに1回だけ取得）
+	const fragmentLoads = new WeakMap();
+	const loadFragment = (el, apply) => {
+		if (!el || !el.dataset.src) return Promise.resolve();
+		if (!fragmentLoads.has(el)) {
+			const src = el.dataset.src;
+			fragmentLoads.set(el, fetch(src)
+				.then(res => {
+					if (!res.ok) throw new Error(`HTTP ${res.status}: ${src}`);
+					return res.text();
+				})
+				.then(html => {
+					apply(html);
+					delete el.dataset.src;
+				})
+				.catch(err => {
+					// 失敗した場合は次に開いたときに再取得
+					fragmentLoads.delete(el);
+					console.error(err);
+				}));
+		}
+		return fragmentLoads.get(el);
+	};
+	// タブの中身（表＋検索インデックス）
+	const loadTimelinePanel = (panel) => loadFragment(panel, (html) => {
+		panel.innerHTML = html;
+		panel.querySelectorAll('.table-responsive').forEach(table => {
+			table.addEventListener('scroll', toggleBackToTableTop, { passive: true });
+		});
+	});
+	// 古い年の行
+	const loadTimelineYear = (tbody) => loadFragment(tbody, (html) => {
+		tbody.innerHTML = html;
+		tbody.classList.remove('timeline-lazy');
+	});
+	document.addEventListener('click', (e) => {
+		const button = e.target.closest('.timeline-lazy-button');
+		if (button) loadTimelineYear(button.closest('tbody'));
+	});
+
 	// タブをアクティブ化（必要に応じてフォーカス移動）
 	const activateTab = (index, { focus = false } = {}) => {
 		tabs.forEach((tab, i) => {
@@ -42,6 +82,7 @@ document.addEventListener('DOMContentLoaded', () => {
 			// 不要なインラインdisplay操作を削除（CSS制御に統一）
 			// panel.style.display = isVisible ? 'block' : 'none';
 		});
+		loadTimelinePanel(tabContents[index]);
 		
 		// タブごとの検索バー表示切替
 		document.querySelectorAll('.timeline-search-bar').forEach((bar, i) => {
@@ -174,9 +215,52 @@ document.addEventListener('DOMContentLoaded', () => {
 
 		const input = searchBar.querySelector('input');
 		const clearButton = searchBar.querySelector('.timeline-search-clear');
-		const tbody = tabContent.querySelector('table tbody');
+		// 年ごとの <tbody>（検索は年単位で表示/非表示。遅延読み込みのタブは読み込み後に取得）
+		const getYearGroups = () => Array.from(tabContent.querySelectorAll('table tbody'));
+
+		// 追加: ビルド時に作成した n-gram インデックス（初回検索時に n-gram → 年グループのビットマスク へ展開）
+		let searchIndex;
+		const getSearchIndex = () => {
+			if (searchIndex !== undefined) return searchIndex;
+			const el = tabContent.querySelector('script.timeline-search-index');
+			// タブの中身が未読み込みなら次回に持ち越し
+			if (!el) return null;
+			searchIndex = null;
+			try {
+				const data = JSON.parse(el.textContent);
+				if (data && data.groups === getYearGroups().length) {
+					const masks = new Map();
+					[['uni', 1], ['bi', 2]].forEach(([key, size]) => {
+						Object.entries(data[key] || {}).forEach(([mask, joined]) => {
+							const chars = Array.from(joined);
+							for (let i = 0; i < chars.length; i += size) {
+								masks.set(chars.slice(i, i + size).join(''), Number(mask));
+							}
+						});
+					});
+					searchIndex = masks;
+				}
+			} catch (e) {
+				searchIndex = null;
+			}
+			return searchIndex;
+		};
+
+		// キーワードの全 n-gram を含む年グループ（候補）をインデックスから求める
+		const lookupGroups = (keyword, yearGroups) => {
+			const masks = getSearchIndex();
+			const all = new Set(yearGroups.map((_, i) => i));
+			if (!masks) return all;
+			const chars = Array.from(keyword);
+			const grams = chars.length === 1 ? chars : chars.slice(0, -1).map((c, i) => c + chars[i + 1]);
+			const candidates = new Set();
+			all.forEach(i => {
+				if (grams.every(gram => Math.floor((masks.get(gram) || 0) / 2 ** i) % 2 === 1)) candidates.add(i);
+			});
+			return candidates;
+		};
 
-		// 年グループ処理（rowspan対応）
+		// 年グループ処理（候補の年だけ実際の文字列で確認・ハイライト）
 		const processYearGroup = (rows, keyword) => {
 			const hasMatch = rows.some(row => 
 				!keyword || row.textContent.toLowerCase().includes(keyword)
@@ -196,39 +280,38 @@ document.addEventListener('DOMContentLoaded', () => {
 					);
 				}
 			});
+			return hasMatch;
 		};
 
 		// 行フィルタリング
-		const filterRows = () => {
+		const filterRows = async () => {
 			const keyword = input.value.trim().toLowerCase();
-			if (!tbody) return;
+			await loadTimelinePanel(tabContent);
+			const yearGroups = getYearGroups();
+			if (!yearGroups.length) return;
+
+			const candidates = keyword ? lookupGroups(keyword, yearGroups) : null;
+			// 候補の年のうち未読み込みの年を読み込んでから絞り込む
+			if (candidates) {
+				await Promise.all(yearGroups.filter((_, i) => candidates.has(i)).map(loadTimelineYear));
+				// 読み込み中に入力が変わった場合は新しい入力の処理に任せる
+				if (keyword !== input.value.trim().toLowerCase()) return;
+			}
 
 			// 前回の「該当なし」メッセージを削除
 			tabContent.querySelector('.timeline-no-result')?.remove();
-
-			// 年ごとにグループ化して処理
-			let currentYearRows = [];
 			let visibleCount = 0;
 
-			Array.from(tbody.rows).forEach(row => {
-				const hasYearCell = row.cells[0]?.hasAttribute('rowspan');
-
-				if (hasYearCell && currentYearRows.length > 0) {
-					processYearGroup(currentYearRows, keyword);
-					currentYearRows = [];
+			yearGroups.forEach((group, i) => {
+				// 候補外の年は中身を走査せずに隠す
+				if (candidates && !candidates.has(i)) {
+					group.style.display = 'none';
+					return;
 				}
-				currentYearRows.push(row);
+				group.style.display = '';
+				if (processYearGroup(Array.from(group.rows), keyword)) visibleCount++;
 			});
 
-			if (currentYearRows.length > 0) {
-				processYearGroup(currentYearRows, keyword);
-			}
-
-			// 表示件数カウント
-			visibleCount = Array.from(tbody.rows).filter(
-				row => row.style.display !== 'none'
-			).length;
-
 			// 0件メッセージ表示
 			if (visibleCount === 0 && keyword) {
 				const noResult = document.createElement('div');
@@ -569,6 +652,104 @@ document.addEventListener('DOMContentLoaded', () => {
 		});
 	}
 
+	// 追加: 一覧の仮想スクロール（data-src のJSONから表示範囲のカードだけを描画）
+	const escapeHtml = (s) => String(s ?? '').replace(/[&<>"']/g, ch => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[ch]));
+
+	const loadGridItems = async (src) => {
+		const res = await fetch(src);
+		if (!res.ok) throw new Error(`HTTP ${res.status}: ${src}`);
+		const payload = await res.json();
+		const fields = payload.fields || [];
+		return (payload.rows || []).map(row => {
+			const item = {};
+			fields.forEach((f, i) => { item[f] = row[i]; });
+			return item;
+		});
+	};
+
+	const createVirtualGrid = (grid, renderCard, overscanRows = 3) => {
+		let items = [];
+		let rowHeight = 0;
+		let scheduled = false;
+		let lastKey = '';
+
+		const columnCount = () => {
+			const tracks = getComputedStyle(grid).gridTemplateColumns;
+			return (tracks && tracks !== 'none') ? Math.max(1, tracks.split(' ').length) : 1;
+		};
+
+		const render = () => {
+			scheduled = false;
+			// 非表示中（セクション切替前）は描画しない
+			if (!grid.offsetParent) return;
+			const cols = columnCount();
+			const gap = parseFloat(getComputedStyle(grid).rowGap) || 0;
+			const totalRows = Math.ceil(items.length / cols);
+			if (!rowHeight && items.length) {
+				// 先頭1行を描画して行の高さを測る
+				grid.style.paddingTop = grid.style.paddingBottom = '0px';
+				grid.innerHTML = items.slice(0, cols).map(renderCard).join('');
+				rowHeight = Math.max(...Array.from(grid.children).map(c => c.offsetHeight)) + gap;
+				grid.style.gridAutoRows = `${rowHeight - gap}px`;
+				lastKey = '';
+			}
+			const stride = rowHeight || 1;
+			const offset = Math.max(0, -grid.getBoundingClientRect().top);
+			const first = Math.max(0, Math.floor(offset / stride) - overscanRows);
+			const last = Math.min(totalRows, Math.ceil((offset + window.innerHeight) / stride) + overscanRows);
+			const key = `${first}:${last}:${cols}:${items.length}`;
+			if (key === lastKey) return;
+			lastKey = key;
+			grid.style.paddingTop = `${first * stride}px`;
+			grid.style.paddingBottom = `${Math.max(0, totalRows - last) * stride}px`;
+			grid.innerHTML = items.slice(first * cols, last * cols).map(renderCard).join('');
+		};
+
+		const schedule = () => {
+			if (scheduled) return;
+			scheduled = true;
+			requestAnimationFrame(render);
+		};
+
+		window.addEventListener('scroll', schedule, { passive: true });
+		window.addEventListener('resize', () => { rowHeight = 0; schedule(); });
+		// セクション表示時（display:none解除）にも描画
+		if ('ResizeObserver' in window) new ResizeObserver(schedule).observe(grid);
+
+		return {
+			setItems: (next) => {
+				items = next;
+				lastKey = '';
+				schedule();
+			},
+		};
+	};
+
+	const renderVideoCard = (item, metas) => {
+		const id = encodeURIComponent(item.id);
+		const url = `https://www.youtube.com/watch?v=${id}`;
+		const title = escapeHtml(item.title);
+		return `<div class='song-card'>`
+			+ `<a href='${url}' target='_blank' rel='noopener noreferrer' class='video-thumb'>`
+			+ `<img src='https://i.ytimg.com/vi/${id}/mqdefault.jpg' alt='${title}' loading='lazy'></a>`
+			+ `<div>${metas.join('')}<a href='${url}' target='_blank' rel='noopener noreferrer'>${title}</a></div>`
+			+ `</div>`;
+	};
+
+	// 絞り込み・並び替えの結果を仮想グリッドに反映（データ取得は1回、DOMは表示範囲のみ）
+	const initVirtualList = (grid, { filter, compare, renderCard }) => {
+		const vgrid = createVirtualGrid(grid, renderCard);
+		let allItems = [];
+		const apply = () => vgrid.setItems(allItems.filter(filter).sort(compare()));
+		loadGridItems(grid.dataset.src)
+			.then(items => { allItems = items; apply(); })
+			.catch(err => {
+				console.error(err);
+				grid.innerHTML = "<p class='video-meta'>一覧データを取得できませんでした。</p>";
+			});
+		return apply;
+	};
+
 	// 追加: 歌動画一覧（ALL）フィルター・ソート初期化
 	let coversListInitialized = false;
 	const initCoversListSection = () => {
@@ -588,8 +769,37 @@ document.addEventListener('DOMContentLoaded', () => {
 		// ラジオボタン群
 		const tagRadios = tagGroup ? Array.from(tagGroup.querySelectorAll('input[type="radio"]')) : [];
 
+		// 追加: JSONデータ＋仮想スクロール（data-src 指定時）
+		const virtualApply = grid.dataset.src ? initVirtualList(grid, {
+			filter: (item) => {
+				const tagVal = tagGroup ? (tagGroup.querySelector('input[type="radio"]:checked')?.value || 'all') : 'all';
+				const q = (searchInput?.value || '').trim().toLowerCase();
+				const tagOk = (tagVal === 'all') ? true : (item.tag === tagVal);
+				return tagOk && (!q || String(item.title).toLowerCase().includes(q));
+			},
+			compare: () => {
+				const val = sortSelect ? sortSelect.value : 'date_desc';
+				const toTime = (item) => item.date ? new Date(item.date).getTime() : 0;
+				return (a, b) => {
+					switch (val) {
+						case 'date_desc': return toTime(b) - toTime(a);
+						case 'date_asc': return toTime(a) - toTime(b);
+						case 'views_desc': return b.views - a.views;
+						case 'views_asc': return a.views - b.views;
+						case 'popularity_desc': return b.pop - a.pop;
+						default: return 0;
+					}
+				};
+			},
+			renderCard: (item) => renderVideoCard(item, [
+				`<div class='video-meta'><i class='fa-regular fa-calendar'></i> ${escapeHtml(String(item.date || '').replace(/-/g, '/'))}</div>`,
+				`<div class='video-meta'><i class='fa-solid fa-eye'></i> ${Number(item.views || 0).toLocaleString('en-US')} 回</div>`,
+			]),
+		}) : null;
+
 		// フィルター: data-tag + キーワード
 		const applyFilter = () => {
+			if (virtualApply) return virtualApply();
 			const tagVal = tagGroup ? (tagGroup.querySelector('input[type="radio"]:checked')?.value || 'all') : 'all';
 			const q = (searchInput?.value || '').trim().toLowerCase();
 
@@ -603,6 +813,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 		// 並び替え（既存のまま）
 		const applySort = () => {
+			if (virtualApply) return virtualApply();
 			if (!sortSelect) return;
 			const val = sortSelect.value;
 			const cmp = (a, b) => {
@@ -681,8 +892,28 @@ document.addEventListener('DOMContentLoaded', () => {
 
 		const tagRadios = tagGroup ? Array.from(tagGroup.querySelectorAll('input[type="radio"]')) : [];
 
+		// 追加: JSONデータ＋仮想スクロール（data-src 指定時）
+		const virtualApply = grid.dataset.src ? initVirtualList(grid, {
+			filter: (item) => {
+				const tagVal = tagGroup ? (tagGroup.querySelector('input[type="radio"]:checked')?.value || 'all') : 'all';
+				return (tagVal === 'all') ? true : ((item.cat || 'other') === tagVal);
+			},
+			compare: () => {
+				const asc = sortSelect && sortSelect.value === 'date_asc';
+				const toTime = (item) => {
+					const t = Date.parse(item.iso || '');
+					return Number.isNaN(t) ? 0 : t;
+				};
+				return (a, b) => asc ? toTime(a) - toTime(b) : toTime(b) - toTime(a);
+			},
+			renderCard: (item) => renderVideoCard(item, [
+				`<div class='video-meta'><i class='fa-regular fa-calendar'></i> ${escapeHtml(item.iso ? item.iso.replace(/-/g, '/') : item.date)}</div>`,
+			]),
+		}) : null;
+
 		// カテゴリフィルター
 		const applyFilter = () => {
+			if (virtualApply) return virtualApply();
 			const tagVal = tagGroup ? (tagGroup.querySelector('input[type="radio"]:checked')?.value || 'all') : 'all';
 			cards.forEach(card => {
 				const cat = card.dataset.cat || 'other';
@@ -693,6 +924,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 		// 日付ソート（表示中カードのみ）
 		const applySort = () => {
+			if (virtualApply) return virtualApply();
 			if (!sortSelect) return;
 			const val = sortSelect.value;
 			const visibleCards = cards.filter(c => c.style.display !== 'none');
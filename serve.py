@@ -0,0 +1,203 @@
+# はのこと活動記録 - 手元プレビュー用のサーバー
+# - 起動時にシート・DB・CSV を1回だけ読み込み、以降はメモリ上のデータから描画（ファイルには書き出さない）
+#   シートのスナップショット（data/cache）・再生数の履歴（data/views.db）も保存せず、一覧のJSON（--virtual-grids）はメモリ上から返す。
+#   年表は遅延読み込みにしない（data/timeline に書き出さない）
+# - index.html はセクションごとに描画結果を保持し、変更のあったデータのセクションとフッターだけを描き直す
+# - data/history.db・data/thanks.csv・X_concert.db の更新時刻を監視（ポーリング。SQLite の -wal も見る）
+# - songs/*.html・CDs/*.html はリクエストのたびにメモリ上のデータから描画
+# - それ以外（CSS/JS/画像）は手元のファイルをそのまま返す（アセットはハッシュ無しの名前で参照）
+# - シートは起動時の内容のまま（シートの変更を反映するには再起動）
+#
+# 使い方: python serve.py [--port 8000] [--interval 0.5] [--virtual-grids]
+
+import os
+import re
+import time
+import argparse
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Callable, Dict, Iterable, Tuple
+from urllib.parse import unquote, urlsplit
+
+import build
+import generate
+import generate_CDs
+import generate_songs
+import sheets
+
+DEFAULT_PORT = 8000
+# 更新時刻を確認する間隔（秒）
+WATCH_INTERVAL = 0.5
+HTML_TYPE = "text/html; charset=utf-8"
+JSON_TYPE = "application/json; charset=utf-8"
+
+# 監視するファイル → (データのキー, 読み込み, 描き直すセクション)
+WATCHED: Dict[str, Tuple[str, Callable, Tuple[str, ...]]] = {
+    generate.DB_FILE: ("timeline", build.load_history, ("home",)),
+    generate.CONCERT_DB: ("concerts", lambda: generate.fetch_concerts_from_db(generate.CONCERT_DB), ("concert",)),
+    generate.THANKS_CSV: ("thanks", lambda: generate.fetch_thanks_groups(generate.THANKS_CSV), ("thanks",)),
+}
+
+_PAGE_RE = re.compile(r"/(songs|CDs)/([^/]+)\.html")
+_GRID_RE = re.compile(r"/data/grids/([^/]+)\.json")
+
+def use_read_only():
+    """プレビュー中はリポジトリのファイル（スナップショット・再生数の履歴・一覧のJSON・年表の断片）を書き換えない"""
+    sheets.SAVE_SNAPSHOTS = False
+    generate.SAVE_VIEWS = False
+    generate.GRID_PAYLOADS = {}
+    generate.LAZY_TIMELINE = False
+
+def file_stamp(path: str) -> Tuple:
+    """更新の判定に使う (更新時刻, サイズ)。SQLite は -wal への書き込みも含める（無いファイルは None）"""
+    stamps = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamps.append(None)
+    return tuple(stamps)
+
+class Preview:
+    """メモリ上のデータとセクションごとの描画結果"""
+
+    def __init__(self):
+        use_read_only()
+        results = build.run_dag(build.build_nodes(), ["history", "index_sheets", "concerts", "thanks", "songs_index", "cd_items"])
+        self.data: Dict = {
+            **results["index_sheets"],
+            "timeline": results["history"],
+            "concerts": results["concerts"],
+            "thanks": results["thanks"],
+            "titles": results["songs_index"],
+        }
+        self.songs = {song.slug: song for song in results["songs_detailed"]}
+        albums, singles = results["cd_items"]
+        # 同じスラッグは後勝ち（書き出し時と同じ）
+        self.cds = {item.slug: (item, kind_label) for items, kind_label in ((albums, "アルバム"), (singles, "シングル")) for item in items}
+        self._stamps = {path: file_stamp(path) for path in WATCHED}
+        self._sections: Dict[str, str] = {}
+        self.index_html: str | None = None
+        self.render(generate.INDEX_SECTIONS)
+
+    def render(self, names: Iterable[str]):
+        """指定したセクションを描き直して index.html をつなぎ直す（年表が無ければ index.html は無し）"""
+        if self.data["timeline"] is None:
+            self.index_html = None
+            self._sections.clear()
+            return
+        sections = generate.index_sections(self.data["timeline"], self.data)
+        # 前回描けなかったセクションも描く
+        todo = set(names) | {name for name in generate.INDEX_SECTIONS if name not in self._sections}
+        for name in generate.INDEX_SECTIONS:
+            if name in todo:
+                self._sections[name] = "".join(sections[name]())
+        self.index_html = "".join(self._sections[name] for name in generate.INDEX_SECTIONS)
+
+    def poll(self):
+        """更新されたファイルのデータだけを読み直して、該当セクションを描き直す"""
+        changed = []
+        for path, stamp in self._stamps.items():
+            current = file_stamp(path)
+            if current != stamp:
+                self._stamps[path] = current
+                changed.append(path)
+        if not changed:
+            return
+        start = time.perf_counter()
+        names = {"footer"}
+        for path in changed:
+            key, load, sections = WATCHED[path]
+            try:
+                self.data[key] = load()
+            except Exception as e:
+                # 保存途中などで読めない場合は前のデータのまま（次の更新で読み直す）
+                print(f"'{path}' を読み込めませんでした: {e}")
+                continue
+            names.update(sections)
+        self.render(names)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{', '.join(changed)} の変更を反映しました（{', '.join(n for n in generate.INDEX_SECTIONS if n in names)}: {elapsed:.1f} ms）")
+
+    def watch(self, interval: float = WATCH_INTERVAL):
+        while True:
+            time.sleep(interval)
+            self.poll()
+
+    def page(self, path: str) -> Tuple[int, str, str] | None:
+        """生成ページ・一覧のJSONのパス → (ステータス, Content-Type, 本文)。それ以外は None（手元のファイルを返す）"""
+        if path in ("/", "/index.html"):
+            if self.index_html is None:
+                return 503, HTML_TYPE, "<p>年表のデータベースが無いか、レコードがありません。</p>"
+            return 200, HTML_TYPE, self.index_html
+        m = _GRID_RE.fullmatch(path)
+        if m:
+            body = generate.GRID_PAYLOADS.get(unquote(m.group(1)))
+            if body is None:
+                return 404, JSON_TYPE, "null"
+            return 200, JSON_TYPE, body
+        m = _PAGE_RE.fullmatch(path)
+        if not m:
+            return None
+        kind, slug = m.group(1), unquote(m.group(2))
+        if kind == "songs":
+            song = self.songs.get(slug)
+            if song is not None:
+                return 200, HTML_TYPE, generate_songs.render_song_html(song)
+        else:
+            entry = self.cds.get(slug)
+            if entry is not None:
+                return 200, HTML_TYPE, generate_CDs.render_cd_html(*entry, self.data["titles"])
+        return 404, HTML_TYPE, f"<p>ページが見つかりません: {path}</p>"
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """生成ページ・一覧のJSONはメモリ上のデータから返し、それ以外は手元のファイルを返す"""
+
+    def __init__(self, *args, preview: Preview, **kwargs):
+        self.preview = preview
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        page = self.preview.page(urlsplit(self.path).path)
+        if page is None:
+            return super().do_GET()
+        status, content_type, text = page
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def end_headers(self):
+        # 描き直したページも、ハッシュ無しの名前で参照するアセットもキャッシュさせない
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+def main():
+    parser = argparse.ArgumentParser(description="はのこと活動記録の手元プレビュー（データの変更を監視して再描画）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="待ち受けるポート")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="更新時刻を確認する間隔（秒）")
+    parser.add_argument("--virtual-grids", action="store_true", help="歌動画/切り抜き一覧をJSON＋仮想スクロールで出力")
+    args = parser.parse_args()
+    if args.virtual_grids:
+        generate.VIRTUAL_GRIDS = True
+
+    start = time.perf_counter()
+    preview = Preview()
+    print(f"データを読み込みました（{time.perf_counter() - start:.1f} 秒・曲 {len(preview.songs)} 件・CD {len(preview.cds)} 件）")
+    threading.Thread(target=preview.watch, args=(args.interval,), daemon=True).start()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), partial(PreviewHandler, preview=preview, directory=os.getcwd()))
+    print(f"http://127.0.0.1:{server.server_address[1]}/ で待ち受けています（Ctrl+C で終了）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# はのこと活動記録 - スプレッドシートCSV取得（generate*.py 共通）
+# - 編集URL → CSVエクスポートURLへ変換
+# - スレッドプールで並列取得・同一URLは1回だけダウンロード（keep-alive接続を再利用）
+# - data/cache/<sheet_id>_<gid>.csv にスナップショットを保存し、ETag/Last-Modified で条件付きリクエスト
+# - 取得時刻（TTL の判定用）はコミットしない <key>.fetched に分けて保存（内容が同じなら .csv/.meta.json は書き換えない）
+# - 通信に失敗した場合は最後に取得できたスナップショットを使う
+# - 本文は (見出し, 行リスト) の表に1回だけ解析（列名との対応付けは schema.py）
+
+import os
+import io
+import csv
+import json
+import time
+import hashlib
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple
+from urllib.parse import urlsplit, urljoin
+import instrument
+
+CACHE_DIR = os.path.join("data", "cache")
+# CSVエクスポートの取得先（ベンチマークではローカルのスタブサーバーに差し替える）
+EXPORT_BASE = os.environ.get("SHEET_EXPORT_BASE", "https://docs.google.com")
+# CSV取得の並列数・タイムアウト（秒）
+FETCH_WORKERS = 8
+FETCH_TIMEOUT = 10
+# キャッシュの有効期限（秒）。期限内はネットワークに問い合わせない（0 = 毎回条件付きリクエスト）
+DEFAULT_TTL = int(os.environ.get("SHEET_CACHE_TTL", "0") or 0)
+# 取得したCSVをスナップショットとして保存するか（手元プレビューでは保存しない）
+SAVE_SNAPSHOTS = True
+
+# シートごとのTTL（キャッシュキー → 秒）
+_ttls: Dict[str, int] = {}
+# 取得済みCSV本文（CSV URL → 本文、失敗時は None）。同一URLはビルド中1回だけ解決
+_csv_bodies: Dict[str, str | None] = {}
+# 解析済みの表（CSV URL → (見出し, 行リスト)）。同じシートを複数の生成処理で使っても解析は1回
+_csv_tables: Dict[str, Tuple[List[str], List[List[str]]]] = {}
+_csv_lock = threading.Lock()
+# スレッドごとに (scheme, host) → keep-alive 接続 を保持
+_http_local = threading.local()
+# 取得スレッドのメッセージが1行に混ざらないように
+_log_lock = threading.Lock()
+
+def _log(message: str):
+    """1メッセージを1行で表示（並列取得中でも他のスレッドの出力と混ざらない）"""
+    with _log_lock:
+        print(message, flush=True)
+
+def build_csv_url(edit_url: str) -> str:
+    """編集URLからCSVエクスポートURLを生成（gid未指定時は0）"""
+    parts = edit_url.split("/d/")
+    if len(parts) < 2:
+        return ""
+    sheet_id = parts[1].split("/")[0]
+    gid = "0"
+    if "gid=" in edit_url:
+        try:
+            gid = edit_url.split("gid=")[1].split("&")[0].split("#")[0]
+        except:
+            gid = "0"
+    return f"{EXPORT_BASE}/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}"
+
+def cache_key(csv_url: str) -> str:
+    """CSVエクスポートURL → キャッシュキー（<sheet_id>_<gid>）"""
+    sheet_id = csv_url.split("/d/")[1].split("/")[0]
+    gid = csv_url.split("gid=")[1].split("&")[0] if "gid=" in csv_url else "0"
+    return f"{sheet_id}_{gid}"
+
+def configure_ttls(ttls: Dict[str, int]):
+    """編集URL → TTL（秒）の対応を登録"""
+    for edit_url, seconds in ttls.items():
+        csv_url = build_csv_url(edit_url)
+        if csv_url:
+            _ttls[cache_key(csv_url)] = int(seconds)
+
+def _get_connection(scheme: str, host: str) -> http.client.HTTPConnection:
+    """スレッド内でホストごとの接続を再利用（keep-alive）"""
+    pool = getattr(_http_local, "pool", None)
+    if pool is None:
+        pool = _http_local.pool = {}
+    conn = pool.get((scheme, host))
+    if conn is None:
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = pool[(scheme, host)] = conn_cls(host, timeout=FETCH_TIMEOUT)
+    return conn
+
+def _drop_connection(scheme: str, host: str):
+    pool = getattr(_http_local, "pool", {})
+    conn = pool.pop((scheme, host), None)
+    if conn is not None:
+        conn.close()
+
+def http_get(url: str, headers: Dict[str, str] | None = None, max_redirects: int = 5) -> Tuple[int, http.client.HTTPMessage, bytes]:
+    """keep-alive 接続でGET（リダイレクト追従、切断時は1回だけ再接続）。(status, headers, body) を返す"""
+    req_headers = {"Connection": "keep-alive", **(headers or {})}
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        for attempt in range(2):
+            conn = _get_connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers=req_headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                _drop_connection(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+        if resp.status in (301, 302, 303, 307, 308):
+            url = urljoin(url, resp.getheader("Location") or "")
+            continue
+        if resp.status not in (200, 304):
+            raise OSError(f"HTTP {resp.status} {resp.reason}: {url}")
+        return resp.status, resp.headers, body
+    raise OSError(f"リダイレクトが多すぎます: {url}")
+
+def _snapshot_paths(key: str) -> Tuple[str, str]:
+    return os.path.join(CACHE_DIR, f"{key}.csv"), os.path.join(CACHE_DIR, f"{key}.meta.json")
+
+def _fetched_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.fetched")
+
+def _fetched_at(key: str) -> float:
+    """最後に取得（304 を含む）した時刻。記録が無ければ 0"""
+    try:
+        with open(_fetched_path(key), encoding="utf-8") as f:
+            return float(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _load_snapshot(key: str) -> Tuple[bytes | None, Dict]:
+    csv_path, meta_path = _snapshot_paths(key)
+    body = None
+    meta: Dict = {}
+    if os.path.exists(csv_path):
+        with open(csv_path, "rb") as f:
+            body = f.read()
+    if body is not None and os.path.exists(meta_path):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception:
+            meta = {}
+        # スナップショットが手で差し替えられた場合は検証用ヘッダーを使わない
+        if meta.get("sha256") != hashlib.sha256(body).hexdigest():
+            meta = {}
+    return body, meta
+
+def _save_snapshot(key: str, csv_url: str, body: bytes, meta: Dict):
+    csv_path, meta_path = _snapshot_paths(key)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    sha256 = hashlib.sha256(body).hexdigest()
+    # 内容が変わっていなければCSV本体は書き換えない
+    if meta.get("sha256") != sha256 or not os.path.exists(csv_path):
+        _write_atomic(csv_path, body)
+    # メタ情報は変わったときだけ書き換える（毎回の取得でコミット対象のファイルが変わらないように）
+    new_meta = {"etag": meta.get("etag", ""), "last_modified": meta.get("last_modified", ""), "url": csv_url, "sha256": sha256}
+    data = json.dumps(new_meta, ensure_ascii=False, indent=2).encode("utf-8")
+    try:
+        with open(meta_path, "rb") as f:
+            unchanged = f.read() == data
+    except OSError:
+        unchanged = False
+    if not unchanged:
+        _write_atomic(meta_path, data)
+    _write_atomic(_fetched_path(key), str(int(time.time())).encode("utf-8"))
+
+def _resolve_csv(csv_url: str) -> str | None:
+    """キャッシュ確認 → 条件付きリクエスト → 失敗時スナップショット の順でCSV本文を得る"""
+    key = cache_key(csv_url)
+    cached, meta = _load_snapshot(key)
+    ttl = _ttls.get(key, DEFAULT_TTL)
+    if cached is not None and meta and ttl > 0 and time.time() - _fetched_at(key) < ttl:
+        return cached.decode("utf-8", errors="ignore")
+
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        status, resp_headers, body = http_get(csv_url, headers)
+        if status == 304 and cached is not None:
+            body = cached
+        elif status == 304:
+            raise OSError(f"キャッシュが無いのに 304 が返されました: {csv_url}")
+        else:
+            meta = {
+                "etag": resp_headers.get("ETag") or "",
+                "last_modified": resp_headers.get("Last-Modified") or "",
+                "sha256": meta.get("sha256", ""),
+            }
+        if SAVE_SNAPSHOTS:
+            _save_snapshot(key, csv_url, body, meta)
+        return body.decode("utf-8", errors="ignore")
+    except Exception as e:
+        if cached is not None:
+            _log(f"CSV取得に失敗（キャッシュを使用）: {e}")
+            return cached.decode("utf-8", errors="ignore")
+        _log(f"CSV取得に失敗: {e}")
+        return None
+
+def _fetch_csv(csv_url: str) -> str | None:
+    """_resolve_csv を計測付きで実行（シートごとの取得時間・バイト数）"""
+    with instrument.stage("fetch", cache_key(csv_url)):
+        body = _resolve_csv(csv_url)
+        if body is not None and instrument.ENABLED:
+            instrument.add(bytes=len(body.encode("utf-8")))
+    return body
+
+def prefetch_csv(edit_urls: List[str]):
+    """複数シートのCSVをスレッドプールで並列取得（同一CSV URLは1回にまとめる）"""
+    csv_urls: List[str] = []
+    for edit_url in edit_urls:
+        csv_url = build_csv_url(edit_url)
+        if csv_url and csv_url not in _csv_bodies and csv_url not in csv_urls:
+            csv_urls.append(csv_url)
+    if not csv_urls:
+        return
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(csv_urls))) as pool:
+        for csv_url, body in zip(csv_urls, pool.map(_fetch_csv, csv_urls)):
+            with _csv_lock:
+                _csv_bodies[csv_url] = body
+
+def sheet_loaded(edit_url: str) -> bool:
+    """シートのCSV本文を得られたか（通信に失敗してもスナップショットがあれば True）"""
+    csv_url = build_csv_url(edit_url)
+    return bool(csv_url) and _csv_bodies.get(csv_url) is not None
+
+def csv_digest(edit_url: str) -> str:
+    """取得済みCSV本文のハッシュ（未取得・取得失敗なら空文字）"""
+    data = _csv_bodies.get(build_csv_url(edit_url))
+    if data is None:
+        return ""
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def parse_csv_table(data: str) -> Tuple[List[str], List[List[str]]]:
+    """CSV本文 → (見出し, 行リスト)。空行は飛ばし、各行は見出しの幅にそろえる（短い行は空文字で埋め、余分なセルは捨てる）"""
+    reader = csv.reader(io.StringIO(data))
+    header = next(reader, [])
+    width = len(header)
+    rows = [row if len(row) == width else (row + [""] * (width - len(row)))[:width] for row in reader if row]
+    return header, rows
+
+def fetch_csv_table(edit_url: str) -> Tuple[List[str], List[List[str]]]:
+    """CSVエクスポートURLから (見出し, 行リスト) を取得（取得・解析済みなら再利用。行は書き換えないこと）"""
+    table: Tuple[List[str], List[List[str]]] = ([], [])
+    try:
+        csv_url = build_csv_url(edit_url)
+        if not csv_url:
+            return table
+        if csv_url in _csv_tables:
+            return _csv_tables[csv_url]
+        if csv_url not in _csv_bodies:
+            body = _fetch_csv(csv_url)
+            with _csv_lock:
+                _csv_bodies[csv_url] = body
+        data = _csv_bodies[csv_url]
+        if data is None:
+            return table
+        with instrument.stage("parse", f"csv:{cache_key(csv_url)}"):
+            table = parse_csv_table(data)
+            instrument.add(rows=len(table[1]))
+        with _csv_lock:
+            _csv_tables[csv_url] = table
+    except Exception as e:
+        _log(f"CSV取得に失敗: {e}")
+    return table
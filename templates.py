@@ -0,0 +1,93 @@
+# はのこと活動記録 - ページ部品とテンプレート（generate*.py 共通）
+# - フッター・トップへ戻るボタン・カルーセルの枠などの共通部品は文字列として1回だけ作る
+# - ページのテンプレートは読み込み時に「固定部分」と「差し込み項目」に分解しておき、描画は join するだけ
+# - アセット名などページ間で共通の値は bind() で固定部分に埋め込む（値ごとにキャッシュ）
+
+from string import Formatter
+from typing import Dict, List
+
+# 詳細ページ（曲/CD）共通のフッター
+SITE_FOOTER = """
+<footer class='site-footer'>
+  <div class='footer-content'>
+    <div class='footer-links'>
+      <a href='https://x.com/hanokoto901' target='_blank' rel='noopener noreferrer'><i class='fa-brands fa-twitter'></i> Twitter</a>
+      <a href='https://www.youtube.com/channel/UCepZVSTaKBW4ux0RB-nQ_NQ' target='_blank' rel='noopener noreferrer'><i class='fa-brands fa-youtube'></i> YouTube</a>
+    </div>
+    <div class='footer-copyright'>© 2025 - はのこと活動記録</div>
+  </div>
+</footer>
+"""
+
+BACK_TO_TOP = "<button class='back-to-top' aria-label='ページトップへ戻る'><i class='fa-solid fa-arrow-up'></i></button>"
+
+# index.html の横スクロール一覧の枠
+CAROUSEL_OPEN = """
+  <div class='videos-carousel-wrapper'>
+    <button class='carousel-btn prev' aria-label='前へ'>
+      <i class='fa-solid fa-chevron-left'></i>
+    </button>
+    <div class='videos-carousel'>
+"""
+
+CAROUSEL_CLOSE = """
+    </div>
+    <button class='carousel-btn next' aria-label='次へ'>
+      <i class='fa-solid fa-chevron-right'></i>
+    </button>
+  </div>
+"""
+
+class Template:
+    """{名前} の位置で分割済みのテンプレート（書式指定・変換は使わない）"""
+
+    def __init__(self, source: str):
+        parts: List[str] = []
+        literal: List[str] = []
+        for text, field, spec, conversion in Formatter().parse(source):
+            literal.append(text)
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise ValueError(f"テンプレートで使えない差し込み項目です: {{{field}}}")
+            parts.append("".join(literal))
+            parts.append(field)
+            literal = []
+        parts.append("".join(literal))
+        self._set_parts(parts)
+
+    def _set_parts(self, parts: List[str]):
+        # 固定部分と差し込み項目が交互に並ぶ（先頭と末尾は固定部分）
+        self._parts = parts
+        self._literals = parts[0::2]
+        self._fields = parts[1::2]
+        self._bound: Dict[tuple, "Template"] = {}
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._fields)
+
+    def bind(self, **values: str) -> "Template":
+        """一部の項目を固定部分に埋め込んだテンプレート（同じ値なら前回のものを再利用）"""
+        key = tuple(sorted(values.items()))
+        bound = self._bound.get(key)
+        if bound is None:
+            parts: List[str] = [self._literals[0]]
+            for field, literal in zip(self._fields, self._literals[1:]):
+                if field in values:
+                    parts[-1] += str(values[field]) + literal
+                else:
+                    parts.append(field)
+                    parts.append(literal)
+            bound = Template.__new__(Template)
+            bound._set_parts(parts)
+            self._bound[key] = bound
+        return bound
+
+    def render(self, **values: str) -> str:
+        literals = self._literals
+        out = [literals[0]]
+        for field, literal in zip(self._fields, literals[1:]):
+            out.append(values[field])
+            out.append(literal)
+        return "".join(out)
@@ -0,0 +1,138 @@
+# はのこと活動記録 - 曲名の照合（CDの収録曲・ライブのセトリ → 曲ページ）
+# - 曲名 → スラッグ の索引はビルドごとに1回だけ作り、CDページとライブ一覧で共有
+# - 照合の順: 完全一致（normalize_title）→ 表記ゆれを畳んだキー（全角/半角・カタカナ/ひらがな・記号を無視）
+#   → 副題（「 ～…～」「 -…-」「(…)」）を除いたキー → 3文字組（trigram）の類似度が閾値以上で最も高い曲
+# - trigram は転置索引で候補を絞るので、1件の照合は曲数ではなく候補の数に比例
+# - 同じ曲名は1回だけ照合（結果を保持）。見つからなかった曲名は呼び出し側でまとめて表示
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+
+# trigram の類似度（Dice係数）の下限
+FUZZY_THRESHOLD = 0.65
+
+def normalize_title(s: str) -> str:
+    """曲名のゆるい正規化（空白/記号の除去・小文字化）"""
+    s = (s or "").strip().lower()
+    s = re.sub(r'\s+', '', s)
+    s = re.sub(r'[\\/:*?"<>|()\[\]{}【】（）・・、,，。.!！?？\'"～〜\-–—_^`　]+', '', s)
+    return s
+
+# カタカナ → ひらがな（ァ〜ヶ）
+_KATAKANA_TO_HIRAGANA = str.maketrans({chr(c): chr(c - 0x60) for c in range(0x30A1, 0x30F7)})
+# 副題: 空白に続く「～」「-」などから後ろ、括弧で囲んだ部分
+_SUBTITLE_RE = re.compile(r"\s+[-~～〜–—‐].*$|\s*[(（【\[［].*?[)）】\]］]")
+
+def fuzzy_key(s: str) -> str:
+    """表記ゆれを畳んだキー（NFKC・小文字化・カタカナをひらがなに・文字と数字以外を除去）"""
+    s = unicodedata.normalize("NFKC", s or "").casefold().translate(_KATAKANA_TO_HIRAGANA)
+    return "".join(ch for ch in s if unicodedata.category(ch)[0] in "LN")
+
+def base_title(s: str) -> str:
+    """副題を除いた曲名（除くと空になる場合はそのまま）"""
+    base = _SUBTITLE_RE.sub("", s or "").strip()
+    return base or (s or "")
+
+def trigrams(key: str) -> set:
+    """前後に目印を付けた3文字組（1〜2文字のキーにも組ができる）"""
+    padded = f"\x02{key}\x03"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    """曲名 → スラッグ の索引（同じ曲名は後勝ち）"""
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]] = (), threshold: float = FUZZY_THRESHOLD):
+        self.threshold = threshold
+        self._exact: Dict[str, str] = {}
+        self._fuzzy: Dict[str, str] = {}
+        # 副題を除いたキー → スラッグ（複数の曲が同じになる場合は None）
+        self._base: Dict[str, str | None] = {}
+        # trigram → 曲の番号、曲の番号 → (trigram の数, スラッグ)
+        self._postings: Dict[str, List[int]] = {}
+        self._entries: List[List] = []
+        self._entry_ids: Dict[str, int] = {}
+        self._resolved: Dict[str, str | None] = {}
+        for name, slug in pairs:
+            self.add(name, slug)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def add(self, name: str, slug: str):
+        key = normalize_title(name)
+        if not key:
+            return
+        self._exact[key] = slug
+        self._resolved.clear()
+        fkey = fuzzy_key(name)
+        if not fkey:
+            return
+        self._fuzzy[fkey] = slug
+        entry_id = self._entry_ids.get(fkey)
+        if entry_id is not None:
+            self._entries[entry_id][1] = slug
+        else:
+            grams = trigrams(fkey)
+            entry_id = self._entry_ids[fkey] = len(self._entries)
+            self._entries.append([len(grams), slug])
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(entry_id)
+        bkey = fuzzy_key(base_title(name))
+        if bkey and bkey != fkey:
+            self._base[bkey] = slug if self._base.get(bkey, slug) == slug else None
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        """正規化済みのキーで完全一致のみ"""
+        return self._exact.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def _closest(self, fkey: str) -> str | None:
+        """trigram を共有する曲の中で類似度が最も高い曲（閾値未満・同点で別の曲なら None）"""
+        grams = trigrams(fkey)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+        best_slug, best_score, tied = None, 0.0, False
+        for entry_id, count in shared.items():
+            size, slug = self._entries[entry_id]
+            score = 2 * count / (len(grams) + size)
+            if score > best_score:
+                best_slug, best_score, tied = slug, score, False
+            elif score == best_score and slug != best_slug:
+                tied = True
+        if best_score < self.threshold or tied:
+            return None
+        return best_slug
+
+    def resolve(self, title: str) -> str | None:
+        """曲名 → スラッグ（見つからなければ None）"""
+        slug = self._exact.get(normalize_title(title))
+        if slug is not None:
+            return slug
+        if title in self._resolved:
+            return self._resolved[title]
+        fkey = fuzzy_key(title)
+        slug = self._fuzzy.get(fkey)
+        if slug is None and fkey:
+            bkey = fuzzy_key(base_title(title))
+            slug = self._fuzzy.get(bkey) or self._base.get(bkey)
+            if slug is None:
+                slug = self._closest(fkey)
+        self._resolved[title] = slug
+        return slug
+
+    def resolve_many(self, titles: Iterable[str]) -> Dict[str, str | None]:
+        """曲名（重複可）→ スラッグ の対応。結果は保持するので、後の resolve() は照合し直さない"""
+        return {title: self.resolve(title) for title in dict.fromkeys(titles)}
+
+def report_unresolved(label: str, resolved: Dict[str, str | None], limit: int = 10):
+    """曲ページに結び付かなかった曲名を表示"""
+    missing = [title for title, slug in resolved.items() if slug is None]
+    if not missing:
+        return
+    shown = "、".join(missing[:limit]) + (" ほか" if len(missing) > limit else "")
+    print(f"{label}: 曲ページが見つからない曲名 {len(missing)} 件（{shown}）")
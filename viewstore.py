@@ -0,0 +1,136 @@
+# はのこと活動記録 - 再生数の時系列（generate.py から使用）
+# - 歌動画ALL表の再生数をビルドごとに data/views.db へ追記（video_id ごとに1行）
+# - 1行 = 初日・初日の再生数・翌日以降の日ごとの増加数（array('q') を zlib 圧縮したBLOB）
+# - 読み込み時に累積して日ごとの再生数の配列に戻すので、N日間の増加数は添字2つの引き算（O(1)）
+# - ビルドしなかった日は前日と同じ再生数として埋める（増加分は次に記録した日にまとめて入る）
+# - 同じ日の再記録は上書き。過去の日付の記録は無視
+
+import os
+import zlib
+import sqlite3
+from array import array
+from contextlib import closing
+from datetime import date
+from itertools import accumulate
+from typing import Dict, Iterable, List, Tuple
+import instrument
+
+def today() -> int:
+    """今日の日付（date.toordinal()）"""
+    return date.today().toordinal()
+
+def _encode(values: array) -> bytes:
+    deltas = array("q", [b - a for a, b in zip(values, values[1:])])
+    return zlib.compress(deltas.tobytes())
+
+def _decode(base: int, blob: bytes) -> array:
+    deltas = array("q")
+    deltas.frombytes(zlib.decompress(blob))
+    return array("q", accumulate(deltas, initial=base))
+
+class ViewStore:
+    """video_id → (初日, 日ごとの再生数) の時系列"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._series: Dict[str, Tuple[int, array]] = {}
+        self._dirty: set = set()
+        self._load()
+
+    @instrument.timed("query", "views.db")
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with closing(sqlite3.connect(self.path)) as conn:
+                for video_id, first_day, base, blob in conn.execute("SELECT video_id, first_day, base, deltas FROM view_series"):
+                    self._series[video_id] = (first_day, _decode(base, blob))
+        except Exception as e:
+            print(f"再生数の履歴を読み込めませんでした: {e}")
+            self._series.clear()
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def since(self) -> int | None:
+        """最初に記録した日（記録が無ければ None）"""
+        return min((first_day for first_day, _ in self._series.values()), default=None)
+
+    def covers(self, days: int, day: int) -> bool:
+        """day から days 日前までの記録があるか"""
+        first = self.since()
+        return first is not None and first <= day - days
+
+    def record(self, views: Iterable[Tuple[str, int]], day: int):
+        """その日の再生数を記録（保存は save()）。読み取れなかった再生数（0以下）は記録しない
+        同じ動画が複数行ある場合は多い方（行の順で値が入れ替わり、毎回書き込みになるのを防ぐ）"""
+        latest: Dict[str, int] = {}
+        for video_id, count in views:
+            if count > latest.get(video_id, 0):
+                latest[video_id] = count
+        for video_id, count in latest.items():
+            entry = self._series.get(video_id)
+            if entry is None:
+                self._series[video_id] = (day, array("q", [count]))
+                self._dirty.add(video_id)
+                continue
+            first_day, values = entry
+            last_day = first_day + len(values) - 1
+            if day < last_day:
+                continue
+            if day == last_day:
+                if values[-1] == count:
+                    continue
+                values[-1] = count
+            else:
+                values.extend([values[-1]] * (day - last_day - 1))
+                values.append(count)
+            self._dirty.add(video_id)
+
+    def views_on(self, video_id: str, day: int) -> int | None:
+        """day 時点の再生数（day が記録より後なら最後の記録。記録より前・未記録なら None）"""
+        entry = self._series.get(video_id)
+        if entry is None:
+            return None
+        first_day, values = entry
+        if day < first_day:
+            return None
+        return values[min(day - first_day, len(values) - 1)]
+
+    def increase(self, video_id: str, days: int, day: int) -> int:
+        """day - days 日から day までの増加数（記録が days 日分に満たない動画は初日からの増加数）"""
+        entry = self._series.get(video_id)
+        if entry is None:
+            return 0
+        first_day, values = entry
+        end = day - first_day
+        if end < 0:
+            return 0
+        last = len(values) - 1
+        return values[min(end, last)] - values[min(max(end - days, 0), last)]
+
+    def increases(self, days: int, day: int) -> Dict[str, int]:
+        """全動画の days 日間の増加数"""
+        return {video_id: self.increase(video_id, days, day) for video_id in self._series}
+
+    @instrument.timed("write", "views.db")
+    def save(self):
+        """記録を追加・変更した動画だけを書き込む"""
+        if not self._dirty:
+            return
+        rows: List[Tuple] = []
+        for video_id in sorted(self._dirty):
+            first_day, values = self._series[video_id]
+            rows.append((video_id, first_day, values[0], _encode(values)))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS view_series (
+                    video_id TEXT PRIMARY KEY,
+                    first_day INTEGER NOT NULL,
+                    base INTEGER NOT NULL,
+                    deltas BLOB NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.executemany("INSERT OR REPLACE INTO view_series VALUES (?, ?, ?, ?)", rows)
+        self._dirty.clear()